@@ -1,7 +1,10 @@
 from flask import Flask
 from flask_cors import CORS
 from .models import db
-from .extensions import ma, cache, limiter
+from .extensions import ma, cache, limiter, cache_stats
+from .utils.identity import init_identity_cache, current_identity_cache
+from .utils.hashing import init_password_hasher
+from .utils.revocation import init_revocation_list
 from app.blueprints.users import users_bp
 from app.blueprints.auth import auth_bp  # Add this import
 from app.blueprints.listings import listings_bp
@@ -16,6 +19,8 @@ from app.blueprints.reviews import reviews_bp
 from app.blueprints.payments import payments_bp
 from app.blueprints.bookings import bookings_bp
 from app.blueprints.locations import locations_bp
+from app.blueprints.listings.catalog import init_listing_catalog
+from app.blueprints.listings.suggest import init_listing_suggestions
 from config import config
 
 def create_app(config_name='default'):
@@ -28,12 +33,25 @@ def create_app(config_name='default'):
     ma.init_app(app)
     cache.init_app(app)
     limiter.init_app(app)
+    init_listing_catalog(app)
+    init_listing_suggestions(app)
+    init_identity_cache(app)
+    init_password_hasher(app)
+    init_revocation_list(app)
 
     # Health check endpoint
     @app.route('/health')
     def health_check():
         return {'status': 'healthy', 'config': config_name}, 200
 
+    @app.route('/health/cache')
+    def cache_health():
+        return {
+            'backend': app.config['CACHE_TYPE'],
+            'stats': cache_stats(),
+            'identity': current_identity_cache().stats(),
+        }, 200
+
     # Register blueprints with authentication applied
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(users_bp, url_prefix='/api/users')
@@ -1,12 +1,13 @@
-from flask import request, jsonify
+from flask import request, jsonify, g
 from sqlalchemy import select
 from marshmallow import ValidationError
 from app.blueprints.auth import auth_bp
-from app.utils.util import encode_user_token
-from werkzeug.security import check_password_hash, generate_password_hash
+from app.utils.util import encode_user_token, user_token_required
+from app.utils.revocation import current_revocation_list
+from app.utils.hashing import hash_password, verify_password, HashingOverloaded
 from app.models import User, db
 from app.blueprints.users.schemas import login_schema
-from app.blueprints.auth.schemas import AuthUserSchema
+from app.blueprints.auth.schemas import auth_user_serializer
 from app.extensions import limiter
 import secrets
 from datetime import datetime, timedelta
@@ -28,25 +29,35 @@ def login_user():
         select(User).where(User.email == validated_data["email"])
     ).scalars().first()
     
-    if not user or not check_password_hash(user.password_hash, validated_data["password"]):
+    if not user:
+        return jsonify({"error": "Invalid email or password"}), 401
+
+    password_matches, rehashed = verify_password(user.password_hash, validated_data["password"])
+    if not password_matches:
         return jsonify({"error": "Invalid email or password"}), 401
 
     if not user.is_active:
         return jsonify({"error": "Account is deactivated"}), 401
 
-    token = encode_user_token(user.user_id)
-    auth_user_schema = AuthUserSchema()
+    if rehashed:
+        # Stored with an older KDF or cost; upgrade it while we have the password
+        user.password_hash = rehashed
+        db.session.commit()
+
+    token = encode_user_token(user.user_id, [role.name for role in user.roles], user.role_version)
     return jsonify({
         "token": token,
-        "user": auth_user_schema.dump(user)
+        "user": auth_user_serializer.dump(user)
     }), 200
 
 @auth_bp.route("/logout", methods=["POST"])
-def logout_user():
+@user_token_required
+def logout_user(user_id):
     """
-    Logout user (JWT tokens are stateless, so this is handled client-side)
-    This endpoint exists for consistency but doesn't need to do server-side token invalidation
+    Logout user by revoking the token the request was made with
+    Other tokens of the user stay valid
     """
+    current_revocation_list().revoke_token(g.identity)
     return jsonify({"message": "Logout successful"}), 200
 
 @auth_bp.route("/forgot-password", methods=["POST"])
@@ -115,10 +126,12 @@ def reset_password():
         # For now, we'll accept any token (NOT secure for production)
         
         # Update password
-        user.password_hash = generate_password_hash(new_password)
+        user.password_hash = hash_password(new_password)
         db.session.commit()
         
         return jsonify({"message": "Password has been reset successfully"}), 200
         
+    except HashingOverloaded:
+        raise
     except Exception as e:
         return jsonify({"error": "An error occurred processing your request"}), 500
\ No newline at end of file
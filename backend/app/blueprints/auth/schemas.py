@@ -1,6 +1,7 @@
 from app.extensions import ma
 from app.models import User, Location
 from marshmallow import fields
+from app.utils.serializers import compile_schema
 
 
 class AuthLocationSchema(ma.Schema):
@@ -54,4 +55,7 @@ class AuthUserSchema(ma.Schema):
 class AuthResponseSchema(ma.Schema):
     """Complete auth response schema matching frontend expectations"""
     token = fields.Str()
-    user = fields.Nested(AuthUserSchema) 
\ No newline at end of file
+    user = fields.Nested(AuthUserSchema)
+
+
+auth_user_serializer = compile_schema(AuthUserSchema())
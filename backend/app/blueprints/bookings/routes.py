@@ -6,6 +6,8 @@ from marshmallow import ValidationError
 from . import bookings_bp
 from datetime import datetime
 from app.utils.util import user_token_required, admin_token_required
+from app.utils.pagination import pagination_args, keyset_paginate, InvalidCursor
+from app.utils.export import ndjson_export, InvalidExportFilter
 from app.extensions import limiter
 
 # ========================================
@@ -68,25 +70,14 @@ def create_booking(user_id):
 @user_token_required
 def get_my_bookings(user_id):
     """Get bookings for the authenticated user"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 20, type=int), 100)
+    page_request = pagination_args()
     
     query = select(Booking).where(Booking.user_id == user_id)
-    total = db.session.execute(
-        select(db.func.count(Booking.booking_id)).where(Booking.user_id == user_id)
-    ).scalar()
-    
-    offset = (page - 1) * per_page
-    bookings = db.session.execute(query.offset(offset).limit(per_page)).scalars().all()
-    
-    pagination_info = {
-        'page': page,
-        'per_page': per_page,
-        'total': total,
-        'total_pages': (total + per_page - 1) // per_page,
-        'has_prev': page > 1,
-        'has_next': page * per_page < total
-    }
+
+    try:
+        bookings, pagination_info = keyset_paginate(query, [Booking.booking_id], page_request)
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
     
     return jsonify({
         'bookings': bookings_schema.dump(bookings),
@@ -97,26 +88,15 @@ def get_my_bookings(user_id):
 @user_token_required
 def get_my_listings_bookings(user_id):
     """Get bookings for listings owned by the authenticated user"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 20, type=int), 100)
+    page_request = pagination_args()
     
     # Join with Listing to find bookings for user's listings
     query = select(Booking).join(Listing).where(Listing.owner_id == user_id)
-    total = db.session.execute(
-        select(db.func.count(Booking.booking_id)).join(Listing).where(Listing.owner_id == user_id)
-    ).scalar()
-    
-    offset = (page - 1) * per_page
-    bookings = db.session.execute(query.offset(offset).limit(per_page)).scalars().all()
-    
-    pagination_info = {
-        'page': page,
-        'per_page': per_page,
-        'total': total,
-        'total_pages': (total + per_page - 1) // per_page,
-        'has_prev': page > 1,
-        'has_next': page * per_page < total
-    }
+
+    try:
+        bookings, pagination_info = keyset_paginate(query, [Booking.booking_id], page_request)
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
     
     return jsonify({
         'bookings': bookings_schema.dump(bookings),
@@ -189,29 +169,30 @@ def cancel_booking(user_id, booking_id):
 @admin_token_required
 def get_all_bookings(user_id):
     """Admin: Get all bookings with pagination"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 20, type=int), 100)
+    page_request = pagination_args()
     
     query = select(Booking)
-    total = db.session.execute(select(db.func.count(Booking.booking_id))).scalar()
-    
-    offset = (page - 1) * per_page
-    bookings = db.session.execute(query.offset(offset).limit(per_page)).scalars().all()
-    
-    pagination_info = {
-        'page': page,
-        'per_page': per_page,
-        'total': total,
-        'total_pages': (total + per_page - 1) // per_page,
-        'has_prev': page > 1,
-        'has_next': page * per_page < total
-    }
+
+    try:
+        bookings, pagination_info = keyset_paginate(query, [Booking.booking_id], page_request)
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
     
     return jsonify({
         'bookings': bookings_schema.dump(bookings),
         'pagination': pagination_info
     }), 200
 
+@bookings_bp.route("/export", methods=["GET"])
+@admin_token_required
+@limiter.limit("10 per minute")
+def export_bookings(user_id):
+    """Admin: Stream all bookings as newline-delimited JSON (?updated_since= for incremental exports)"""
+    try:
+        return ndjson_export(select(Booking.__table__), Booking.updated_at, Booking.booking_id)
+    except InvalidExportFilter as e:
+        return jsonify({"error": str(e)}), 400
+
 @bookings_bp.route("/admin/<int:booking_id>", methods=["DELETE"])
 @admin_token_required
 @limiter.limit("10 per minute")
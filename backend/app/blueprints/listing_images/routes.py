@@ -12,7 +12,7 @@ from app.blueprints.listing_images.schemas import (
 )
 from app.blueprints.listing_images import listing_images_bp
 from app.utils.util import user_token_required
-from app.extensions import limiter
+from app.extensions import limiter, tagged_cache
 
 # ========================================
 # PUBLIC ROUTES (No Authentication Required)
@@ -101,6 +101,7 @@ def add_images_to_listing(user_id, listing_id):
 
     db.session.add(image)
     db.session.commit()
+    tagged_cache.bump(f'listing:{listing_id}')
 
     return image_schema.jsonify(image), 201
 
@@ -164,6 +165,7 @@ def add_bulk_images_to_listing(user_id, listing_id):
         created_images.append(image)
 
     db.session.commit()
+    tagged_cache.bump(f'listing:{listing_id}')
 
     return jsonify({
         'message': f'{len(created_images)} images added successfully',
@@ -225,6 +227,7 @@ def update_image(user_id, image_id):
         image.is_primary = new_is_primary
 
     db.session.commit()
+    tagged_cache.bump(f'listing:{image.listing_id}')
     return image_schema.jsonify(image), 200
 
 @listing_images_bp.route('/images/<int:image_id>', methods=['DELETE'])
@@ -264,6 +267,7 @@ def delete_image(user_id, image_id):
             other_image.is_primary = True
 
     db.session.commit()
+    tagged_cache.bump(f'listing:{listing_id}')
     return jsonify({"message": "Image deleted successfully"}), 200
 
 @listing_images_bp.route('/images/<int:image_id>/set-primary', methods=['PUT'])
@@ -296,6 +300,7 @@ def set_primary_image(user_id, image_id):
     # Set this image as primary
     image.is_primary = True
     db.session.commit()
+    tagged_cache.bump(f'listing:{image.listing_id}')
 
     return image_schema.jsonify(image), 200
 
@@ -0,0 +1,147 @@
+import hashlib
+import json
+from array import array
+
+from werkzeug.datastructures import MultiDict
+
+from app.extensions import tagged_cache, add_cache_tags
+from app.blueprints.listings.frontend_schemas import listing_fieldset, InvalidFieldset
+from app.utils.geo import covering_cells
+
+# Cached listing responses are invalidated through tags, so they can live long
+LISTING_CACHE_TIMEOUT = 6 * 60 * 60
+
+# Tag for responses that may change whenever any listing changes
+ALL_LISTINGS_TAG = 'listings:all'
+
+# Ranked result sets are shared by the pages of one search for a short while
+RESULT_SET_TIMEOUT = 2 * 60
+
+
+def listing_cache_args(args):
+    """
+    Query arguments a single listing's cache key varies on: ?fields= in
+    schema order, so equivalent field lists (and get_listings_batch) share
+    one entry per listing and fieldset.
+    """
+    try:
+        fieldset = listing_fieldset(args.get('fields'))
+    except InvalidFieldset:
+        # Answered with a 400, which isn't cached
+        return args
+    return MultiDict({'fields': ','.join(fieldset)}) if fieldset else None
+
+
+def geo_tags_for_geohash(geohash):
+    """Tags for every geohash prefix of a location, matching any query cell size"""
+    if not geohash:
+        return set()
+    return {f'geo:{geohash[:length]}' for length in range(1, len(geohash) + 1)}
+
+
+def listing_tags(listing):
+    """Tags a write to this listing must bump"""
+    tags = {ALL_LISTINGS_TAG, f'listing:{listing.listing_id}', f'owner:{listing.owner_id}'}
+    if listing.subcategory_id:
+        tags.add(f'subcategory:{listing.subcategory_id}')
+        if listing.subcategory:
+            tags.add(f'category:{listing.subcategory.category_id}')
+    if listing.location:
+        tags |= geo_tags_for_geohash(listing.location.geohash)
+    return tags
+
+
+def invalidate_listing(*tag_sets):
+    """
+    Bump the tags of a listing after a write.
+
+    Pass the tags captured before the write as well as after it, so responses
+    for the old category, owner or area are invalidated too.
+    """
+    tagged_cache.bump(*set().union(*tag_sets))
+
+
+def listing_result_tags(listing):
+    """Tags a cached response showing this listing depends on"""
+    return {f'listing:{listing.listing_id}', f'owner:{listing.owner_id}'}
+
+
+def tag_listing_results(listings):
+    """
+    Declare dependencies of a cached response on the listings it returns.
+
+    This runs after the listings were read, so it only guards against later
+    writes; writes racing the read are caught by the scope tags declared
+    before it, which every listing write bumps.
+    """
+    add_cache_tags(*set().union(*(listing_result_tags(listing) for listing in listings)))
+
+
+def tag_listing_query_scope(category_id=None, subcategory_id=None, lat=None, lng=None, radius=None):
+    """
+    Declare which new or changed listings could alter a cached query's results.
+
+    Queries narrowed to a category, subcategory or area only depend on writes
+    inside that scope; anything broader depends on every listing write.
+
+    Returns:
+        set: The declared tags, for caching derived data on the same scope.
+    """
+    tags = {ALL_LISTINGS_TAG}
+    if lat is not None and lng is not None and (cells := covering_cells(lat, lng, radius)):
+        tags = {f'geo:{cell}' for cell in cells}
+    elif subcategory_id:
+        tags = {f'subcategory:{subcategory_id}'}
+    elif category_id:
+        tags = {f'category:{category_id}'}
+
+    add_cache_tags(*tags)
+    return tags
+
+
+def result_set_key(**params):
+    """Cache key of a ranked result set; absent filters and search spacing/case don't matter"""
+    normalized = {name: value for name, value in params.items() if value is not None}
+    if 'search' in normalized:
+        normalized['search'] = ' '.join(normalized['search'].lower().split())
+    digest = hashlib.sha1(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+    return f'results:{digest}'
+
+
+def cached_ranked_results(cache_key, scope_tags, rank):
+    """
+    Ranked listing IDs of a search, shared by all of its pages.
+
+    The first page ranks every match with rank() and stores the IDs (and
+    distances, for radius searches) as packed arrays under cache_key with the
+    versions of the query's scope tags. Later pages only slice that array, so
+    paging costs a cache read plus hydrating one page of rows. A listing
+    write in the scope bumps a tag and the next page ranks again; otherwise
+    the set expires after RESULT_SET_TIMEOUT.
+
+    Args:
+        cache_key (str): From result_set_key() over every filter of the query.
+        scope_tags (set): From tag_listing_query_scope().
+        rank: Callable returning listing IDs, or (listing_id, distance_km) pairs.
+
+    Returns:
+        list: What rank() returns, possibly from the cache.
+    """
+    entry = tagged_cache.cache.get(cache_key)
+    if entry is not None and tagged_cache.is_fresh(entry['tags']):
+        ids = array('q', entry['ids']).tolist()
+        if entry['distances'] is None:
+            return ids
+        return list(zip(ids, array('d', entry['distances']).tolist()))
+
+    # Versions are read before ranking, so a write racing it invalidates the entry
+    versions = tagged_cache.versions(scope_tags)
+    ranked = rank()
+    with_distances = bool(ranked) and isinstance(ranked[0], tuple)
+    ids = [item[0] for item in ranked] if with_distances else ranked
+    tagged_cache.cache.set(cache_key, {
+        'ids': array('q', ids).tobytes(),
+        'distances': array('d', [item[1] for item in ranked]).tobytes() if with_distances else None,
+        'tags': versions,
+    }, timeout=RESULT_SET_TIMEOUT)
+    return ranked
@@ -0,0 +1,335 @@
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import select, func
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.extensions import tagged_cache
+from app.models import db, Listing, Subcategory, Location, ListingChange, prune_listing_changes
+from app.blueprints.listings.caching import ALL_LISTINGS_TAG
+from app.utils.geo import bounding_box, rank_ids_by_distance
+from app.utils.pagination import encode_cursor, decode_cursor, InvalidCursor
+
+# Sort orders served from the catalog: (column, ...) all ascending or all descending
+SORT_KEYS = {
+    None: (('listing_id',), False),
+    'rating': (('rating_avg', 'listing_id'), True),
+    'newest': (('created_at', 'listing_id'), True),
+}
+
+_MISSING_ID = -1
+
+
+def init_listing_catalog(app):
+    """
+    Attach an in-memory listing catalog to the app when LISTING_CATALOG_ENABLED
+    is set, and build it right away so the first browse request doesn't pay
+    for the load. If the tables don't exist yet it is built on first use.
+    """
+    if not app.config.get('LISTING_CATALOG_ENABLED'):
+        return
+
+    catalog = app.extensions['listing_catalog'] = ListingCatalog(
+        refresh_interval=app.config.get('LISTING_CATALOG_REFRESH_INTERVAL', 2.0),
+        retention=app.config.get('LISTING_CATALOG_CHANGE_RETENTION', 24 * 60 * 60),
+    )
+    with app.app_context():
+        try:
+            catalog.columns
+        except SQLAlchemyError:
+            db.session.rollback()
+        finally:
+            db.session.remove()
+
+
+def current_listing_catalog():
+    """The current app's catalog, or None when it is disabled"""
+    return current_app.extensions.get('listing_catalog')
+
+
+class ListingCatalog:
+    """
+    Read-only columnar copy of the listing fields used to filter and sort the
+    public browse path, held as NumPy arrays ordered by listing_id.
+
+    Filters become vectorized masks and sorting a partial sort over the
+    matching rows, so a browse request only touches the database to hydrate
+    its final page. The arrays are built on first use and then refreshed from the
+    listing_changes feed at most every `refresh_interval` seconds; each worker
+    keeps its own copy. A worker that was idle for longer than the feed's
+    retention, or finds the feed's ids below its position, rebuilds from
+    scratch.
+
+    A listing write bumps ALL_LISTINGS_TAG, and responses built from the
+    catalog are cached under that tag's new version, so the feed is also
+    applied right away whenever the tag has moved since the last catch-up;
+    otherwise a page from arrays up to `refresh_interval` old would be cached
+    as current.
+    """
+
+    def __init__(self, refresh_interval=2.0, retention=24 * 60 * 60):
+        self.refresh_interval = refresh_interval
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._columns = None
+        self._last_change_id = 0
+        self._last_refresh = 0.0
+        self._last_prune = None
+        self._synced_version = None
+
+    # ---------------------------------------------------------------------
+    # Loading and refresh
+    # ---------------------------------------------------------------------
+
+    @property
+    def columns(self):
+        """Current arrays, refreshed from the change feed if they are due or a listing write was announced"""
+        # Read before the feed: a write committed before its bump is then always in the feed read below
+        version = tagged_cache.versions([ALL_LISTINGS_TAG])[ALL_LISTINGS_TAG]
+        if (self._columns is None or version != self._synced_version
+                or time.monotonic() - self._last_refresh >= self.refresh_interval):
+            with self._lock:
+                elapsed = time.monotonic() - self._last_refresh
+                if self._columns is None or elapsed >= self.retention:
+                    self._rebuild()
+                elif elapsed >= self.refresh_interval or version != self._synced_version:
+                    self._apply_changes()
+                self._synced_version = version
+                if self._last_prune is None or time.monotonic() - self._last_prune >= self.retention:
+                    prune_listing_changes(self.retention)
+                    self._last_prune = time.monotonic()
+        return self._columns
+
+    def _rebuild(self):
+        # Read the feed position first: changes racing the load are replayed, which is harmless
+        self._last_change_id = db.session.execute(select(func.max(ListingChange.change_id))).scalar() or 0
+        self._columns = self._load()
+        self._last_refresh = time.monotonic()
+
+    def _apply_changes(self):
+        highest_id = db.session.execute(select(func.max(ListingChange.change_id))).scalar() or 0
+        if highest_id < self._last_change_id:
+            # The feed was pruned empty and its ids handed out again (SQLite without AUTOINCREMENT)
+            self._rebuild()
+            return
+
+        changes = db.session.execute(
+            select(ListingChange.change_id, ListingChange.listing_id)
+            .where(ListingChange.change_id > self._last_change_id)
+            .order_by(ListingChange.change_id)
+        ).all()
+        self._last_refresh = time.monotonic()
+        if not changes:
+            return
+
+        changed_ids = sorted({listing_id for _, listing_id in changes})
+        current = self._columns
+        keep = ~np.isin(current['listing_id'], changed_ids)
+        fresh = self._load(changed_ids)
+
+        merged = {name: np.concatenate([values[keep], fresh[name]]) for name, values in current.items()}
+        order = np.argsort(merged['listing_id'], kind='stable')
+        self._columns = {name: values[order] for name, values in merged.items()}
+        self._last_change_id = changes[-1].change_id
+
+    def _load(self, listing_ids=None):
+        query = select(
+            Listing.listing_id, Listing.price, Listing.subcategory_id, Subcategory.category_id,
+            Listing.rating_avg, Location.latitude, Location.longitude, Listing.created_at
+        ).outerjoin(
+            Subcategory, Subcategory.subcategory_id == Listing.subcategory_id
+        ).outerjoin(
+            Location, Location.location_id == Listing.location_id
+        ).order_by(Listing.listing_id)
+        if listing_ids is not None:
+            query = query.where(Listing.listing_id.in_(listing_ids))
+
+        rows = db.session.execute(query).all()
+        ids, prices, subcategories, categories, ratings, lats, lngs, created = (
+            list(column) for column in zip(*rows)
+        ) if rows else ([],) * 8
+
+        def ints(values):
+            return np.array([_MISSING_ID if value is None else value for value in values], dtype=np.int64)
+
+        return {
+            'listing_id': np.array(ids, dtype=np.int64),
+            'price': ints(prices),
+            'subcategory_id': ints(subcategories),
+            'category_id': ints(categories),
+            'rating_avg': np.array(ratings, dtype=np.float64),
+            'lat': np.array(lats, dtype=np.float64),
+            'lng': np.array(lngs, dtype=np.float64),
+            # Microseconds since the epoch: NumPy sorts int64 far faster than datetime64
+            'created_at': np.array(created, dtype='datetime64[us]').view(np.int64),
+        }
+
+    # ---------------------------------------------------------------------
+    # Queries
+    # ---------------------------------------------------------------------
+
+    def _mask(self, columns, category_id=None, subcategory_id=None, min_price=None, max_price=None,
+              min_rating=None):
+        mask = np.ones(len(columns['listing_id']), dtype=bool)
+        if category_id:
+            mask &= columns['category_id'] == category_id
+        if subcategory_id:
+            mask &= columns['subcategory_id'] == subcategory_id
+        if min_price is not None:
+            mask &= columns['price'] >= min_price
+        if max_price is not None:
+            mask &= columns['price'] <= max_price
+        if min_rating is not None:
+            mask &= columns['rating_avg'] >= min_rating
+        return mask
+
+    def nearby(self, lat, lng, radius_km, **filters):
+        """
+        Listings matching the filters within radius_km of a point.
+
+        Returns:
+            list: (listing_id, distance_km) tuples, closest first.
+        """
+        columns = self.columns
+        mask = self._mask(columns, **filters)
+
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+        mask &= (columns['lat'] >= min_lat) & (columns['lat'] <= max_lat)
+        if min_lng is not None:
+            mask &= (columns['lng'] >= min_lng) & (columns['lng'] <= max_lng)
+
+        positions = np.flatnonzero(mask)
+        return rank_ids_by_distance(
+            columns['listing_id'][positions], columns['lat'][positions], columns['lng'][positions],
+            lat, lng, radius_km
+        )
+
+    def page(self, sort, page_request, **filters):
+        """
+        One page of listing IDs matching the filters in the given sort order.
+
+        Cursors are interchangeable with keyset_paginate over the same order,
+        so clients can page across a catalog refresh or a fallback to SQL.
+
+        Returns:
+            tuple: (page_ids, pagination_info)
+
+        Raises:
+            InvalidCursor: If the cursor is malformed.
+        """
+        key_names, descending = SORT_KEYS[sort]
+        columns = self.columns
+        positions = np.flatnonzero(self._mask(columns, **filters))
+        keys = [columns[name][positions] for name in key_names]
+        total = len(positions)
+        per_page = page_request.per_page
+        backward = False
+        legacy_page = None
+
+        if page_request.cursor:
+            payload = decode_cursor(page_request.cursor)
+            values = payload.get('k')
+            if not isinstance(values, list) or len(values) != len(keys):
+                raise InvalidCursor('Invalid cursor')
+            values = [_to_array_value(value) for value in values]
+            backward = bool(payload.get('b'))
+            if backward:
+                # The rows just before the cursor are the first ones in reverse order
+                before = ~_after(keys, values, descending) & ~_equal(keys, values)
+                selected = _first(keys, np.flatnonzero(before), not descending, per_page + 1)[::-1]
+                has_more = len(selected) > per_page
+                selected = selected[-per_page:]
+            else:
+                after = _after(keys, values, descending)
+                selected = _first(keys, np.flatnonzero(after), descending, per_page + 1)
+                has_more = len(selected) > per_page
+                selected = selected[:per_page]
+        else:
+            offset = 0
+            if page_request.page and page_request.page > 1:
+                legacy_page = page_request.page
+                offset = (legacy_page - 1) * per_page
+            selected = _first(keys, np.arange(total), descending, offset + per_page + 1)[offset:]
+            has_more = len(selected) > per_page
+            selected = selected[:per_page]
+
+        if backward:
+            has_next, has_prev = True, has_more
+        else:
+            has_next, has_prev = has_more, bool(page_request.cursor or legacy_page)
+
+        def cursor_for(index, to_previous):
+            payload = {'k': [_to_cursor_value(name, values[index]) for name, values in zip(key_names, keys)]}
+            if to_previous:
+                payload['b'] = 1
+            return encode_cursor(payload)
+
+        has_items = len(selected) > 0
+        pagination_info = {
+            'per_page': per_page,
+            'has_next': has_next,
+            'has_prev': has_prev,
+            'next_cursor': cursor_for(selected[-1], False) if has_next and has_items else None,
+            'prev_cursor': cursor_for(selected[0], True) if has_prev and has_items else None
+        }
+        if legacy_page:
+            pagination_info['page'] = legacy_page
+        if page_request.include_total:
+            pagination_info['total'] = total
+            pagination_info['total_pages'] = (total + per_page - 1) // per_page
+
+        id_position = key_names.index('listing_id')
+        return keys[id_position][selected].tolist(), pagination_info
+
+
+def _first(keys, candidates, descending, count):
+    """
+    The first `count` candidate rows in sort order.
+
+    Only rows that can make the cut on the leading key (found with a partial
+    sort) are fully sorted, so a page costs O(n) rather than O(n log n).
+    """
+    primary = keys[0][candidates]
+    if len(candidates) > count:
+        if descending:
+            cutoff = np.partition(primary, len(primary) - count)[len(primary) - count]
+            candidates = candidates[primary >= cutoff]
+        else:
+            cutoff = np.partition(primary, count - 1)[count - 1]
+            candidates = candidates[primary <= cutoff]
+
+    order = np.lexsort(tuple(values[candidates] for values in reversed(keys)))
+    if descending:
+        order = order[::-1]
+    return candidates[order][:count]
+
+
+def _after(keys, values, descending):
+    """Mask of sorted rows strictly after the cursor values in sort order"""
+    after = np.zeros(len(keys[0]), dtype=bool)
+    equal_prefix = np.ones(len(keys[0]), dtype=bool)
+    for column, value in zip(keys, values):
+        comparison = column < value if descending else column > value
+        after |= equal_prefix & comparison
+        equal_prefix &= column == value
+    return after
+
+
+def _equal(keys, values):
+    equal = np.ones(len(keys[0]), dtype=bool)
+    for column, value in zip(keys, values):
+        equal &= column == value
+    return equal
+
+
+def _to_array_value(value):
+    return np.datetime64(value, 'us').astype(np.int64) if isinstance(value, datetime) else value
+
+
+def _to_cursor_value(name, value):
+    if name == 'created_at':
+        return value.astype('datetime64[us]').item()
+    return value.item()
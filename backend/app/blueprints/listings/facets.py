@@ -0,0 +1,133 @@
+from flask import request
+from sqlalchemy import select, func, case, literal, cast, String, union_all
+from app.models import Listing, Subcategory, Category, Location, Amenity, listing_amenities, db
+
+# Lower edges of the price histogram buckets; the last bucket is open-ended
+PRICE_BUCKETS = (0, 25, 50, 100, 250, 500, 1000)
+
+# Facets are counted over at most this many matching listings so the grouped
+# pass stays within its latency budget on very broad queries (e.g. no filters
+# at 1M listings); beyond it counts cover a prefix and are flagged approximate
+FACET_ROW_LIMIT = 25_000
+
+# Listing IDs passed inline for already ranked result sets (nearby searches)
+FACET_ID_LIMIT = 10_000
+
+
+def facets_requested():
+    """Whether the current request asked for facets (?facets=true)"""
+    return request.args.get('facets', '').lower() in ('1', 'true', 'yes')
+
+
+def _price_bucket():
+    return case(
+        *[(Listing.price >= edge, literal(index)) for index, edge in reversed(list(enumerate(PRICE_BUCKETS)))],
+        else_=literal(0)
+    )
+
+
+def listing_facets(query=None, listing_ids=None):
+    """
+    Counts the filtered listings per category, subcategory, price bucket,
+    city and amenity in a single statement.
+
+    The matching IDs are collected once into a CTE together with the columns
+    the facets group on, and each facet is a GROUP BY branch of one UNION ALL
+    over it, so the filter runs once however many facets there are.
+
+    Args:
+        query: The filtered select of listings (joins and WHERE clauses applied).
+        listing_ids (list): Already filtered IDs, used instead of query.
+
+    Returns:
+        dict: categories, subcategories, price, cities and amenities counts,
+        plus total and whether the counts are approximate.
+    """
+    if listing_ids is not None:
+        approximate = len(listing_ids) > FACET_ID_LIMIT
+        ids = select(Listing.listing_id).where(Listing.listing_id.in_(listing_ids[:FACET_ID_LIMIT]))
+    else:
+        approximate = False
+        ids = query.with_only_columns(Listing.listing_id).order_by(None).limit(FACET_ROW_LIMIT)
+    ids = ids.cte('facet_ids')
+
+    rows = select(
+        Listing.listing_id,
+        Listing.subcategory_id,
+        Subcategory.category_id,
+        Location.city,
+        _price_bucket().label('price_bucket'),
+    ).select_from(ids).join(
+        Listing, Listing.listing_id == ids.c.listing_id
+    ).outerjoin(
+        Subcategory, Subcategory.subcategory_id == Listing.subcategory_id
+    ).outerjoin(
+        Location, Location.location_id == Listing.location_id
+    ).cte('facet_rows').prefix_with('MATERIALIZED', dialect='sqlite')
+
+    def branch(facet, key, names=None, joins=()):
+        # Group on the bare key, then attach names to the few grouped rows only
+        counts = select(key.label('key'), func.count().label('count')).select_from(rows)
+        for target, onclause in joins:
+            counts = counts.join(target, onclause)
+        counts = counts.group_by(key).subquery()
+
+        label = literal(None)
+        statement = select(counts)
+        if names is not None:
+            name_table, name_key, name_column = names
+            label = name_column
+            statement = statement.outerjoin(name_table, name_key == counts.c.key)
+        return statement.with_only_columns(
+            literal(facet).label('facet'),
+            cast(counts.c.key, String).label('key'),
+            label.label('label'),
+            counts.c.count,
+        )
+
+    statement = union_all(
+        select(literal('total'), literal(None), literal(None), func.count()).select_from(rows),
+        branch('category', rows.c.category_id, (Category, Category.category_id, Category.name)),
+        branch('subcategory', rows.c.subcategory_id, (Subcategory, Subcategory.subcategory_id, Subcategory.name)),
+        branch('price', rows.c.price_bucket),
+        branch('city', rows.c.city),
+        branch(
+            'amenity', listing_amenities.c.amenity_id, (Amenity, Amenity.amenity_id, Amenity.name),
+            joins=[(listing_amenities, listing_amenities.c.listing_id == rows.c.listing_id)],
+        ),
+    )
+
+    facets = {'categories': [], 'subcategories': [], 'price': [], 'cities': [], 'amenities': []}
+    total = 0
+    price_counts = {}
+
+    for facet, key, label, count in db.session.execute(statement):
+        if facet == 'total':
+            total = count
+        elif key is None:
+            continue
+        elif facet == 'category':
+            facets['categories'].append({'id': str(key), 'name': label, 'count': count})
+        elif facet == 'subcategory':
+            facets['subcategories'].append({'id': str(key), 'name': label, 'count': count})
+        elif facet == 'amenity':
+            facets['amenities'].append({'id': str(key), 'name': label, 'count': count})
+        elif facet == 'city':
+            facets['cities'].append({'name': key, 'count': count})
+        elif facet == 'price':
+            price_counts[int(key)] = count
+
+    for name in ('categories', 'subcategories', 'cities', 'amenities'):
+        facets[name].sort(key=lambda entry: (-entry['count'], entry.get('name') or ''))
+
+    facets['price'] = [
+        {
+            'min': edge,
+            'max': PRICE_BUCKETS[index + 1] if index + 1 < len(PRICE_BUCKETS) else None,
+            'count': price_counts.get(index, 0)
+        }
+        for index, edge in enumerate(PRICE_BUCKETS)
+    ]
+    facets['total'] = total
+    facets['approximate'] = approximate or (listing_ids is None and total >= FACET_ROW_LIMIT)
+    return facets
@@ -1,7 +1,10 @@
 from app.extensions import ma
-from app.models import Listing, User
+from functools import lru_cache
+from app.models import Listing, User, Subcategory, Category, Location, Image
 from marshmallow import fields
 from sqlalchemy import func
+from sqlalchemy.orm import joinedload, selectinload, load_only
+from app.utils.serializers import compile_schema
 
 
 class FrontendLocationSchema(ma.Schema):
@@ -42,8 +45,7 @@ class FrontendOwnerSchema(ma.Schema):
         return "https://images.pexels.com/photos/1040880/pexels-photo-1040880.jpeg"
     
     def get_owner_rating(self, obj):
-        # TODO: Calculate actual rating from reviews
-        return 4.8
+        return round(obj.owner_rating_avg, 1) if obj else None
 
 
 class FrontendListingSchema(ma.Schema):
@@ -59,6 +61,7 @@ class FrontendListingSchema(ma.Schema):
     availability = fields.Method("get_availability_dates")
     rating = fields.Method("get_listing_rating")
     reviews = fields.Method("get_reviews_count")
+    distance_km = fields.Float()  # Only set by nearby/radius searches
 
     def get_listing_id(self, obj):
         return str(obj.listing_id)
@@ -71,7 +74,7 @@ class FrontendListingSchema(ma.Schema):
     def get_image_urls(self, obj):
         # TODO: Return actual image URLs when images are properly stored
         if obj.images:
-            return [img.image_url for img in obj.images]
+            return [img.url for img in obj.images]
         # Return placeholder images based on category
         category_name = self.get_category_name(obj).lower()
         if "camera" in category_name or "photography" in category_name:
@@ -91,14 +94,15 @@ class FrontendListingSchema(ma.Schema):
                 owner = User.query.get(obj.owner) if isinstance(obj.owner, int) else obj.owner
             
             if owner:
-                schema = FrontendOwnerSchema()
-                return schema.dump(owner)
+                return frontend_owner_serializer.dump(owner)
         return None
     
     def get_location_info(self, obj):
         if obj.location:
-            schema = FrontendLocationSchema()
-            return schema.dump(obj.location)
+            location = frontend_location_serializer.dump(obj.location)
+            if getattr(obj, 'distance_km', None) is not None:
+                location['distance'] = obj.distance_km
+            return location
         return None
     
     def get_availability_dates(self, obj):
@@ -107,14 +111,125 @@ class FrontendListingSchema(ma.Schema):
         return ["2024-01-15", "2024-01-16", "2024-01-17"]
     
     def get_listing_rating(self, obj):
-        # TODO: Calculate actual rating from reviews
-        return 4.8
+        return round(obj.rating_avg, 1)
     
     def get_reviews_count(self, obj):
-        # TODO: Count actual reviews
-        return len(obj.reviews) if obj.reviews else 24
+        return obj.rating_count
+
+
+# Loading strategy matched to the relationships FrontendListingSchema reads:
+# many-to-one rows are joined in, collections come from one extra SELECT each
+FRONTEND_LISTING_LOAD_OPTIONS = (
+    joinedload(Listing.owner),
+    joinedload(Listing.subcategory).joinedload(Subcategory.category),
+    joinedload(Listing.location),
+    selectinload(Listing.images),
+)
+
+# Sparse fieldsets (?fields=id,title,...): the listing columns and related rows
+# each FrontendListingSchema field reads, so only those are selected and hydrated
+FRONTEND_FIELD_LOADS = {
+    'id': ((), ()),
+    'title': ((Listing.title,), ()),
+    'description': ((Listing.description,), ()),
+    'price': ((Listing.price,), ()),
+    'category': ((), ('subcategory',)),
+    'images': ((), ('subcategory', 'images')),  # Placeholder images depend on the category
+    'owner': ((), ('owner',)),
+    'location': ((), ('location',)),
+    'availability': ((), ()),
+    'rating': ((Listing.rating_avg,), ()),
+    'reviews': ((Listing.rating_count,), ()),
+    'distance_km': ((), ()),
+}
+
+FRONTEND_RELATION_LOADS = {
+    'subcategory': joinedload(Listing.subcategory).load_only(Subcategory.name)
+        .joinedload(Subcategory.category).load_only(Category.name),
+    'images': selectinload(Listing.images).load_only(Image.url),
+    'owner': joinedload(Listing.owner).load_only(
+        User.first_name, User.last_name, User.email, User.owner_rating_avg
+    ),
+    'location': joinedload(Listing.location).load_only(Location.latitude, Location.longitude),
+}
+
+
+class InvalidFieldset(ValueError):
+    """Raised when ?fields= names a field the listing schema doesn't have"""
+
+
+def listing_fieldset(value):
+    """
+    Parses a ?fields= value into FrontendListingSchema field names.
+
+    Returns:
+        tuple: The requested fields in schema order, or None for all fields.
+
+    Raises:
+        InvalidFieldset: If a field name is unknown.
+    """
+    if not value:
+        return None
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = requested - FRONTEND_FIELD_LOADS.keys()
+    if unknown:
+        raise InvalidFieldset(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(name for name in FRONTEND_FIELD_LOADS if name in requested) or None
+
+
+def frontend_listing_load_options(fieldset=None):
+    """Loader options for a fieldset: load_only on the listing plus the relationships it reads"""
+    if fieldset is None:
+        return FRONTEND_LISTING_LOAD_OPTIONS
+    return _fieldset_load_options(fieldset)
+
+
+@lru_cache(maxsize=None)
+def _fieldset_load_options(fieldset):
+    # owner_id is always needed to tag cached responses
+    columns = [Listing.owner_id]
+    relations = set()
+    for name in fieldset:
+        field_columns, field_relations = FRONTEND_FIELD_LOADS[name]
+        columns += [column for column in field_columns if column not in columns]
+        relations.update(field_relations)
+    return (load_only(*columns),) + tuple(
+        option for relation, option in FRONTEND_RELATION_LOADS.items() if relation in relations
+    )
 
 
 class FrontendListingsResponseSchema(ma.Schema):
     """Response schema that wraps listings in the format frontend expects"""
-    items = fields.List(fields.Nested(FrontendListingSchema)) 
\ No newline at end of file
+    items = fields.List(fields.Nested(FrontendListingSchema))
+    pagination = fields.Dict()
+    facets = fields.Dict()  # Only present when requested with ?facets=true 
+
+
+# Compiled once at import; same output as the schemas' dump() at a fraction of the cost
+frontend_location_serializer = compile_schema(FrontendLocationSchema())
+frontend_owner_serializer = compile_schema(FrontendOwnerSchema())
+frontend_listing_serializer = compile_schema(FrontendListingSchema())
+frontend_listings_response_serializer = compile_schema(FrontendListingsResponseSchema())
+
+
+def frontend_listing_serializer_for(fieldset=None):
+    """Compiled FrontendListingSchema limited to a fieldset"""
+    if fieldset is None:
+        return frontend_listing_serializer
+    return _fieldset_serializer(FrontendListingSchema, fieldset)
+
+
+def frontend_listings_response_serializer_for(fieldset=None):
+    """Compiled FrontendListingsResponseSchema with items limited to a fieldset"""
+    if fieldset is None:
+        return frontend_listings_response_serializer
+    return _fieldset_serializer(FrontendListingsResponseSchema, fieldset)
+
+
+@lru_cache(maxsize=None)
+def _fieldset_serializer(schema_class, fieldset):
+    if schema_class is FrontendListingsResponseSchema:
+        only = ('pagination', 'facets') + tuple(f'items.{name}' for name in fieldset)
+    else:
+        only = fieldset
+    return compile_schema(schema_class(only=only))
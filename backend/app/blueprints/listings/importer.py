@@ -0,0 +1,195 @@
+import csv
+import io
+from itertools import islice
+
+from marshmallow import ValidationError
+from sqlalchemy import select, insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.models import (
+    db, Listing, Location, Subcategory, Amenity, ListingFeature, listing_amenities, record_listing_changes
+)
+from app.utils.geo import geohash_encode
+from app.blueprints.listings.schemas import listing_create_schema
+from app.blueprints.listings.caching import ALL_LISTINGS_TAG, geo_tags_for_geohash, invalidate_listing
+
+# Rows validated and inserted per transaction
+IMPORT_CHUNK_SIZE = 500
+
+# Rows accepted per upload; anything beyond is reported as truncated
+MAX_IMPORT_ROWS = 10_000
+
+# Separators for the list columns of a CSV upload:
+#   amenity_ids: 1;4;7    features: voltage=18V;weight=2kg
+CSV_LIST_SEPARATOR = ';'
+CSV_FEATURE_SEPARATOR = '='
+
+
+def csv_rows(stream):
+    """
+    Reads listing rows from a CSV upload without buffering the whole file.
+
+    The header row names ListingCreateSchema fields; empty cells are left out
+    so optional fields get their defaults.
+    """
+    if not isinstance(stream, io.BufferedIOBase):
+        stream = io.BufferedReader(stream)
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    for record in reader:
+        row = {
+            key.strip(): value.strip() for key, value in record.items()
+            if key and isinstance(value, str) and value.strip()
+        }
+        if 'amenity_ids' in row:
+            row['amenity_ids'] = [part.strip() for part in row['amenity_ids'].split(CSV_LIST_SEPARATOR) if part.strip()]
+        if 'features' in row:
+            row['features'] = [
+                dict(zip(('key', 'value'), (piece.strip() for piece in part.split(CSV_FEATURE_SEPARATOR, 1))))
+                for part in row['features'].split(CSV_LIST_SEPARATOR) if part.strip()
+            ]
+        yield row
+
+
+def import_listings(rows, owner_id, chunk_size=IMPORT_CHUNK_SIZE, max_rows=MAX_IMPORT_ROWS):
+    """
+    Creates listings for an owner from an iterable of row dicts.
+
+    Rows are validated with ListingCreateSchema a chunk at a time (unknown
+    subcategories and amenities are row errors), then the chunk's locations,
+    listings, amenity links and features are written with one multi-row
+    INSERT each and committed together. A chunk that fails to
+    save is rolled back on its own, earlier chunks stay committed.
+
+    Args:
+        rows: Iterable of dicts in the create_listing request format.
+        owner_id (int): Owner of the new listings.
+
+    Returns:
+        dict: listing_ids created (in row order), per-row errors
+        ({'row': index, 'errors': messages}) and whether the upload was
+        truncated at max_rows.
+    """
+    result = {'listing_ids': [], 'errors': [], 'truncated': False}
+    rows = iter(rows)
+    offset = 0
+
+    while True:
+        if offset >= max_rows:
+            result['truncated'] = next(rows, None) is not None
+            break
+        try:
+            chunk = list(islice(rows, min(chunk_size, max_rows - offset)))
+        except (csv.Error, ValueError) as e:
+            result['errors'].append({'row': offset, 'errors': {'_schema': [f'Unreadable upload: {e}']}})
+            break
+        if not chunk:
+            break
+        _import_chunk(chunk, offset, owner_id, result)
+        offset += len(chunk)
+
+    result['errors'].sort(key=lambda error: error['row'])
+    return result
+
+
+def _insert_returning_ids(primary_key, rows):
+    """
+    Inserts rows into the primary key's table and returns their IDs in row
+    order: one INSERT ... RETURNING where the dialect can return executemany
+    rows in parameter order, one INSERT per row otherwise (e.g. MySQL).
+    """
+    table = primary_key.class_.__table__
+    if db.session.connection().dialect.insert_executemany_returning_sort_by_parameter_order:
+        statement = insert(table).returning(table.c[primary_key.key], sort_by_parameter_order=True)
+        return db.session.execute(statement, rows).scalars().all()
+    return [db.session.execute(insert(table).values(**row)).inserted_primary_key[0] for row in rows]
+
+
+def _import_chunk(chunk, offset, owner_id, result):
+    try:
+        loaded, errors = listing_create_schema.load(chunk, many=True), {}
+    except ValidationError as e:
+        loaded, errors = e.valid_data, e.messages
+
+    valid = [(offset + index, data) for index, data in enumerate(loaded) if index not in errors]
+    for index in sorted(errors):
+        result['errors'].append({'row': offset + index, 'errors': errors[index]})
+
+    categories = dict(db.session.execute(
+        select(Subcategory.subcategory_id, Subcategory.category_id)
+        .where(Subcategory.subcategory_id.in_({data['subcategory_id'] for _, data in valid}))
+    ).all())
+    known_amenities = set(db.session.execute(
+        select(Amenity.amenity_id)
+        .where(Amenity.amenity_id.in_({amenity_id for _, data in valid for amenity_id in data['amenity_ids']}))
+    ).scalars())
+
+    rows = []
+    for row, data in valid:
+        row_errors = {}
+        if data['subcategory_id'] not in categories:
+            row_errors['subcategory_id'] = ['Subcategory not found']
+        unknown_amenities = [amenity_id for amenity_id in dict.fromkeys(data['amenity_ids'])
+                             if amenity_id not in known_amenities]
+        if unknown_amenities:
+            row_errors['amenity_ids'] = [f"Amenity not found: {', '.join(map(str, unknown_amenities))}"]
+        if row_errors:
+            result['errors'].append({'row': row, 'errors': row_errors})
+        else:
+            rows.append((row, data))
+    if not rows:
+        return
+
+    locations = [
+        dict(
+            address=data['address'], city=data['city'], state=data['state'], country=data['country'],
+            zip_code=data['zip_code'], latitude=data.get('latitude'), longitude=data.get('longitude'),
+            # Bulk inserts skip mapper events, so set_location_geohash has to be done here
+            geohash=geohash_encode(data.get('latitude'), data.get('longitude'))
+        )
+        for _, data in rows
+    ]
+
+    try:
+        location_ids = _insert_returning_ids(Location.location_id, locations)
+        listing_ids = _insert_returning_ids(Listing.listing_id, [
+            dict(
+                title=data['title'], description=data.get('description', ''), price=data['price'],
+                subcategory_id=data['subcategory_id'], owner_id=owner_id, location_id=location_id
+            )
+            for (_, data), location_id in zip(rows, location_ids)
+        ])
+
+        amenity_links = [
+            {'listing_id': listing_id, 'amenity_id': amenity_id}
+            for (_, data), listing_id in zip(rows, listing_ids)
+            for amenity_id in dict.fromkeys(data['amenity_ids'])
+        ]
+        if amenity_links:
+            db.session.execute(insert(listing_amenities), amenity_links)
+
+        features = [
+            {'listing_id': listing_id, 'key': feature['key'], 'value': feature['value']}
+            for (_, data), listing_id in zip(rows, listing_ids)
+            for feature in data['features'] if 'key' in feature and 'value' in feature
+        ]
+        if features:
+            db.session.execute(insert(ListingFeature), features)
+
+        record_listing_changes(
+            db.session.connection(), select(Listing.listing_id).where(Listing.listing_id.in_(listing_ids))
+        )
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        for row, _ in rows:
+            result['errors'].append({'row': row, 'errors': {'_schema': ['Could not be saved']}})
+        return
+
+    result['listing_ids'] += listing_ids
+
+    tags = {ALL_LISTINGS_TAG, f'owner:{owner_id}'}
+    for (_, data), location in zip(rows, locations):
+        tags.add(f"subcategory:{data['subcategory_id']}")
+        tags.add(f"category:{categories[data['subcategory_id']]}")
+        tags |= geo_tags_for_geohash(location['geohash'])
+    invalidate_listing(tags)
@@ -0,0 +1,192 @@
+from collections import namedtuple
+
+from flask import request
+from sqlalchemy import select, func, or_, exists
+
+from app.models import db, Listing, Subcategory, Location
+from app.utils.geo import radius_prefilter, rank_by_distance
+from app.utils.search import build_match_expression, full_text_search_available, ranked_search_subquery
+
+# Radius used by location searches that don't pass one
+DEFAULT_RADIUS_KM = 10.0
+
+ListingFilters = namedtuple('ListingFilters', [
+    'category_id', 'subcategory_id', 'min_price', 'max_price', 'min_rating',
+    'city', 'state', 'zip_code', 'search', 'lat', 'lng', 'radius',
+], defaults=(None,) * 12)
+
+
+def listing_filter_args(*names):
+    """
+    Reads listing filters from the current request's query string.
+
+    Args:
+        names: Filters the endpoint supports; all of them if none are given.
+
+    Returns:
+        ListingFilters: Unsupported or absent filters are None, and radius is
+        only set (defaulting to DEFAULT_RADIUS_KM) when lat and lng are.
+    """
+    args = request.args
+    values = dict(
+        category_id=args.get('category_id', type=int),
+        subcategory_id=args.get('subcategory_id', type=int),
+        min_price=args.get('min_price', type=int),
+        max_price=args.get('max_price', type=int),
+        min_rating=args.get('min_rating', type=float),
+        city=args.get('city') or None,
+        state=args.get('state') or None,
+        zip_code=args.get('zip_code') or None,
+        search=args.get('search') or None,
+        lat=args.get('lat', type=float),
+        lng=args.get('lng', type=float),
+    )
+    if names:
+        values = {name: value if name in names else None for name, value in values.items()}
+    if values['lat'] is not None and values['lng'] is not None:
+        values['radius'] = args.get('radius', type=float, default=DEFAULT_RADIUS_KM)
+    return ListingFilters(**values)
+
+
+class ListingQuery:
+    """
+    Listing filters composed into SELECT, COUNT and EXISTS statements.
+
+    Every related table is joined at most once whatever the combination of
+    filters, in a fixed order, and filter values only ever appear as bound
+    parameters. Each combination therefore has one statement shape, which
+    SQLAlchemy compiles once per process and reuses from its statement cache
+    on later requests. The select variants are plain Select objects so the
+    paginators, facets and loaders can keep composing on them.
+    """
+
+    def __init__(self, filters):
+        self.filters = filters
+        self.search_matches = None
+        self._join_subcategory = False
+        self._join_location = False
+        self._criteria = []
+        self._compose()
+
+    def _compose(self):
+        f = self.filters
+
+        if f.category_id:
+            self._join_subcategory = True
+            self._criteria.append(Subcategory.category_id == f.category_id)
+        if f.subcategory_id:
+            self._criteria.append(Listing.subcategory_id == f.subcategory_id)
+        if f.min_price is not None:
+            self._criteria.append(Listing.price >= f.min_price)
+        if f.max_price is not None:
+            self._criteria.append(Listing.price <= f.max_price)
+        if f.min_rating is not None:
+            self._criteria.append(Listing.rating_avg >= f.min_rating)
+
+        for column, value in ((Location.city, f.city), (Location.state, f.state), (Location.zip_code, f.zip_code)):
+            if value:
+                self._join_location = True
+                self._criteria.append(column.like(f'%{value.lower()}%'))
+
+        if f.search:
+            # BM25-ranked full-text index instead of leading-wildcard LIKE scans
+            match_expression = build_match_expression(f.search) if full_text_search_available(db.session) else None
+            if match_expression:
+                self.search_matches = ranked_search_subquery(match_expression)
+            else:
+                # Also for searches without a word to match ("-", "%%"), so both paths filter them alike
+                self._join_location = True
+                search_term = f'%{f.search.lower()}%'
+                self._criteria.append(or_(
+                    func.lower(Listing.title).like(search_term),
+                    func.lower(Listing.description).like(search_term),
+                    func.lower(Location.address).like(search_term),
+                    func.lower(Location.city).like(search_term),
+                    func.lower(Location.state).like(search_term),
+                    func.lower(Location.zip_code).like(search_term)
+                ))
+
+        if self.near is not None:
+            self._join_location = True
+            self._criteria.append(radius_prefilter(Location, f.lat, f.lng, f.radius))
+
+    # ---------------------------------------------------------------------
+    # Properties
+    # ---------------------------------------------------------------------
+
+    @property
+    def near(self):
+        """(lat, lng, radius_km) of a location search, or None"""
+        f = self.filters
+        if f.lat is None or f.lng is None:
+            return None
+        return f.lat, f.lng, f.radius if f.radius is not None else DEFAULT_RADIUS_KM
+
+    @property
+    def relevance_ranked(self):
+        """Whether results are ordered by full-text relevance"""
+        return self.search_matches is not None
+
+    @property
+    def catalog_filters(self):
+        """
+        Filters for the in-memory listing catalog, or None when the query has
+        text or address filters the catalog doesn't hold.
+        """
+        f = self.filters
+        if f.search or f.city or f.state or f.zip_code:
+            return None
+        return dict(
+            category_id=f.category_id, subcategory_id=f.subcategory_id,
+            min_price=f.min_price, max_price=f.max_price, min_rating=f.min_rating
+        )
+
+    # ---------------------------------------------------------------------
+    # Statements
+    # ---------------------------------------------------------------------
+
+    def _from(self, statement):
+        if self.search_matches is not None:
+            statement = statement.join(self.search_matches, self.search_matches.c.listing_id == Listing.listing_id)
+        if self._join_subcategory:
+            statement = statement.join(Listing.subcategory)
+        if self._join_location:
+            statement = statement.join(Listing.location)
+        return statement.where(*self._criteria)
+
+    def select(self, *columns):
+        """SELECT of listings (or the given columns), in relevance order when searching"""
+        statement = self._from(select(*(columns or (Listing,))).select_from(Listing))
+        if self.search_matches is not None:
+            statement = statement.order_by(self.search_matches.c.search_rank, Listing.listing_id)
+        return statement
+
+    def ids(self):
+        """SELECT of the matching listing IDs"""
+        return self.select(Listing.listing_id)
+
+    def count(self):
+        """SELECT COUNT(*) over the same joins and filters"""
+        return self._from(select(func.count()).select_from(Listing))
+
+    def exists(self):
+        """SELECT EXISTS over the same joins and filters"""
+        return select(exists(self._from(select(Listing.listing_id).select_from(Listing))))
+
+    # ---------------------------------------------------------------------
+    # Execution
+    # ---------------------------------------------------------------------
+
+    def rank_nearby(self):
+        """
+        (listing_id, distance_km) pairs within the radius, closest first: the
+        spatial index narrows candidates, exact distances are computed for
+        those only.
+        """
+        lat, lng, radius = self.near
+        candidates = db.session.execute(self.select(Listing.listing_id, Location.latitude, Location.longitude)).all()
+        return rank_by_distance(candidates, lat, lng, radius)
+
+    def ranked_ids(self):
+        """Matching listing IDs in relevance order"""
+        return db.session.execute(self.ids()).scalars().all()
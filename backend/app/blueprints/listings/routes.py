@@ -1,150 +1,205 @@
-from flask import request, jsonify
-from sqlalchemy import select, func, and_, or_, text
+import json
+from flask import request, jsonify, url_for, current_app
+from sqlalchemy import select, func, and_, or_, text, desc
 from marshmallow import ValidationError
 import math
 from app.models import Listing, Category, Subcategory, Location, Amenity, ListingFeature, User, db
 from app.blueprints.listings.schemas import (
-    listing_schema, listings_schema, listing_create_schema, listing_update_schema
+    listing_create_schema, listing_update_schema, listing_serializer, listings_serializer,
+    LISTING_SCHEMA_LOAD_OPTIONS
 )
 from app.blueprints.listings.frontend_schemas import (
-    FrontendListingsResponseSchema, FrontendListingSchema
+    frontend_listing_serializer, frontend_listing_serializer_for, frontend_listings_response_serializer_for,
+    frontend_listing_load_options, listing_fieldset, InvalidFieldset
 )
 from app.blueprints.listings import listings_bp
 from app.utils.util import user_token_required, admin_token_required
-from app.extensions import cache, limiter
+from app.utils.pagination import pagination_args, keyset_paginate, slice_paginate, InvalidCursor
+from app.utils.export import ndjson_export, InvalidExportFilter
+from app.blueprints.listings.facets import facets_requested, listing_facets
+from app.blueprints.listings.catalog import current_listing_catalog
+from app.blueprints.listings.importer import import_listings, csv_rows
+from app.blueprints.listings.query import ListingQuery, listing_filter_args
+from app.blueprints.listings.suggest import current_suggestion_index
+from app.blueprints.listings.caching import (
+    LISTING_CACHE_TIMEOUT, listing_tags, invalidate_listing, tag_listing_results, tag_listing_query_scope,
+    listing_result_tags, result_set_key, cached_ranked_results, listing_cache_args
+)
+from app.extensions import tagged_cache, add_cache_tags, limiter, conditional_response
+
+# Upper bound on ?ids= for the batch endpoint
+MAX_BATCH_LISTINGS = 200
+
+# Suggestions returned when ?limit= isn't given
+DEFAULT_SUGGESTIONS = 8
+
+# Typeahead is called on every keystroke, far past the default per-hour limits
+SUGGEST_RATE_LIMIT = '600 per minute'
 
 # ========================================
 # PUBLIC ROUTES (No Authentication Required)
 # ========================================
 
 @listings_bp.route('/', methods=['GET'])
-@cache.cached(timeout=300, query_string=True)
+@tagged_cache.cached(timeout=LISTING_CACHE_TIMEOUT, query_string=True)
 def get_listings():
-    """Public: Get all listings with filtering and pagination"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 20, type=int), 100)
-
-    query = select(Listing)
-
-    # Apply filters
-    category_id = request.args.get('category_id', type=int)
-    subcategory_id = request.args.get('subcategory_id', type=int)
-    min_price = request.args.get('min_price', type=int)
-    max_price = request.args.get('max_price', type=int)
-    city = request.args.get('city')
-    state = request.args.get('state')
-    zip_code = request.args.get('zip_code')
-    search = request.args.get('search')
-    
-    # Nearby search parameters
-    lat = request.args.get('lat', type=float)
-    lng = request.args.get('lng', type=float)
-    radius = request.args.get('radius', type=float, default=10.0)  # Default 10 km radius
-
-    if category_id:
-        query = query.join(Subcategory).where(Subcategory.category_id == category_id)
-
-    if subcategory_id:
-        query = query.where(Listing.subcategory_id == subcategory_id)
-
-    if min_price is not None:
-        query = query.where(Listing.price >= min_price)
-
-    if max_price is not None:
-        query = query.where(Listing.price <= max_price)
-
-    if city:
-        query = query.join(Location).where(Location.city.like(f'%{city.lower()}%'))
-
-    if state:
-        query = query.join(Location).where(Location.state.like(f'%{state.lower()}%'))
-
-    if zip_code:
-        query = query.join(Location).where(Location.zip_code.like(f'%{zip_code.lower()}%'))
-
-    if search:
-        search_term = f'%{search.lower()}%'
-        query = query.where(
-            or_(
-                func.lower(Listing.title).like(search_term),
-                func.lower(Listing.description).like(search_term),
-                func.lower(Location.address).like(search_term),
-                func.lower(Location.city).like(search_term),
-                func.lower(Location.state).like(search_term),
-                func.lower(Location.zip_code).like(search_term)
-            )
-        )
+    """Public: Get all listings with filtering and pagination (?fields= for a sparse fieldset)"""
+    page_request = pagination_args()
 
-    # Nearby/Geolocation filtering
-    if lat is not None and lng is not None:
-        # Join with Location if not already joined
-        if not any('location' in str(query) for table in ['city', 'state', 'zip_code']):
-            query = query.join(Location)
-        
-        # Use Haversine formula to calculate distance with SQLAlchemy functions
-        distance_expr = func.acos(
-            func.cos(func.radians(lat)) * 
-            func.cos(func.radians(Location.latitude)) * 
-            func.cos(func.radians(Location.longitude) - func.radians(lng)) + 
-            func.sin(func.radians(lat)) * 
-            func.sin(func.radians(Location.latitude))
-        ) * 6371  # Earth's radius in kilometers
-        
-        # Filter by radius
-        query = query.where(
-            and_(
-                Location.latitude.isnot(None),
-                Location.longitude.isnot(None),
-                distance_expr <= radius
-            )
-        )
+    try:
+        fieldset = listing_fieldset(request.args.get('fields'))
+    except InvalidFieldset as e:
+        return jsonify({'error': str(e)}), 400
+    load_options = frontend_listing_load_options(fieldset)
+
+    filters = listing_filter_args()
+    sort = request.args.get('sort')
+    listing_query = ListingQuery(filters)
+    query = listing_query.select()
+
+    scope_tags = tag_listing_query_scope(
+        filters.category_id, filters.subcategory_id, filters.lat, filters.lng, filters.radius
+    )
+    result_key = result_set_key(view='listings', **filters._asdict())
 
-    # Get total count
-    total_query = select(func.count(Listing.listing_id))
-    if query.whereclause is not None:
-        total_query = total_query.where(query.whereclause)
-    total = db.session.execute(total_query).scalar()
+    # Text and address filters aren't in the in-memory catalog; those go to SQL
+    catalog_filters = listing_query.catalog_filters
+    catalog = current_listing_catalog() if catalog_filters is not None else None
 
-    # Apply pagination
-    offset = (page - 1) * per_page
-    query = query.offset(offset).limit(per_page)
-
-    listings = db.session.execute(query).scalars().all()
-
-    pagination_info = {
-        'page': page,
-        'per_page': per_page,
-        'total': total,
-        'total_pages': (total + per_page - 1) // per_page,
-        'has_prev': page > 1,
-        'has_next': page * per_page < total
-    }
+    try:
+        # Nearby/Geolocation filtering
+        if listing_query.near is not None:
+            lat, lng, radius = listing_query.near
+            # Vectorized over the catalog, or spatial index prefilter with exact distances for candidates only;
+            # ranked once per search and sliced for every page
+            if catalog is not None:
+                ranked = cached_ranked_results(
+                    result_key, scope_tags, lambda: catalog.nearby(lat, lng, radius, **catalog_filters)
+                )
+            else:
+                ranked = cached_ranked_results(result_key, scope_tags, listing_query.rank_nearby)
+            ranked_ids = [listing_id for listing_id, _ in ranked]
+            page_ids, pagination_info = slice_paginate(ranked_ids, page_request)
+            listings = _load_listings_in_order(page_ids, load_options)
+            _attach_distances(listings, ranked)
+            facets = listing_facets(listing_ids=ranked_ids) if facets_requested() else None
+        elif listing_query.relevance_ranked:
+            # Relevance order is not a stored key, so page through the ranked ids
+            ranked_ids = cached_ranked_results(result_key, scope_tags, listing_query.ranked_ids)
+            page_ids, pagination_info = slice_paginate(ranked_ids, page_request)
+            listings = _load_listings_in_order(page_ids, load_options)
+            facets = listing_facets(query=query) if facets_requested() else None
+        elif catalog is not None:
+            page_ids, pagination_info = catalog.page(
+                sort if sort in ('rating', 'newest') else None, page_request, **catalog_filters
+            )
+            listings = _load_listings_in_order(page_ids, load_options)
+            facets = listing_facets(query=query) if facets_requested() else None
+        else:
+            if sort == 'rating':
+                order_by = [desc(Listing.rating_avg), desc(Listing.listing_id)]
+            elif sort == 'newest':
+                order_by = [desc(Listing.created_at), desc(Listing.listing_id)]
+            else:
+                order_by = [Listing.listing_id]
+
+            listings, pagination_info = keyset_paginate(
+                query.options(*load_options), order_by, page_request
+            )
+            facets = listing_facets(query=query) if facets_requested() else None
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    tag_listing_results(listings)
 
     # Use frontend schema to format response
-    frontend_schema = FrontendListingsResponseSchema()
-    response_data = frontend_schema.dump({'items': listings})
+    response = {'items': listings, 'pagination': pagination_info}
+    if facets is not None:
+        response['facets'] = facets
+    response_data = frontend_listings_response_serializer_for(fieldset).dump(response)
     return jsonify(response_data), 200
 
 @listings_bp.route('/<int:listing_id>', methods=['GET'])
-@cache.cached(timeout=300)
+@tagged_cache.cached(timeout=LISTING_CACHE_TIMEOUT, query_string=listing_cache_args)
 def get_listing(listing_id):
-    """Public: Get a single listing by ID"""
+    """Public: Get a single listing by ID (?fields= for a sparse fieldset)"""
+    try:
+        fieldset = listing_fieldset(request.args.get('fields'))
+    except InvalidFieldset as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Declared before the read so a write racing it leaves the entry stale
+    add_cache_tags(f'listing:{listing_id}')
     listing = db.session.execute(
-        select(Listing).where(Listing.listing_id == listing_id)
+        select(Listing).options(*frontend_listing_load_options(fieldset)).where(Listing.listing_id == listing_id)
     ).scalars().first()
 
     if not listing:
         return jsonify({'error': 'Listing not found'}), 404
 
+    tag_listing_results([listing])
+
     # Use frontend schema to format response
-    frontend_schema = FrontendListingSchema()
-    return jsonify(frontend_schema.dump(listing)), 200
+    return jsonify(frontend_listing_serializer_for(fieldset).dump(listing)), 200
+
+@listings_bp.route('/batch', methods=['GET'])
+def get_listings_batch():
+    """Public: Get several listings by ID (?ids=1,2,3) in the requested order, ?fields= as for one listing"""
+    try:
+        fieldset = listing_fieldset(request.args.get('fields'))
+    except InvalidFieldset as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        listing_ids = list(dict.fromkeys(
+            int(listing_id) for listing_id in request.args.get('ids', '').split(',') if listing_id.strip()
+        ))
+    except ValueError:
+        return jsonify({'error': 'ids must be a comma-separated list of integers'}), 400
+
+    if not listing_ids:
+        return jsonify({'error': 'ids is required'}), 400
+    if len(listing_ids) > MAX_BATCH_LISTINGS:
+        return jsonify({'error': f'At most {MAX_BATCH_LISTINGS} ids per request'}), 400
+
+    # Same cache entries as get_listing, so warm cards are served without touching the database
+    cache_args = listing_cache_args(request.args)
+    cache_keys = {
+        listing_id: tagged_cache.view_key(url_for('listings.get_listing', listing_id=listing_id), cache_args)
+        for listing_id in listing_ids
+    }
+    cached = tagged_cache.get_fresh_many(cache_keys.values())
+    bodies = {
+        listing_id: cached[cache_key]['body']
+        for listing_id, cache_key in cache_keys.items() if cache_key in cached
+    }
+
+    cold_ids = [listing_id for listing_id in listing_ids if listing_id not in bodies]
+    serializer = frontend_listing_serializer_for(fieldset)
+    # Listing tag versions are read before the rows, like get_listing does
+    versions = tagged_cache.versions(f'listing:{listing_id}' for listing_id in cold_ids)
+    cold_listings = _load_listings_in_order(cold_ids, frontend_listing_load_options(fieldset))
+    versions.update(tagged_cache.versions(
+        {tag for listing in cold_listings for tag in listing_result_tags(listing)} - versions.keys()
+    ))
+    for listing in cold_listings:
+        response = jsonify(serializer.dump(listing))
+        tagged_cache.store(
+            cache_keys[listing.listing_id], response,
+            {tag: versions[tag] for tag in listing_result_tags(listing)}, LISTING_CACHE_TIMEOUT
+        )
+        bodies[listing.listing_id] = response.get_data()
+
+    # Splice the cached JSON documents together rather than decoding them again
+    items = b','.join(bodies[listing_id].strip() for listing_id in listing_ids if listing_id in bodies)
+    missing = [listing_id for listing_id in listing_ids if listing_id not in bodies]
+    body = b'{"items":[' + items + b'],"missing":' + json.dumps(missing).encode() + b'}\n'
+    return conditional_response(current_app.response_class(body, status=200, mimetype='application/json'))
 
 @listings_bp.route('/user/<int:owner_id>', methods=['GET'])
 def get_user_listings(owner_id):
     """Public: Get listings by a specific user"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 20, type=int), 100)
+    page_request = pagination_args()
 
     user = db.session.execute(
         select(User).where(User.user_id == owner_id)
@@ -153,114 +208,96 @@ def get_user_listings(owner_id):
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
-    query = select(Listing).where(Listing.owner_id == owner_id)
-
-    total = db.session.execute(
-        select(func.count(Listing.listing_id)).where(Listing.owner_id == owner_id)
-    ).scalar()
+    query = select(Listing).options(*LISTING_SCHEMA_LOAD_OPTIONS).where(Listing.owner_id == owner_id)
 
-    offset = (page - 1) * per_page
-    query = query.offset(offset).limit(per_page)
-
-    listings = db.session.execute(query).scalars().all()
-
-    pagination_info = {
-        'page': page,
-        'per_page': per_page,
-        'total': total,
-        'total_pages': (total + per_page - 1) // per_page,
-        'has_prev': page > 1,
-        'has_next': page * per_page < total
-    }
+    try:
+        listings, pagination_info = keyset_paginate(query, [Listing.listing_id], page_request)
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
 
     return jsonify({
-        'listings': listings_schema.dump(listings),
+        'listings': listings_serializer.dump(listings),
         'pagination': pagination_info
     }), 200
 
+@listings_bp.route('/suggest', methods=['GET'])
+@limiter.limit(SUGGEST_RATE_LIMIT)
+def suggest_listings():
+    """Public: Typeahead suggestions for a search prefix (?q=, ?limit=), served from memory"""
+    index = current_suggestion_index()
+    if index is None:
+        return jsonify({'error': 'Suggestions are not enabled'}), 404
+
+    prefix = request.args.get('q', '')
+    limit = request.args.get('limit', type=int, default=DEFAULT_SUGGESTIONS)
+    if limit < 1:
+        return jsonify({'error': 'limit must be positive'}), 400
+
+    return jsonify({'query': prefix, 'suggestions': index.suggest(prefix, limit)}), 200
+
 @listings_bp.route('/nearby', methods=['GET'])
-@cache.cached(timeout=300, query_string=True)
+@tagged_cache.cached(timeout=LISTING_CACHE_TIMEOUT, query_string=True)
 def get_nearby_listings():
     """Public: Get listings near a specific location"""
-    lat = request.args.get('lat', type=float)
-    lng = request.args.get('lng', type=float)
-    radius = request.args.get('radius', type=float, default=10.0)
-    
-    if lat is None or lng is None:
+    filters = listing_filter_args('category_id', 'subcategory_id', 'min_price', 'max_price', 'lat', 'lng')
+    listing_query = ListingQuery(filters)
+
+    if listing_query.near is None:
         return jsonify({'error': 'Latitude and longitude are required'}), 400
-    
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 20, type=int), 100)
-    
-    # Base query with location join
-    query = select(Listing).join(Location)
-    
-    # Apply other filters if provided
-    category_id = request.args.get('category_id', type=int)
-    subcategory_id = request.args.get('subcategory_id', type=int)
-    min_price = request.args.get('min_price', type=int)
-    max_price = request.args.get('max_price', type=int)
-    
-    if category_id:
-        query = query.join(Subcategory).where(Subcategory.category_id == category_id)
-    
-    if subcategory_id:
-        query = query.where(Listing.subcategory_id == subcategory_id)
-    
-    if min_price is not None:
-        query = query.where(Listing.price >= min_price)
-    
-    if max_price is not None:
-        query = query.where(Listing.price <= max_price)
-    
-    # Geolocation filtering using Haversine formula
-    # Create a subquery with distance calculation
-    distance_expr = func.acos(
-        func.cos(func.radians(lat)) * 
-        func.cos(func.radians(Location.latitude)) * 
-        func.cos(func.radians(Location.longitude) - func.radians(lng)) + 
-        func.sin(func.radians(lat)) * 
-        func.sin(func.radians(Location.latitude))
-    ) * 6371  # Earth's radius in kilometers
-    
-    # Filter by radius
-    query = query.where(
-        and_(
-            Location.latitude.isnot(None),
-            Location.longitude.isnot(None),
-            distance_expr <= radius
+
+    lat, lng, radius = listing_query.near
+    page_request = pagination_args()
+
+    scope_tags = tag_listing_query_scope(filters.category_id, filters.subcategory_id, lat, lng, radius)
+    result_key = result_set_key(view='nearby', **filters._asdict())
+
+    # Vectorized over the catalog, or spatial index prefilter then exact
+    # distances for candidates only; ordered closest first
+    catalog = current_listing_catalog()
+    if catalog is not None:
+        ranked = cached_ranked_results(
+            result_key, scope_tags, lambda: catalog.nearby(lat, lng, radius, **listing_query.catalog_filters)
         )
-    )
-    
-    # Order by distance (closest first)
-    query = query.order_by(distance_expr)
-    
-    # Get total count
-    total_query = select(func.count(Listing.listing_id)).select_from(
-        query.subquery()
-    )
-    total = db.session.execute(total_query).scalar()
-    
+    else:
+        ranked = cached_ranked_results(result_key, scope_tags, listing_query.rank_nearby)
+
     # Apply pagination
-    offset = (page - 1) * per_page
-    listings = db.session.execute(query.offset(offset).limit(per_page)).scalars().all()
-    
-    pagination_info = {
-        'page': page,
-        'per_page': per_page,
-        'total': total,
-        'total_pages': (total + per_page - 1) // per_page,
-        'has_prev': page > 1,
-        'has_next': page * per_page < total,
-        'radius_km': radius,
-        'center': {'lat': lat, 'lng': lng}
-    }
+    try:
+        page_ids, pagination_info = slice_paginate(
+            [listing_id for listing_id, _ in ranked], page_request
+        )
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    listings = _load_listings_in_order(page_ids, LISTING_SCHEMA_LOAD_OPTIONS)
+    _attach_distances(listings, ranked)
+    tag_listing_results(listings)
+    pagination_info['radius_km'] = radius
+    pagination_info['center'] = {'lat': lat, 'lng': lng}
     
     return jsonify({
-        'listings': listings_schema.dump(listings),
+        'listings': listings_serializer.dump(listings),
         'pagination': pagination_info
     }), 200
 
+def _attach_distances(listings, ranked):
+    """Set distance_km on listings from (listing_id, distance_km) pairs for the schemas to dump"""
+    distances = dict(ranked)
+    for listing in listings:
+        listing.distance_km = round(distances[listing.listing_id], 3)
+
+def _load_listings_in_order(listing_ids, load_options=()):
+    """Load listings by ID with the given loader options, preserving the order of listing_ids"""
+    if not listing_ids:
+        return []
+
+    listings = db.session.execute(
+        select(Listing).options(*load_options).where(Listing.listing_id.in_(listing_ids))
+    ).scalars().all()
+
+    by_id = {listing.listing_id: listing for listing in listings}
+    return [by_id[listing_id] for listing_id in listing_ids if listing_id in by_id]
+
 # ========================================
 # AUTHENTICATED USER ROUTES
 # ========================================
@@ -330,41 +367,56 @@ def create_listing(user_id):
                 db.session.add(feature)
 
     db.session.commit()
+    invalidate_listing(listing_tags(listing))
     
     # Use frontend schema to format response
-    frontend_schema = FrontendListingSchema()
-    return jsonify(frontend_schema.dump(listing)), 201
+    return jsonify(frontend_listing_serializer.dump(listing)), 201
 
-@listings_bp.route('/my-listings', methods=['GET'])
+@listings_bp.route('/bulk', methods=['POST'])
 @user_token_required
-def get_my_listings(user_id):
-    """Get listings owned by the authenticated user"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 20, type=int), 100)
+@limiter.limit("5 per minute")
+def bulk_import_listings(user_id):
+    """Create many listings for the authenticated user from a JSON array or a CSV upload"""
+    if 'file' in request.files:
+        rows = csv_rows(request.files['file'].stream)
+    elif request.mimetype == 'text/csv':
+        rows = csv_rows(request.stream)
+    else:
+        rows = request.get_json(silent=True)
+        if not isinstance(rows, list):
+            return jsonify({'error': 'Expected a JSON array of listings or a CSV upload'}), 400
+
+    result = import_listings(rows, user_id)
 
-    query = select(Listing).where(Listing.owner_id == user_id)
+    return jsonify({
+        'created': len(result['listing_ids']),
+        'listing_ids': result['listing_ids'],
+        'errors': result['errors'],
+        'truncated': result['truncated']
+    }), 201 if result['listing_ids'] else 400
 
-    total = db.session.execute(
-        select(func.count(Listing.listing_id)).where(Listing.owner_id == user_id)
-    ).scalar()
+@listings_bp.route('/my-listings', methods=['GET'])
+@user_token_required
+def get_my_listings(user_id):
+    """Get listings owned by the authenticated user (?fields= for a sparse fieldset)"""
+    page_request = pagination_args()
 
-    offset = (page - 1) * per_page
-    query = query.offset(offset).limit(per_page)
+    try:
+        fieldset = listing_fieldset(request.args.get('fields'))
+    except InvalidFieldset as e:
+        return jsonify({'error': str(e)}), 400
 
-    listings = db.session.execute(query).scalars().all()
+    query = select(Listing).options(*frontend_listing_load_options(fieldset)).where(Listing.owner_id == user_id)
 
-    pagination_info = {
-        'page': page,
-        'per_page': per_page,
-        'total': total,
-        'total_pages': (total + per_page - 1) // per_page,
-        'has_prev': page > 1,
-        'has_next': page * per_page < total
-    }
+    try:
+        listings, pagination_info = keyset_paginate(query, [Listing.listing_id], page_request)
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
 
     # Use frontend schema to format response  
-    frontend_schema = FrontendListingsResponseSchema()
-    response_data = frontend_schema.dump({'items': listings})
+    response_data = frontend_listings_response_serializer_for(fieldset).dump(
+        {'items': listings, 'pagination': pagination_info}
+    )
     return jsonify(response_data), 200
 
 @listings_bp.route('/<int:listing_id>', methods=['PUT'])
@@ -382,6 +434,8 @@ def update_listing(user_id, listing_id):
     # Check ownership
     if listing.owner_id != user_id:
         return jsonify({'error': 'Unauthorized to update this listing'}), 403
+
+    previous_tags = listing_tags(listing)
     
     try:
         data = request.get_json()
@@ -452,8 +506,8 @@ def update_listing(user_id, listing_id):
                 db.session.add(feature)
 
     db.session.commit()
-    cache.delete_memoized(get_listing, listing_id)
-    return listing_schema.jsonify(listing), 200
+    invalidate_listing(previous_tags, listing_tags(listing))
+    return jsonify(listing_serializer.dump(listing)), 200
 
 @listings_bp.route('/<int:listing_id>', methods=['DELETE'])
 @user_token_required
@@ -471,9 +525,10 @@ def delete_listing(user_id, listing_id):
     if listing.owner_id != user_id:
         return jsonify({'error': 'Unauthorized to delete this listing'}), 403
 
+    previous_tags = listing_tags(listing)
     db.session.delete(listing)
     db.session.commit()
-    cache.delete_memoized(get_listing, listing_id)
+    invalidate_listing(previous_tags)
 
     return jsonify({'message': 'Listing deleted successfully'}), 200
 
@@ -485,29 +540,30 @@ def delete_listing(user_id, listing_id):
 @admin_token_required
 def admin_get_all_listings(user_id):
     """Admin: Get all listings with additional details"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 50, type=int), 100)
-    
-    query = select(Listing)
-    total = db.session.execute(select(func.count(Listing.listing_id))).scalar()
+    page_request = pagination_args(default_per_page=50)
     
-    offset = (page - 1) * per_page
-    listings = db.session.execute(query.offset(offset).limit(per_page)).scalars().all()
-    
-    pagination_info = {
-        'page': page,
-        'per_page': per_page,
-        'total': total,
-        'total_pages': (total + per_page - 1) // per_page,
-        'has_prev': page > 1,
-        'has_next': page * per_page < total
-    }
+    query = select(Listing).options(*LISTING_SCHEMA_LOAD_OPTIONS)
+
+    try:
+        listings, pagination_info = keyset_paginate(query, [Listing.listing_id], page_request)
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
     
     return jsonify({
-        'listings': listings_schema.dump(listings),
+        'listings': listings_serializer.dump(listings),
         'pagination': pagination_info
     }), 200
 
+@listings_bp.route('/admin/export', methods=['GET'])
+@admin_token_required
+@limiter.limit("10 per minute")
+def admin_export_listings(user_id):
+    """Admin: Stream all listings as newline-delimited JSON (?updated_since= for incremental exports)"""
+    try:
+        return ndjson_export(select(Listing.__table__), Listing.updated_at, Listing.listing_id)
+    except InvalidExportFilter as e:
+        return jsonify({'error': str(e)}), 400
+
 @listings_bp.route('/admin/<int:listing_id>', methods=['DELETE'])
 @admin_token_required
 @limiter.limit("10 per minute")
@@ -520,8 +576,9 @@ def admin_delete_listing(user_id, listing_id):
     if not listing:
         return jsonify({'error': 'Listing not found'}), 404
 
+    previous_tags = listing_tags(listing)
     db.session.delete(listing)
     db.session.commit()
-    cache.delete_memoized(get_listing, listing_id)
+    invalidate_listing(previous_tags)
 
     return jsonify({'message': 'Listing deleted by admin'}), 200
\ No newline at end of file
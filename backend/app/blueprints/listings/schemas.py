@@ -1,6 +1,8 @@
 from app.models import Listing, Category, Subcategory, Location, Image, Amenity, ListingFeature
 from app.extensions import ma
 from marshmallow import fields, validate, validates_schema, ValidationError
+from sqlalchemy.orm import joinedload, selectinload
+from app.utils.serializers import compile_schema
 
 class LocationSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
@@ -42,11 +44,35 @@ class ListingSchema(ma.SQLAlchemyAutoSchema):
     amenities = fields.List(fields.Nested(AmenitySchema), dump_only=True)
     features = fields.List(fields.Nested(ListingFeatureSchema), dump_only=True)
     subcategory = fields.Nested(SubcategorySchema, dump_only=True)
+    distance_km = fields.Float(dump_only=True)  # Only set by nearby searches
 
     amenity_ids = fields.List(fields.Int(), load_only=True, load_default=[])
     feature_data = fields.List(fields.Dict(), load_only=True, load_default=[])
 
+# ListingSchema dumps every relationship (collections as primary keys), so
+# load them all up front instead of lazily per listing
+LISTING_SCHEMA_LOAD_OPTIONS = (
+    joinedload(Listing.owner),
+    joinedload(Listing.subcategory).joinedload(Subcategory.category),
+    joinedload(Listing.location),
+    selectinload(Listing.payments),
+    selectinload(Listing.bookings),
+    selectinload(Listing.reviews),
+    selectinload(Listing.favorited_by),
+    selectinload(Listing.availability),
+    selectinload(Listing.images),
+    selectinload(Listing.deliveries),
+    selectinload(Listing.amenities),
+    selectinload(Listing.features),
+)
+
 class ListingCreateSchema(ListingSchema):
+    class Meta(ListingSchema.Meta):
+        # Validates into a plain dict; the owner comes from the token and the
+        # Location/Listing rows are built by the routes
+        load_instance = False
+        exclude = ['owner']
+
     title = fields.Str(required=True, validate=validate.Length(min=1, max=100))
     description = fields.Str(validate=validate.Length(max=1000))
     price = fields.Int(required=True, validate=validate.Range(min=0))
@@ -84,3 +110,6 @@ listing_schema = ListingSchema()
 listings_schema = ListingSchema(many=True)
 listing_create_schema = ListingCreateSchema()
 listing_update_schema = ListingUpdateSchema()
+
+listing_serializer = compile_schema(listing_schema)
+listings_serializer = compile_schema(listings_schema)
@@ -0,0 +1,457 @@
+import heapq
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from functools import lru_cache
+
+from flask import current_app
+from sqlalchemy import select, func
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.models import db, Listing, Subcategory, SearchLog, ListingChange, prune_listing_changes
+
+# Most suggestions one request can ask for
+MAX_SUGGESTIONS = 20
+
+# Searches a keyword needs before it is suggested (keeps one-off typos out),
+# and how many of the most searched keywords are indexed
+MIN_KEYWORD_SEARCHES = 2
+MAX_INDEXED_KEYWORDS = 5000
+
+# Prefixes up to this length match most of the index, so their top
+# suggestions are ranked when the index is built rather than per request
+PRERANKED_PREFIX_LENGTH = 2
+
+# Longer prefixes ranked per snapshot and kept for repeat keystrokes
+RANKED_PREFIX_CACHE_SIZE = 4096
+
+# Kind reported for a phrase that comes from several sources, strongest last
+SUGGESTION_KINDS = ('listing', 'search', 'subcategory')
+
+
+def init_listing_suggestions(app):
+    """
+    Attach the typeahead index to the app when LISTING_SUGGEST_ENABLED is set
+    and build it right away; if the tables don't exist yet it is built on
+    first use.
+    """
+    if not app.config.get('LISTING_SUGGEST_ENABLED'):
+        return
+
+    index = app.extensions['listing_suggestions'] = SuggestionIndex(
+        refresh_interval=app.config.get('LISTING_SUGGEST_REFRESH_INTERVAL'),
+        retention=app.config.get('LISTING_CATALOG_CHANGE_RETENTION', 24 * 60 * 60),
+    )
+    with app.app_context():
+        try:
+            index.refresh()
+        except SQLAlchemyError:
+            db.session.rollback()
+        finally:
+            db.session.remove()
+
+
+def current_suggestion_index():
+    """The current app's suggestion index, or None when it is disabled"""
+    return current_app.extensions.get('listing_suggestions')
+
+
+def normalize_phrase(text):
+    """Lowercase with runs of whitespace collapsed, the form phrases are indexed by"""
+    return ' '.join(text.lower().split())
+
+
+class SuggestionIndex:
+    """
+    In-memory prefix index of listing titles, subcategory names and popular
+    search keywords for the typeahead endpoint.
+
+    Phrases are weighted by popularity: a keyword by its number of searches,
+    a subcategory by its number of listings, a title by how many listings
+    share it. Every word start of a phrase is a key in one sorted array, so a
+    prefix is a bisect range whose best phrases are picked by weight.
+
+    Requests only read the current snapshot. A background thread per worker
+    applies the listing_changes feed and new search logs every
+    `refresh_interval` seconds and swaps in a copy of the snapshot with just
+    the changed phrases updated; with no interval the index is only
+    refreshed by calling refresh(). The index is rebuilt from scratch when
+    it has fallen more than `retention` seconds behind (older changes may
+    have been pruned), when the feed's ids are below its position, or when
+    removed phrases outnumber the live ones, and the feed is pruned about
+    once per `retention` seconds.
+    """
+
+    def __init__(self, refresh_interval=None, retention=24 * 60 * 60):
+        self.refresh_interval = refresh_interval
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._titles = {}
+        self._title_counts = Counter()
+        self._title_text = {}
+        self._subcategories = {}
+        self._subcategory_ids = {}
+        self._listing_counts = Counter()
+        self._keywords = Counter()
+        self._keyword_text = {}
+        self._indexed_keywords = {}
+        self._last_change_id = 0
+        self._last_search_log_id = 0
+        self._last_refresh = 0.0
+        self._last_prune = None
+        self._refresher_pid = None
+
+    # ---------------------------------------------------------------------
+    # Loading and refresh
+    # ---------------------------------------------------------------------
+
+    def refresh(self):
+        """Catch up with listing and search log writes and publish a new snapshot"""
+        with self._lock:
+            if (self._snapshot is None or time.monotonic() - self._last_refresh >= self.retention
+                    or self._snapshot.garbage > len(self._snapshot.phrases)):
+                self._rebuild()
+            else:
+                self._apply_changes()
+            if self._last_prune is None or time.monotonic() - self._last_prune >= self.retention:
+                prune_listing_changes(self.retention)
+                self._last_prune = time.monotonic()
+
+    def _rebuild(self):
+        # Read the feed positions first: writes racing the load are replayed, which is harmless
+        self._last_change_id = db.session.execute(select(func.max(ListingChange.change_id))).scalar() or 0
+        self._last_search_log_id = db.session.execute(select(func.max(SearchLog.search_log_id))).scalar() or 0
+
+        self._titles, self._title_counts, self._title_text = {}, Counter(), {}
+        self._listing_counts = Counter()
+        for listing_id, title, subcategory_id in db.session.execute(
+            select(Listing.listing_id, Listing.title, Listing.subcategory_id)
+        ):
+            self._add_title(listing_id, title, subcategory_id)
+        self._set_subcategories(dict(db.session.execute(select(Subcategory.subcategory_id, Subcategory.name)).all()))
+        self._keywords, self._keyword_text = Counter(), {}
+        self._count_keywords(db.session.execute(
+            select(func.min(SearchLog.keyword), func.count())
+            .where(SearchLog.search_log_id <= self._last_search_log_id)
+            .group_by(func.lower(SearchLog.keyword))
+        ))
+        self._indexed_keywords = self._top_keywords()
+
+        phrases = self._title_counts.keys() | self._subcategory_ids.keys() | self._indexed_keywords.keys()
+        self._snapshot = _Snapshot({phrase: self._entry(phrase) for phrase in phrases})
+        self._last_refresh = time.monotonic()
+
+    def _apply_changes(self):
+        highest_id = db.session.execute(select(func.max(ListingChange.change_id))).scalar() or 0
+        if highest_id < self._last_change_id:
+            # The feed was pruned empty and its ids handed out again (SQLite without AUTOINCREMENT)
+            self._rebuild()
+            return
+
+        changes = db.session.execute(
+            select(ListingChange.change_id, ListingChange.listing_id)
+            .where(ListingChange.change_id > self._last_change_id)
+            .order_by(ListingChange.change_id)
+        ).all()
+        searches = db.session.execute(
+            select(SearchLog.search_log_id, SearchLog.keyword)
+            .where(SearchLog.search_log_id > self._last_search_log_id)
+            .order_by(SearchLog.search_log_id)
+        ).all()
+        subcategories = dict(db.session.execute(select(Subcategory.subcategory_id, Subcategory.name)).all())
+        self._last_refresh = time.monotonic()
+        if not changes and not searches and subcategories == self._subcategories:
+            return
+
+        # Phrases whose weight, text or kind may have changed
+        changed = set()
+        if changes:
+            changed_ids = {listing_id for _, listing_id in changes}
+            for listing_id in changed_ids:
+                changed.update(self._remove_title(listing_id))
+            for listing_id, title, subcategory_id in db.session.execute(
+                select(Listing.listing_id, Listing.title, Listing.subcategory_id)
+                .where(Listing.listing_id.in_(changed_ids))
+            ):
+                changed.update(self._add_title(listing_id, title, subcategory_id))
+            self._last_change_id = changes[-1].change_id
+        if searches:
+            self._count_keywords((keyword, 1) for _, keyword in searches)
+            self._last_search_log_id = searches[-1].search_log_id
+            indexed = self._top_keywords()
+            changed.update(
+                phrase for phrase in indexed.keys() | self._indexed_keywords.keys()
+                if indexed.get(phrase) != self._indexed_keywords.get(phrase)
+            )
+            self._indexed_keywords = indexed
+        if subcategories != self._subcategories:
+            changed.update(self._subcategory_ids)
+            self._set_subcategories(subcategories)
+            changed.update(self._subcategory_ids)
+
+        self._snapshot = self._snapshot.updated({phrase: self._entry(phrase) for phrase in changed})
+
+    def _add_title(self, listing_id, title, subcategory_id):
+        """Count a listing's title and subcategory; returns the phrases it touches"""
+        self._titles[listing_id] = (title, subcategory_id)
+        self._listing_counts[subcategory_id] += 1
+        phrase = normalize_phrase(title or '')
+        if phrase:
+            self._title_counts[phrase] += 1
+            self._title_text.setdefault(phrase, ' '.join(title.split()))
+        return phrase, self._subcategory_phrase(subcategory_id)
+
+    def _remove_title(self, listing_id):
+        """Uncount a listing added by _add_title; returns the phrases it touches"""
+        if listing_id not in self._titles:
+            return ()
+        title, subcategory_id = self._titles.pop(listing_id)
+        self._listing_counts[subcategory_id] -= 1
+        phrase = normalize_phrase(title or '')
+        if phrase:
+            self._title_counts[phrase] -= 1
+            if not self._title_counts[phrase]:
+                del self._title_counts[phrase], self._title_text[phrase]
+        return phrase, self._subcategory_phrase(subcategory_id)
+
+    def _set_subcategories(self, subcategories):
+        self._subcategories = subcategories
+        self._subcategory_ids = {}
+        for subcategory_id, name in subcategories.items():
+            phrase = normalize_phrase(name or '')
+            if phrase:
+                self._subcategory_ids.setdefault(phrase, []).append(subcategory_id)
+
+    def _subcategory_phrase(self, subcategory_id):
+        return normalize_phrase(self._subcategories.get(subcategory_id) or '')
+
+    def _count_keywords(self, counts):
+        for keyword, count in counts:
+            phrase = normalize_phrase(keyword)
+            if phrase:
+                self._keywords[phrase] += count
+                self._keyword_text.setdefault(phrase, keyword.strip())
+
+    def _top_keywords(self):
+        return {
+            phrase: count for phrase, count in self._keywords.most_common(MAX_INDEXED_KEYWORDS)
+            if count >= MIN_KEYWORD_SEARCHES
+        }
+
+    def _entry(self, phrase):
+        """
+        The (weight, text, kind) a phrase is indexed with, or None when no
+        title, keyword or subcategory has it. Its text and kind come from the
+        strongest source in SUGGESTION_KINDS.
+        """
+        weight, text, kind = 0, None, None
+        if phrase in self._title_counts:
+            weight += self._title_counts[phrase]
+            text, kind = self._title_text[phrase], 'listing'
+        if phrase in self._indexed_keywords:
+            weight += self._indexed_keywords[phrase]
+            text, kind = ' '.join(self._keyword_text[phrase].split()), 'search'
+        subcategory_ids = self._subcategory_ids.get(phrase)
+        if subcategory_ids:
+            weight += sum(self._listing_counts[subcategory_id] + 1 for subcategory_id in subcategory_ids)
+            text, kind = ' '.join(self._subcategories[subcategory_ids[0]].split()), 'subcategory'
+        return None if kind is None else (weight, text, kind)
+
+    def _ensure_refresher(self):
+        # Started lazily so each forked worker gets its own thread
+        if not self.refresh_interval or self._refresher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._refresher_pid == os.getpid():
+                return
+            self._refresher_pid = os.getpid()
+            threading.Thread(
+                target=self._refresh_forever, args=(current_app._get_current_object(),),
+                name='listing-suggestions', daemon=True
+            ).start()
+
+    def _refresh_forever(self, app):
+        while True:
+            time.sleep(self.refresh_interval)
+            with app.app_context():
+                try:
+                    self.refresh()
+                except Exception:
+                    db.session.rollback()
+                    app.logger.exception('Refreshing listing suggestions failed')
+                finally:
+                    db.session.remove()
+
+    # ---------------------------------------------------------------------
+    # Queries
+    # ---------------------------------------------------------------------
+
+    def suggest(self, prefix, limit=10):
+        """
+        Best phrases with a word starting with prefix.
+
+        Returns:
+            list: {'text', 'type'} dicts, most popular first.
+        """
+        if self._snapshot is None:
+            self.refresh()
+        self._ensure_refresher()
+
+        query = normalize_phrase(prefix)
+        if query and prefix[-1:].isspace():
+            # "drill " shouldn't complete to "drills"
+            query += ' '
+        if not query:
+            return []
+        return self._snapshot.lookup(query, min(limit, MAX_SUGGESTIONS))
+
+
+def _word_starts(phrase):
+    """Keys a phrase is found by: the phrase and the rest of it from each later word"""
+    return [phrase] + [phrase[i + 1:] for i, char in enumerate(phrase) if char == ' ']
+
+
+def _preranked_prefixes(phrase):
+    return {key[:length] for key in _word_starts(phrase) for length in range(1, PRERANKED_PREFIX_LENGTH + 1)}
+
+
+class _Snapshot:
+    """
+    Sorted-array index published by SuggestionIndex. A published snapshot is
+    never changed; updated() returns a new one.
+    """
+
+    def __init__(self, entries):
+        """entries: {phrase: (weight, text, kind)}"""
+        self.texts, self.kinds, self.weights = [], [], []
+        self.phrases = {}
+        # Positions of dropped phrases, left in place until the next rebuild
+        self.garbage = 0
+        keyed = []
+        for phrase, (weight, text, kind) in entries.items():
+            position = self.phrases[phrase] = len(self.texts)
+            self.texts.append(text)
+            self.kinds.append(kind)
+            # Heavier first, then shorter
+            self.weights.append((weight, -len(text)))
+            keyed.extend((key, position) for key in _word_starts(phrase))
+        keyed.sort()
+        self.keys = [key for key, _ in keyed]
+        self.positions = [position for _, position in keyed]
+
+        self.preranked = {
+            prefix: self._rank(prefix)
+            for prefix in dict.fromkeys(
+                key[:length] for key in self.keys for length in range(1, PRERANKED_PREFIX_LENGTH + 1)
+            )
+        }
+        self._ranked = lru_cache(maxsize=RANKED_PREFIX_CACHE_SIZE)(self._rank)
+
+    def updated(self, changes):
+        """
+        A copy with changes ({phrase: (weight, text, kind), or None to drop
+        it}) applied. Only the changed phrases' keys are spliced into the
+        sorted arrays and only the preranked prefixes they can reorder are
+        ranked again, so the cost follows the size of the change rather than
+        the size of the index.
+        """
+        snapshot = _Snapshot.__new__(_Snapshot)
+        snapshot.texts, snapshot.kinds, snapshot.weights = self.texts[:], self.kinds[:], self.weights[:]
+        snapshot.phrases = dict(self.phrases)
+        snapshot.garbage = self.garbage
+
+        inserted, deleted = [], []
+        # Prefixes to rank from scratch, and those whose phrases only gained weight
+        stale, raised = set(), {}
+        for phrase, entry in changes.items():
+            position = snapshot.phrases.get(phrase)
+            if entry is None:
+                if position is not None:
+                    del snapshot.phrases[phrase]
+                    snapshot.garbage += 1
+                    deleted.extend((key, position) for key in _word_starts(phrase))
+                    stale.update(self._ranked_prefixes(phrase, position))
+                continue
+
+            weight, text, kind = entry
+            rank = (weight, -len(text))
+            if position is None:
+                position = snapshot.phrases[phrase] = len(snapshot.texts)
+                snapshot.texts.append(text)
+                snapshot.kinds.append(kind)
+                snapshot.weights.append(rank)
+                inserted.extend((key, position) for key in _word_starts(phrase))
+            else:
+                lowered = rank < snapshot.weights[position]
+                snapshot.texts[position], snapshot.kinds[position], snapshot.weights[position] = text, kind, rank
+                if lowered:
+                    stale.update(self._ranked_prefixes(phrase, position))
+                    continue
+            for prefix in _preranked_prefixes(phrase):
+                raised.setdefault(prefix, set()).add(position)
+
+        snapshot.keys, snapshot.positions = self._spliced(inserted, deleted)
+
+        snapshot.preranked = dict(self.preranked)
+        for prefix, positions in raised.items():
+            if prefix not in stale:
+                # Nothing else in the prefix moved, so the old top phrases and the raised ones hold the new top
+                snapshot.preranked[prefix] = heapq.nlargest(
+                    MAX_SUGGESTIONS, positions.union(self.preranked.get(prefix, ())),
+                    key=snapshot.weights.__getitem__
+                )
+        for prefix in stale:
+            ranked = snapshot._rank(prefix)
+            if ranked:
+                snapshot.preranked[prefix] = ranked
+            else:
+                snapshot.preranked.pop(prefix, None)
+        snapshot._ranked = lru_cache(maxsize=RANKED_PREFIX_CACHE_SIZE)(snapshot._rank)
+        return snapshot
+
+    def _ranked_prefixes(self, phrase, position):
+        """Preranked prefixes of phrase whose top phrases include it"""
+        return [prefix for prefix in _preranked_prefixes(phrase) if position in self.preranked.get(prefix, ())]
+
+    def _locate(self, key, position):
+        start = bisect_left(self.keys, key)
+        end = bisect_right(self.keys, key, start)
+        return bisect_left(self.positions, position, start, end)
+
+    def _spliced(self, inserted, deleted):
+        """Sorted key and position arrays with (key, position) pairs inserted and deleted"""
+        if not inserted and not deleted:
+            return self.keys, self.positions
+        # Inserts sort before a delete at the same index, whose pair they go in front of
+        edits = sorted(
+            [(self._locate(key, position), 0, key, position) for key, position in inserted]
+            + [(self._locate(key, position), 1, key, position) for key, position in deleted]
+        )
+        keys, positions = [], []
+        copied = 0
+        for index, is_delete, key, position in edits:
+            keys.extend(self.keys[copied:index])
+            positions.extend(self.positions[copied:index])
+            if is_delete:
+                copied = index + 1
+            else:
+                keys.append(key)
+                positions.append(position)
+                copied = index
+        keys.extend(self.keys[copied:])
+        positions.extend(self.positions[copied:])
+        return keys, positions
+
+    def _rank(self, query):
+        start = bisect_left(self.keys, query)
+        end = bisect_left(self.keys, query + '\uffff', start)
+        return heapq.nlargest(MAX_SUGGESTIONS, set(self.positions[start:end]), key=self.weights.__getitem__)
+
+    def lookup(self, query, limit):
+        positions = self.preranked.get(query)
+        if positions is None:
+            positions = self._ranked(query)
+        return [{'text': self.texts[position], 'type': self.kinds[position]} for position in positions[:limit]]
@@ -5,7 +5,9 @@ from app.models import Listing, User, Location, Subcategory, db
 from marshmallow import ValidationError
 from . import locations_bp
 from app.utils.util import user_token_required, admin_token_required
+from app.utils.pagination import pagination_args, keyset_paginate, InvalidCursor
 from app.extensions import limiter
+from app.blueprints.listings.caching import listing_tags, invalidate_listing
 
 # ========================================
 # PUBLIC ROUTES (No Authentication Required)
@@ -14,26 +16,17 @@ from app.extensions import limiter
 @locations_bp.route("/", methods=["GET"])
 def get_locations():
     """Public: Get all locations with pagination"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 20, type=int), 100)
+    page_request = pagination_args()
     
-    if page < 1 or per_page < 1:
+    if page_request.page is not None and page_request.page < 1:
         return jsonify({"error": "Invalid pagination values"}), 400
 
     query = select(Location)
-    total = db.session.execute(select(func.count(Location.location_id))).scalar()
 
-    offset = (page - 1) * per_page
-    locations = db.session.execute(query.offset(offset).limit(per_page)).scalars().all()
-
-    pagination_info = {
-        'page': page,
-        'per_page': per_page,
-        'total': total,
-        'total_pages': (total + per_page - 1) // per_page,
-        'has_prev': page > 1,
-        'has_next': page * per_page < total
-    }
+    try:
+        locations, pagination_info = keyset_paginate(query, [Location.location_id], page_request)
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
 
     return jsonify({
         'locations': locations_schema.dump(locations),
@@ -58,8 +51,7 @@ def search_locations():
     city = request.args.get("city")
     state = request.args.get("state")
     zip_code = request.args.get("zip_code")
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 20, type=int), 100)
+    page_request = pagination_args()
 
     query = select(Location)
 
@@ -71,29 +63,15 @@ def search_locations():
     if zip_code:
         query = query.where(Location.zip_code.ilike(f"%{zip_code}%"))
 
-    # Get total count
-    total = db.session.execute(
-        select(func.count(Location.location_id)).where(query.whereclause)
-    ).scalar() if query.whereclause is not None else db.session.execute(
-        select(func.count(Location.location_id))
-    ).scalar()
-
     # Apply pagination
-    offset = (page - 1) * per_page
-    locations = db.session.execute(query.offset(offset).limit(per_page)).scalars().all()
+    try:
+        locations, pagination_info = keyset_paginate(query, [Location.location_id], page_request)
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
 
     if not locations and (city or state or zip_code):
         return jsonify({"message": "No locations found matching your criteria."}), 404
 
-    pagination_info = {
-        'page': page,
-        'per_page': per_page,
-        'total': total,
-        'total_pages': (total + per_page - 1) // per_page,
-        'has_prev': page > 1,
-        'has_next': page * per_page < total
-    }
-
     return jsonify({
         'locations': locations_schema.dump(locations),
         'pagination': pagination_info
@@ -152,26 +130,17 @@ def create_location(user_id):
 @admin_token_required
 def admin_get_all_locations(user_id):
     """Admin: Get all locations with enhanced pagination"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 50, type=int), 100)
+    page_request = pagination_args(default_per_page=50)
     
-    if page < 1 or per_page < 1:
+    if page_request.page is not None and page_request.page < 1:
         return jsonify({"error": "Invalid pagination values"}), 400
 
     query = select(Location)
-    total = db.session.execute(select(func.count(Location.location_id))).scalar()
-
-    offset = (page - 1) * per_page
-    locations = db.session.execute(query.offset(offset).limit(per_page)).scalars().all()
 
-    pagination_info = {
-        'page': page,
-        'per_page': per_page,
-        'total': total,
-        'total_pages': (total + per_page - 1) // per_page,
-        'has_prev': page > 1,
-        'has_next': page * per_page < total
-    }
+    try:
+        locations, pagination_info = keyset_paginate(query, [Location.location_id], page_request)
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
 
     return jsonify({
         'locations': locations_schema.dump(locations),
@@ -196,6 +165,8 @@ def update_location(user_id, location_id):
     except ValidationError as e:
         return jsonify({"errors": e.messages}), 400
     
+    previous_tags = listing_tags(location.listing) if location.listing else set()
+
     # Update location fields
     fields = ["address", "city", "state", "zip_code", "country", "latitude", "longitude"]
     for field in fields:
@@ -203,6 +174,8 @@ def update_location(user_id, location_id):
             setattr(location, field, incoming_data[field])
 
     db.session.commit()
+    if location.listing:
+        invalidate_listing(previous_tags, listing_tags(location.listing))
     return location_schema.jsonify(location), 200
 
 @locations_bp.route("/<int:location_id>", methods=["DELETE"])
@@ -1,74 +1,74 @@
 from flask import request, jsonify
-from sqlalchemy import select, and_, or_, func, desc
+from sqlalchemy import select, update, and_, or_, desc
+from sqlalchemy.orm import joinedload
 from marshmallow import ValidationError
-from app.models import Message, User, db
+from app.models import Conversation, ConversationParticipant, Message, User, db
 # from app.blueprints.messaging.schemas import message_schema, messages_schema, message_create_schema
 from app.blueprints.messaging import messaging_bp
 from app.utils.util import user_token_required
+from app.utils.pagination import pagination_args, keyset_paginate, InvalidCursor
 from app.extensions import limiter
 from datetime import datetime
 
 
 @messaging_bp.route('/conversations', methods=['GET'])
 @user_token_required
-def get_conversations(current_user):
-    """Get all conversations for the current user"""
+def get_conversations(user_id):
+    """Get the current user's conversations, most recently active first"""
+    page_request = pagination_args()
+
+    # One range scan of the user's participant rows, joined to the other user and the last message
+    query = select(ConversationParticipant).options(
+        joinedload(ConversationParticipant.other_user),
+        joinedload(ConversationParticipant.conversation).joinedload(Conversation.last_message)
+    ).where(ConversationParticipant.user_id == user_id)
+
     try:
-        # Get conversations by finding messages where current user is sender or receiver
-        # Group by the other participant to create conversation threads
-        conversations_query = db.session.query(
-            func.max(Message.message_id).label('latest_message_id'),
-            func.case(
-                (Message.sender_id == current_user.user_id, Message.receiver_id),
-                else_=Message.sender_id
-            ).label('other_user_id')
-        ).filter(
-            or_(
-                Message.sender_id == current_user.user_id,
-                Message.receiver_id == current_user.user_id
-            )
-        ).group_by('other_user_id').all()
-
-        conversations = []
-        for conv in conversations_query:
-            # Get the latest message
-            latest_message = db.session.get(Message, conv.latest_message_id)
-            # Get the other user
-            other_user = db.session.get(User, conv.other_user_id)
-            
-            if latest_message and other_user:
-                # Create conversation ID using sorted user IDs for consistency
-                user_ids = sorted([current_user.user_id, other_user.user_id])
-                conversation_id = f"conv_{user_ids[0]}_{user_ids[1]}"
-                
-                conversations.append({
-                    'id': conversation_id,
-                    'participant': {
-                        'id': str(other_user.user_id),
-                        'name': f"{other_user.first_name} {other_user.last_name}".strip() or other_user.email,
-                        'avatar': 'https://images.pexels.com/photos/1040880/pexels-photo-1040880.jpeg'  # TODO: Use actual avatar
-                    },
-                    'lastMessage': {
-                        'text': latest_message.content,
-                        'timestamp': int(latest_message.sent_at.timestamp() * 1000),
-                        'unread': latest_message.sender_id != current_user.user_id  # Simple unread logic
-                    },
-                    'item': {
-                        'id': '1',  # TODO: Link to actual listing if available
-                        'title': 'Item Discussion',
-                        'status': 'active'
-                    }
-                })
-
-        return jsonify({'conversations': conversations}), 200
+        participants, pagination_info = keyset_paginate(
+            query,
+            [desc(ConversationParticipant.last_sent_at), desc(ConversationParticipant.conversation_id)],
+            page_request
+        )
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
 
-    except Exception as e:
-        return jsonify({'error': 'Failed to fetch conversations', 'details': str(e)}), 500
+    conversations = []
+    for participant in participants:
+        other_user = participant.other_user
+        latest_message = participant.conversation.last_message
+        if latest_message is None:
+            continue
+
+        # Create conversation ID using sorted user IDs for consistency
+        user_ids = sorted([user_id, other_user.user_id])
+        conversation_id = f"conv_{user_ids[0]}_{user_ids[1]}"
+
+        conversations.append({
+            'id': conversation_id,
+            'participant': {
+                'id': str(other_user.user_id),
+                'name': f"{other_user.first_name} {other_user.last_name}".strip() or other_user.email,
+                'avatar': 'https://images.pexels.com/photos/1040880/pexels-photo-1040880.jpeg'  # TODO: Use actual avatar
+            },
+            'lastMessage': {
+                'text': latest_message.content,
+                'timestamp': int(latest_message.sent_at.timestamp() * 1000),
+                'unread': participant.unread_count > 0
+            },
+            'unreadCount': participant.unread_count,
+            'item': {
+                'id': '1',  # TODO: Link to actual listing if available
+                'title': 'Item Discussion',
+                'status': 'active'
+            }
+        })
+
+    return jsonify({'conversations': conversations, 'pagination': pagination_info}), 200
 
 
 @messaging_bp.route('/<conversation_id>', methods=['GET'])
 @user_token_required
-def get_messages(current_user, conversation_id):
+def get_messages(user_id, conversation_id):
     """Get all messages in a conversation"""
     try:
         # Extract user IDs from conversation_id (format: conv_1_2)
@@ -82,7 +82,7 @@ def get_messages(current_user, conversation_id):
             return jsonify({'error': 'Invalid conversation ID format'}), 400
         
         # Verify current user is part of this conversation
-        if current_user.user_id not in [user1_id, user2_id]:
+        if user_id not in [user1_id, user2_id]:
             return jsonify({'error': 'Access denied to this conversation'}), 403
         
         # Get all messages between these two users
@@ -94,13 +94,26 @@ def get_messages(current_user, conversation_id):
         ).order_by(Message.sent_at)
         
         messages = db.session.execute(messages_query).scalars().all()
+
+        # Reading the conversation clears its unread count
+        other_user_id = user2_id if user_id == user1_id else user1_id
+        db.session.execute(
+            update(ConversationParticipant)
+            .where(
+                ConversationParticipant.user_id == user_id,
+                ConversationParticipant.other_user_id == other_user_id,
+                ConversationParticipant.unread_count > 0
+            )
+            .values(unread_count=0)
+        )
+        db.session.commit()
         
         formatted_messages = []
         for msg in messages:
             formatted_messages.append({
                 'id': f"msg_{msg.message_id}",
                 'text': msg.content,
-                'sender': 'user' if msg.sender_id == current_user.user_id else 'other',
+                'sender': 'user' if msg.sender_id == user_id else 'other',
                 'timestamp': int(msg.sent_at.timestamp() * 1000)
             })
         
@@ -113,7 +126,7 @@ def get_messages(current_user, conversation_id):
 @messaging_bp.route('/<conversation_id>', methods=['POST'])
 @user_token_required
 @limiter.limit('30 per minute')
-def send_message(current_user, conversation_id):
+def send_message(user_id, conversation_id):
     """Send a message in a conversation"""
     try:
         data = request.get_json()
@@ -135,11 +148,13 @@ def send_message(current_user, conversation_id):
             return jsonify({'error': 'Invalid conversation ID format'}), 400
         
         # Verify current user is part of this conversation
-        if current_user.user_id not in [user1_id, user2_id]:
+        if user_id not in [user1_id, user2_id]:
             return jsonify({'error': 'Access denied to this conversation'}), 403
         
         # Determine receiver (the other user in the conversation)
-        receiver_id = user2_id if current_user.user_id == user1_id else user1_id
+        receiver_id = user2_id if user_id == user1_id else user1_id
+        if receiver_id == user_id:
+            return jsonify({'error': 'Cannot send a message to yourself'}), 400
         
         # Verify receiver exists
         receiver = db.session.get(User, receiver_id)
@@ -149,11 +164,12 @@ def send_message(current_user, conversation_id):
         # Create new message
         new_message = Message(
             content=message_text,
-            sender_id=current_user.user_id,
+            sender_id=user_id,
             receiver_id=receiver_id,
             sent_at=datetime.utcnow()
         )
         
+        # The conversation and unread counts are updated in the same flush (see models.py)
         db.session.add(new_message)
         db.session.commit()
         
@@ -169,21 +185,21 @@ def send_message(current_user, conversation_id):
         return jsonify({'error': 'Failed to send message', 'details': str(e)}), 500
 
 
-@messaging_bp.route('/conversation/<int:user_id>', methods=['POST'])
+@messaging_bp.route('/conversation/<int:other_user_id>', methods=['POST'])
 @user_token_required
-def start_conversation(current_user, user_id):
+def start_conversation(user_id, other_user_id):
     """Start a new conversation with another user"""
     try:
         # Verify the other user exists
-        other_user = db.session.get(User, user_id)
+        other_user = db.session.get(User, other_user_id)
         if not other_user:
             return jsonify({'error': 'User not found'}), 404
         
-        if user_id == current_user.user_id:
+        if other_user_id == user_id:
             return jsonify({'error': 'Cannot start conversation with yourself'}), 400
         
         # Create conversation ID
-        user_ids = sorted([current_user.user_id, user_id])
+        user_ids = sorted([user_id, other_user_id])
         conversation_id = f"conv_{user_ids[0]}_{user_ids[1]}"
         
         return jsonify({
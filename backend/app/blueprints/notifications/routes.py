@@ -16,6 +16,7 @@ from app.blueprints.notifications.schemas import (
 )
 from app.blueprints.notifications import notifications_bp
 from app.utils.util import user_token_required, admin_token_required
+from app.utils.pagination import pagination_args, keyset_paginate, InvalidCursor
 from app.extensions import limiter
 
 # ========================================
@@ -26,40 +27,21 @@ from app.extensions import limiter
 @user_token_required
 def get_user_notifications(user_id):
     """Get all general notifications for the authenticated user"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 20, type=int), 100)
+    page_request = pagination_args()
     is_read = request.args.get('is_read', type=bool)
 
     query = select(GeneralNotification).where(GeneralNotification.user_id == user_id)
     
     if is_read is not None:
         query = query.where(GeneralNotification.is_read == is_read)
-    
-    query = query.order_by(desc(GeneralNotification.created_at))
-
-    # Get total count
-    total_query = select(func.count(GeneralNotification.notification_id)).where(
-        GeneralNotification.user_id == user_id
-    )
-    if is_read is not None:
-        total_query = total_query.where(GeneralNotification.is_read == is_read)
-
-    total = db.session.execute(total_query).scalar()
 
     # Apply pagination
-    offset = (page - 1) * per_page
-    query = query.offset(offset).limit(per_page)
-
-    notifications = db.session.execute(query).scalars().all()
-
-    pagination_info = {
-        'page': page,
-        'per_page': per_page,
-        'total': total,
-        'total_pages': (total + per_page - 1) // per_page,
-        'has_prev': page > 1,
-        'has_next': page * per_page < total
-    }
+    try:
+        notifications, pagination_info = keyset_paginate(
+            query, [desc(GeneralNotification.created_at), desc(GeneralNotification.notification_id)], page_request
+        )
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
 
     return jsonify({
         'notifications': general_notifications_schema.dump(notifications),
@@ -157,40 +139,21 @@ def get_notification_count(user_id):
 @user_token_required
 def get_delivery_notifications(user_id):
     """Get all delivery notifications for the authenticated user"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 20, type=int), 100)
+    page_request = pagination_args()
     notification_type = request.args.get('type')
 
     query = select(DeliveryNotification).where(DeliveryNotification.user_id == user_id)
     
     if notification_type:
         query = query.where(DeliveryNotification.type == notification_type)
-    
-    query = query.order_by(desc(DeliveryNotification.sent_at))
-
-    # Get total count
-    total_query = select(func.count(DeliveryNotification.delivery_notification_id)).where(
-        DeliveryNotification.user_id == user_id
-    )
-    if notification_type:
-        total_query = total_query.where(DeliveryNotification.type == notification_type)
-
-    total = db.session.execute(total_query).scalar()
 
     # Apply pagination
-    offset = (page - 1) * per_page
-    query = query.offset(offset).limit(per_page)
-
-    notifications = db.session.execute(query).scalars().all()
-
-    pagination_info = {
-        'page': page,
-        'per_page': per_page,
-        'total': total,
-        'total_pages': (total + per_page - 1) // per_page,
-        'has_prev': page > 1,
-        'has_next': page * per_page < total
-    }
+    try:
+        notifications, pagination_info = keyset_paginate(
+            query, [desc(DeliveryNotification.sent_at), desc(DeliveryNotification.delivery_notification_id)], page_request
+        )
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
 
     return jsonify({
         'delivery_notifications': delivery_notifications_schema.dump(notifications),
@@ -333,23 +296,16 @@ def create_delivery_notification(user_id):
 @admin_token_required
 def admin_get_all_general_notifications(user_id):
     """Admin: Get all general notifications with pagination"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 50, type=int), 100)
+    page_request = pagination_args(default_per_page=50)
     
-    query = select(GeneralNotification).order_by(desc(GeneralNotification.created_at))
-    total = db.session.execute(select(func.count(GeneralNotification.notification_id))).scalar()
-    
-    offset = (page - 1) * per_page
-    notifications = db.session.execute(query.offset(offset).limit(per_page)).scalars().all()
-    
-    pagination_info = {
-        'page': page,
-        'per_page': per_page,
-        'total': total,
-        'total_pages': (total + per_page - 1) // per_page,
-        'has_prev': page > 1,
-        'has_next': page * per_page < total
-    }
+    query = select(GeneralNotification)
+
+    try:
+        notifications, pagination_info = keyset_paginate(
+            query, [desc(GeneralNotification.created_at), desc(GeneralNotification.notification_id)], page_request
+        )
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
     
     return jsonify({
         'notifications': general_notifications_schema.dump(notifications),
@@ -360,23 +316,16 @@ def admin_get_all_general_notifications(user_id):
 @admin_token_required
 def admin_get_all_delivery_notifications(user_id):
     """Admin: Get all delivery notifications with pagination"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 50, type=int), 100)
-    
-    query = select(DeliveryNotification).order_by(desc(DeliveryNotification.sent_at))
-    total = db.session.execute(select(func.count(DeliveryNotification.delivery_notification_id))).scalar()
-    
-    offset = (page - 1) * per_page
-    notifications = db.session.execute(query.offset(offset).limit(per_page)).scalars().all()
+    page_request = pagination_args(default_per_page=50)
     
-    pagination_info = {
-        'page': page,
-        'per_page': per_page,
-        'total': total,
-        'total_pages': (total + per_page - 1) // per_page,
-        'has_prev': page > 1,
-        'has_next': page * per_page < total
-    }
+    query = select(DeliveryNotification)
+
+    try:
+        notifications, pagination_info = keyset_paginate(
+            query, [desc(DeliveryNotification.sent_at), desc(DeliveryNotification.delivery_notification_id)], page_request
+        )
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
     
     return jsonify({
         'delivery_notifications': delivery_notifications_schema.dump(notifications),
@@ -13,6 +13,7 @@ from app.blueprints.search_logs.schemas import (
 from app.blueprints.search_logs import search_logs_bp
 from app.extensions import cache, limiter
 from app.utils.util import user_token_required, admin_token_required
+from app.utils.pagination import pagination_args, keyset_paginate, InvalidCursor
 
 # ========================================
 # AUTHENTICATED USER ROUTES
@@ -64,28 +65,16 @@ def create_search_log(user_id):
 @user_token_required
 def get_user_search_logs(user_id):
     """Get search logs for the authenticated user"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 20, type=int), 100)
+    page_request = pagination_args()
     
-    query = select(SearchLog).where(SearchLog.user_id == user_id).order_by(desc(SearchLog.searched_at))
-    
-    total = db.session.execute(
-        select(func.count(SearchLog.search_log_id)).where(SearchLog.user_id == user_id)
-    ).scalar()
-
-    offset = (page - 1) * per_page
-    query = query.offset(offset).limit(per_page)
-
-    search_logs = db.session.execute(query).scalars().all()
+    query = select(SearchLog).where(SearchLog.user_id == user_id)
 
-    pagination_info = {
-        'page': page,
-        'per_page': per_page,
-        'total': total,
-        'total_pages': (total + per_page - 1) // per_page,
-        'has_prev': page > 1,
-        'has_next': page * per_page < total
-    }
+    try:
+        search_logs, pagination_info = keyset_paginate(
+            query, [desc(SearchLog.searched_at), desc(SearchLog.search_log_id)], page_request
+        )
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
 
     return jsonify({
         'search_logs': search_logs_schema.dump(search_logs),
@@ -228,23 +217,16 @@ def get_popular_searches():
 @admin_token_required
 def admin_get_all_search_logs(user_id):
     """Admin: Get all search logs with pagination"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 50, type=int), 100)
+    page_request = pagination_args(default_per_page=50)
     
-    query = select(SearchLog).order_by(desc(SearchLog.searched_at))
-    total = db.session.execute(select(func.count(SearchLog.search_log_id))).scalar()
-    
-    offset = (page - 1) * per_page
-    search_logs = db.session.execute(query.offset(offset).limit(per_page)).scalars().all()
-    
-    pagination_info = {
-        'page': page,
-        'per_page': per_page,
-        'total': total,
-        'total_pages': (total + per_page - 1) // per_page,
-        'has_prev': page > 1,
-        'has_next': page * per_page < total
-    }
+    query = select(SearchLog)
+
+    try:
+        search_logs, pagination_info = keyset_paginate(
+            query, [desc(SearchLog.searched_at), desc(SearchLog.search_log_id)], page_request
+        )
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
     
     return jsonify({
         'search_logs': search_logs_schema.dump(search_logs),
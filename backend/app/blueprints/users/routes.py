@@ -1,16 +1,24 @@
 from flask import request, jsonify, Flask
-from sqlalchemy import select, func
+from sqlalchemy import select, func, update
 from marshmallow import ValidationError
 from app.models import User, Role, Location, db
 from app.blueprints.users.schemas import (
     user_schema, users_schema, role_schema, roles_schema, 
     user_update_schema, user_registration_schema, login_schema
 )
-from app.blueprints.auth.schemas import AuthUserSchema
+from app.blueprints.auth.schemas import auth_user_serializer
 from app.blueprints.users import users_bp
-from werkzeug.security import generate_password_hash, check_password_hash
-from app.utils.util import encode_user_token, user_token_required, admin_token_required
-from app.extensions import limiter
+from app.utils.util import encode_user_token, user_token_required, admin_token_required, get_current_user
+from app.utils.pagination import pagination_args, keyset_paginate, InvalidCursor
+from app.utils.export import ndjson_export, InvalidExportFilter
+from app.extensions import limiter, tagged_cache, add_cache_tags, conditional_response
+from app.utils.identity import current_identity_cache, current_role_membership
+from app.utils.hashing import hash_password, verify_password
+from app.utils.revocation import current_revocation_list
+
+# Role writes bump ROLES_TAG, so the cached role list can live long
+ROLES_CACHE_TIMEOUT = 24 * 60 * 60
+ROLES_TAG = 'roles'
 
 # ========================================
 # PUBLIC ROUTES (No Authentication Required)
@@ -51,7 +59,7 @@ def register_user():
         db.session.flush()
 
     # Create user
-    hashed_password = generate_password_hash(validated_data["password"])
+    hashed_password = hash_password(validated_data["password"])
     new_user = User(
         first_name=validated_data["first_name"],
         email=validated_data["email"],
@@ -62,11 +70,10 @@ def register_user():
     db.session.add(new_user)
     db.session.commit()
 
-    token = encode_user_token(new_user.user_id)
-    auth_user_schema = AuthUserSchema()
+    token = encode_user_token(new_user.user_id, [], new_user.role_version)
     return jsonify({
         "token": token,
-        "user": auth_user_schema.dump(new_user)
+        "user": auth_user_serializer.dump(new_user)
     }), 201
 
 @users_bp.route("/login", methods=["POST"])
@@ -82,13 +89,22 @@ def login_user():
         select(User).where(User.email == validated_data["email"])
     ).scalars().first()
     
-    if not user or not check_password_hash(user.password_hash, validated_data["password"]):
+    if not user:
+        return jsonify({"error": "Invalid email or password"}), 401
+
+    password_matches, rehashed = verify_password(user.password_hash, validated_data["password"])
+    if not password_matches:
         return jsonify({"error": "Invalid email or password"}), 401
 
     if not user.is_active:
         return jsonify({"error": "Account is deactivated"}), 401
 
-    token = encode_user_token(user.user_id)
+    if rehashed:
+        # Stored with an older KDF or cost; upgrade it while we have the password
+        user.password_hash = rehashed
+        db.session.commit()
+
+    token = encode_user_token(user.user_id, [role.name for role in user.roles], user.role_version)
     return jsonify({
         "message": "Login successful",
         "token": token,
@@ -96,8 +112,10 @@ def login_user():
     }), 200
 
 @users_bp.route("/roles", methods=["GET"])
+@tagged_cache.cached(timeout=ROLES_CACHE_TIMEOUT)
 def get_roles():
     """Public endpoint to get all roles"""
+    add_cache_tags(ROLES_TAG)
     roles = db.session.execute(select(Role)).scalars().all()
     return roles_schema.jsonify(roles), 200
 
@@ -109,23 +127,20 @@ def get_roles():
 @user_token_required
 def get_profile(user_id):
     """Get current user's profile"""
-    user = db.session.execute(
-        select(User).where(User.user_id == user_id)
-    ).scalars().first()
+    user = get_current_user()
     
     if not user:
         return jsonify({"error": "User not found"}), 404
     
-    return user_schema.jsonify(user), 200
+    # The profile lists IDs from most related tables, so the ETag is a hash of the body
+    return conditional_response(user_schema.jsonify(user))
 
 @users_bp.route("/profile", methods=["PUT"])
 @user_token_required
 @limiter.limit('10 per minute')
 def update_profile(user_id):
     """Update current user's profile"""
-    user = db.session.execute(
-        select(User).where(User.user_id == user_id)
-    ).scalars().first()
+    user = get_current_user()
     
     if not user:
         return jsonify({"error": "User not found"}), 404
@@ -138,9 +153,10 @@ def update_profile(user_id):
 
     # Handle password change
     if 'current_password' in validated_data:
-        if not check_password_hash(user.password_hash, validated_data['current_password']):
+        password_matches, _ = verify_password(user.password_hash, validated_data['current_password'])
+        if not password_matches:
             return jsonify({"error": "Current password is incorrect"}), 400
-        user.password_hash = generate_password_hash(validated_data['new_password'])
+        user.password_hash = hash_password(validated_data['new_password'])
 
     # Update basic fields
     for field in ['first_name', 'last_name', 'phone']:
@@ -176,6 +192,8 @@ def update_profile(user_id):
             user.location_id = location.location_id
 
     db.session.commit()
+    # Owner name appears on cached listing responses
+    tagged_cache.bump(f'owner:{user_id}')
     return user_schema.jsonify(user), 200
 
 @users_bp.route("/avatar", methods=["POST"])
@@ -190,9 +208,7 @@ def upload_avatar(user_id):
         if not image_uri:
             return jsonify({"error": "imageUri is required"}), 400
             
-        user = db.session.execute(
-            select(User).where(User.user_id == user_id)
-        ).scalars().first()
+        user = get_current_user()
         
         if not user:
             return jsonify({"error": "User not found"}), 404
@@ -227,29 +243,32 @@ def upload_avatar(user_id):
 @limiter.limit('20 per minute')
 def get_all_users(user_id):
     """Admin: Get all users with pagination"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 20, type=int), 100)
+    page_request = pagination_args()
     
     query = select(User)
-    total = db.session.execute(select(func.count(User.user_id))).scalar()
-    
-    offset = (page - 1) * per_page
-    users = db.session.execute(query.offset(offset).limit(per_page)).scalars().all()
-    
-    pagination_info = {
-        'page': page,
-        'per_page': per_page,
-        'total': total,
-        'total_pages': (total + per_page - 1) // per_page,
-        'has_prev': page > 1,
-        'has_next': page * per_page < total
-    }
+
+    try:
+        users, pagination_info = keyset_paginate(query, [User.user_id], page_request)
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
     
     return jsonify({
         'users': users_schema.dump(users),
         'pagination': pagination_info
     }), 200
 
+@users_bp.route("/users/export", methods=["GET"])
+@admin_token_required
+@limiter.limit('10 per minute')
+def export_users(user_id):
+    """Admin: Stream all users as newline-delimited JSON (?updated_since= for incremental exports)"""
+    columns = [column for column in User.__table__.c if column.name != 'password_hash']
+
+    try:
+        return ndjson_export(select(*columns), User.updated_at, User.user_id)
+    except InvalidExportFilter as e:
+        return jsonify({"error": str(e)}), 400
+
 @users_bp.route("/users/<int:target_user_id>", methods=["GET"])
 @admin_token_required
 @limiter.limit('30 per minute')
@@ -278,6 +297,9 @@ def deactivate_user(user_id, target_user_id):
     
     user.is_active = False
     db.session.commit()
+    current_identity_cache().evict_users(target_user_id)
+    # Tokens issued so far stay invalid even after the user is reactivated
+    current_revocation_list().revoke_user(target_user_id)
     
     return jsonify({"message": "User deactivated successfully"}), 200
 
@@ -295,6 +317,7 @@ def activate_user(user_id, target_user_id):
     
     user.is_active = True
     db.session.commit()
+    current_identity_cache().evict_users(target_user_id)
     
     return jsonify({"message": "User activated successfully"}), 200
 
@@ -316,6 +339,7 @@ def create_role(user_id):
     new_role = Role(name=name)
     db.session.add(new_role)
     db.session.commit()
+    tagged_cache.bump(ROLES_TAG)
     return role_schema.jsonify(new_role), 201
 
 @users_bp.route("/roles/<int:role_id>", methods=["GET"])
@@ -348,8 +372,12 @@ def update_role(user_id, role_id):
     if existing:
         return jsonify({"error": "Role name already exists"}), 400
 
+    member_ids = [member.user_id for member in role.users]
     role.name = new_name
+    _expire_role_claims(member_ids)
     db.session.commit()
+    tagged_cache.bump(ROLES_TAG)
+    _forget_roles(member_ids)
     return role_schema.jsonify(role), 200
 
 @users_bp.route("/roles/<int:role_id>", methods=["DELETE"])
@@ -361,6 +389,22 @@ def delete_role(user_id, role_id):
     if not role:
         return jsonify({"error": "Role not found"}), 404
 
+    member_ids = [member.user_id for member in role.users]
     db.session.delete(role)
+    _expire_role_claims(member_ids)
     db.session.commit()
-    return jsonify({"message": f"Role '{role.name}' deleted successfully"}), 200
\ No newline at end of file
+    tagged_cache.bump(ROLES_TAG)
+    _forget_roles(member_ids)
+    return jsonify({"message": f"Role '{role.name}' deleted successfully"}), 200
+
+def _expire_role_claims(user_ids):
+    """Bump role_version for users whose roles change, so role claims in their tokens stop being trusted"""
+    if user_ids:
+        db.session.execute(
+            update(User).where(User.user_id.in_(user_ids)).values(role_version=User.role_version + 1)
+        )
+
+def _forget_roles(user_ids):
+    """Drop this worker's cached identities and role memberships of users whose roles changed"""
+    current_identity_cache().evict_users(*user_ids)
+    current_role_membership().forget(*user_ids)
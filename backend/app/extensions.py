@@ -1,11 +1,206 @@
+import time
+from functools import wraps
+from flask import request, g, make_response
 from flask_marshmallow import Marshmallow
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_caching import Cache
+from werkzeug.http import generate_etag
 
 ma = Marshmallow()
 limiter = Limiter(
     key_func = get_remote_address,
     default_limits = ['100 per day', '50 per hour'])
 
-cache = Cache()
\ No newline at end of file
+cache = Cache()
+
+
+def cache_stats():
+    """Per-prefix hit/miss counters of the cache backend, or None if it keeps none"""
+    backend = cache.cache
+    return backend.stats() if hasattr(backend, 'stats') else None
+
+
+def conditional_response(response, etag=None):
+    """
+    Adds a strong ETag to a response (a hash of the body unless one is given)
+    and turns it into a bodiless 304 when it matches If-None-Match.
+    """
+    response = make_response(response)
+    if response.status_code != 200:
+        return response
+    if etag is not None:
+        response.set_etag(etag)
+    else:
+        response.add_etag()
+    return response.make_conditional(request)
+
+
+class TaggedCache:
+    """
+    Versioned tags on top of the flask_caching backend.
+
+    Each tag (e.g. 'listing:42', 'owner:7', 'geo:9q8yy') has a version stored
+    in the cache. Cached responses record the versions of the tags they depend
+    on and are only served while all of those versions are unchanged, so a
+    write invalidates exactly the responses that depend on it by bumping the
+    affected tags.
+
+    Entries also carry the ETag of their body, so a conditional GET for a
+    fresh entry is answered with 304 straight from the tag versions.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    @staticmethod
+    def _tag_key(tag):
+        return f'tag:{tag}'
+
+    def versions(self, tags):
+        """
+        Current version of each tag, creating versions for unseen tags.
+
+        Returns:
+            dict: Mapping of tag to version.
+        """
+        tags = sorted(set(tags))
+        if not tags:
+            return {}
+
+        current = dict(zip(tags, self.cache.get_many(*[self._tag_key(tag) for tag in tags])))
+        missing = {tag: self._new_version() for tag, version in current.items() if version is None}
+        if missing:
+            self.cache.set_many({self._tag_key(tag): version for tag, version in missing.items()}, timeout=0)
+            current.update(missing)
+        return current
+
+    def bump(self, *tags):
+        """Invalidate every cached entry that depends on any of the tags"""
+        tags = set(tags)
+        if tags:
+            self.cache.set_many({self._tag_key(tag): self._new_version() for tag in tags}, timeout=0)
+
+    def is_fresh(self, recorded):
+        """Whether recorded tag versions all still match the current ones"""
+        if not recorded:
+            return True
+        tags = list(recorded)
+        current = self.cache.get_many(*[self._tag_key(tag) for tag in tags])
+        return all(recorded[tag] == version for tag, version in zip(tags, current))
+
+    @staticmethod
+    def _new_version():
+        # Unique per bump, so a tag evicted and re-created never matches an old entry
+        return time.time_ns()
+
+    def cached(self, timeout, query_string=False):
+        """
+        Decorator caching a view's successful response together with the
+        versions of the tags it declared through add_cache_tags().
+
+        Versions are read when a tag is declared, not when the response is
+        stored, so a write landing while the view runs leaves the entry
+        stale on arrival instead of recording the new version against the
+        old body. Views declare what they can before reading the data.
+
+        Args:
+            timeout (int): Time to live in seconds.
+            query_string (bool or callable): Whether the query string is part
+                of the key, or a function mapping request.args to the
+                arguments the key varies on, so equivalent query strings
+                share one entry.
+        """
+        def decorator(f):
+            @wraps(f)
+            def decorated(*args, **kwargs):
+                if callable(query_string):
+                    key_args = query_string(request.args)
+                else:
+                    key_args = request.args if query_string else None
+                cache_key = self.view_key(request.path, key_args)
+                entry = self.cache.get(cache_key)
+                if entry is not None and self.is_fresh(entry['tags']):
+                    return conditional_response(self.restore(entry), self.entry_etag(entry))
+
+                g.cache_tags = {}
+                response = make_response(f(*args, **kwargs))
+
+                if response.status_code == 200:
+                    self.store(cache_key, response, g.cache_tags, timeout)
+
+                return conditional_response(response)
+            return decorated
+        return decorator
+
+    def store(self, cache_key, response, versions, timeout):
+        """
+        Caches a response under a view key with the tag versions it was built
+        at, as read by versions() before reading the data behind it.
+        """
+        body = response.get_data()
+        self.cache.set(cache_key, {
+            'body': body,
+            'etag': generate_etag(body),
+            'status': response.status_code,
+            'mimetype': response.mimetype,
+            'tags': dict(versions),
+        }, timeout=timeout)
+
+    def get_fresh_many(self, cache_keys):
+        """
+        Looks up several cached views at once, checking all their tags in a
+        single round trip.
+
+        Returns:
+            dict: Mapping of cache key to entry, for fresh entries only.
+        """
+        cache_keys = list(cache_keys)
+        entries = {
+            key: entry
+            for key, entry in zip(cache_keys, self.cache.get_many(*cache_keys)) if entry is not None
+        } if cache_keys else {}
+
+        tags = sorted({tag for entry in entries.values() for tag in entry['tags']})
+        current = dict(zip(tags, self.cache.get_many(*[self._tag_key(tag) for tag in tags]))) if tags else {}
+        return {
+            key: entry for key, entry in entries.items()
+            if all(current.get(tag) == version for tag, version in entry['tags'].items())
+        }
+
+    @staticmethod
+    def view_key(path, args=None):
+        """Cache key of a view response, optionally varying on query arguments"""
+        key = f'view:{path}'
+        if args:
+            items = sorted((k, v) for k in args for v in args.getlist(k))
+            key += '?' + '&'.join(f'{k}={v}' for k, v in items)
+        return key
+
+    @staticmethod
+    def entry_etag(entry):
+        """ETag of a cached entry's body (hashed on the fly for entries stored without one)"""
+        return entry.get('etag') or generate_etag(entry['body'])
+
+    @staticmethod
+    def restore(entry):
+        """Rebuilds a response from a cached entry"""
+        response = make_response(entry['body'], entry['status'])
+        response.mimetype = entry['mimetype']
+        return response
+
+
+def add_cache_tags(*tags):
+    """
+    Declare tags the response of the current cached view depends on.
+
+    Their versions are read now, so declare them before reading the data
+    they cover; writes after this call invalidate the stored response.
+    """
+    if hasattr(g, 'cache_tags'):
+        new_tags = set(tags) - g.cache_tags.keys()
+        if new_tags:
+            g.cache_tags.update(tagged_cache.versions(new_tags))
+
+
+tagged_cache = TaggedCache(cache)
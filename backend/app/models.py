@@ -1,12 +1,16 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, current_app, has_app_context
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey, String, Integer, Enum, Text, Table, Column, select
-from datetime import datetime
+from sqlalchemy import ForeignKey, String, Integer, Enum, Text, Table, Column, Index, UniqueConstraint, select, and_, event, update, insert, delete, case, inspect, func
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta
 from typing import List
 from flask_marshmallow import Marshmallow
 from marshmallow import ValidationError
 import enum
+from app.utils.geo import geohash_encode
+from app.utils.search import install_listing_search_index
+from app.utils.schema import upgrade_schema
 
 
 # xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx BASE CLASS xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx
@@ -57,9 +61,16 @@ class User(Base):  # <------------------------------------------ User Model
     password_hash: Mapped[str] = mapped_column(String(255), nullable=False)
     phone: Mapped[str] = mapped_column(String(20), nullable=True)
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, nullable=False)
-    updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False, index=True)
     is_active: Mapped[bool] = mapped_column(default=True, nullable=False)
     location_id: Mapped[int] = mapped_column(ForeignKey("locations.location_id"), nullable=True)
+    # Bumped on every change to the user's roles; tokens carry the version their roles claim was issued at
+    role_version: Mapped[int] = mapped_column(default=0, server_default='0', nullable=False)
+
+    # Aggregates over reviews of this user's listings, maintained on Review writes
+    owner_rating_sum: Mapped[int] = mapped_column(default=0, server_default='0', nullable=False)
+    owner_rating_count: Mapped[int] = mapped_column(default=0, server_default='0', nullable=False)
+    owner_rating_avg: Mapped[float] = mapped_column(default=0.0, server_default='0', nullable=False)
 
     roles: Mapped[List["Role"]] = relationship("Role", secondary=user_roles, back_populates="users")
     listings: Mapped[List["Listing"]] = relationship("Listing", back_populates="owner")
@@ -81,12 +92,20 @@ class Listing(Base):  # <------------------------------------------ Listing Mode
     listing_id: Mapped[int] = mapped_column(primary_key=True)
     title: Mapped[str] = mapped_column(String(100), nullable=False)
     description: Mapped[str] = mapped_column(Text)
-    price: Mapped[int] = mapped_column(nullable=False)
-    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, nullable=False)
-    subcategory_id: Mapped[int] = mapped_column(ForeignKey("subcategories.subcategory_id"))
-    owner_id: Mapped[int] = mapped_column(ForeignKey("users.user_id"), nullable=False)
+    price: Mapped[int] = mapped_column(nullable=False, index=True)
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, nullable=False, index=True)
+    updated_at: Mapped[datetime] = mapped_column(
+        default=datetime.utcnow, onupdate=datetime.utcnow, server_default=func.current_timestamp(), nullable=False, index=True
+    )
+    subcategory_id: Mapped[int] = mapped_column(ForeignKey("subcategories.subcategory_id"), index=True)
+    owner_id: Mapped[int] = mapped_column(ForeignKey("users.user_id"), nullable=False, index=True)
     location_id: Mapped[int] = mapped_column(ForeignKey("locations.location_id"))
 
+    # Review aggregates, maintained on Review writes
+    rating_sum: Mapped[int] = mapped_column(default=0, server_default='0', nullable=False)
+    rating_count: Mapped[int] = mapped_column(default=0, server_default='0', nullable=False)
+    rating_avg: Mapped[float] = mapped_column(default=0.0, server_default='0', nullable=False, index=True)
+
     owner: Mapped["User"] = relationship("User", back_populates="listings")
     payments: Mapped[List["Payment"]] = relationship("Payment", back_populates="listing")
     bookings: Mapped[List["Booking"]] = relationship("Booking", back_populates="listing")
@@ -113,6 +132,40 @@ class Message(Base):  # <------------------------------------------ Message Mode
     sender: Mapped["User"] = relationship("User", foreign_keys=[sender_id], back_populates="sent_messages")
     receiver: Mapped["User"] = relationship("User", foreign_keys=[receiver_id], back_populates="received_messages")
 
+class Conversation(Base):  # <------------------------------------------ Conversation Model
+    __tablename__ = "conversations"
+
+    conversation_id: Mapped[int] = mapped_column(primary_key=True)
+    # Participants in ID order, so each pair of users has one row
+    user_low_id: Mapped[int] = mapped_column(ForeignKey("users.user_id"), nullable=False)
+    user_high_id: Mapped[int] = mapped_column(ForeignKey("users.user_id"), nullable=False)
+    last_message_id: Mapped[int] = mapped_column(ForeignKey("messages.message_id"), nullable=True)
+    last_sent_at: Mapped[datetime] = mapped_column(nullable=True)
+
+    last_message: Mapped["Message"] = relationship("Message")
+    participants: Mapped[List["ConversationParticipant"]] = relationship("ConversationParticipant", back_populates="conversation")
+
+    __table_args__ = (
+        UniqueConstraint('user_low_id', 'user_high_id', name='uq_conversations_user_low_id_user_high_id'),
+    )
+
+class ConversationParticipant(Base):  # <------------------------------------------ Conversation Participant Model
+    __tablename__ = "conversation_participants"
+
+    conversation_id: Mapped[int] = mapped_column(ForeignKey("conversations.conversation_id"), primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.user_id"), primary_key=True)
+    other_user_id: Mapped[int] = mapped_column(ForeignKey("users.user_id"), nullable=False)
+    unread_count: Mapped[int] = mapped_column(default=0, server_default='0', nullable=False)
+    # Copy of the conversation's last_sent_at so a user's inbox is one index range
+    last_sent_at: Mapped[datetime] = mapped_column(nullable=True)
+
+    conversation: Mapped["Conversation"] = relationship("Conversation", back_populates="participants")
+    other_user: Mapped["User"] = relationship("User", foreign_keys=[other_user_id])
+
+    __table_args__ = (
+        Index('ix_conversation_participants_user_id_last_sent_at', 'user_id', 'last_sent_at', 'conversation_id'),
+    )
+
 class Payment(Base):  # <------------------------------------------ Payment Model
     __tablename__ = "payment"
 
@@ -138,8 +191,11 @@ class Booking(Base):  # <------------------------------------------ Booking Mode
     start_date: Mapped[datetime] = mapped_column(nullable=False)
     end_date: Mapped[datetime] = mapped_column(nullable=False)
     status: Mapped[BookingStatusEnum] = mapped_column(Enum(BookingStatusEnum, native_enum=False), default=BookingStatusEnum.PENDING)
+    updated_at: Mapped[datetime] = mapped_column(
+        default=datetime.utcnow, onupdate=datetime.utcnow, server_default=func.current_timestamp(), nullable=False, index=True
+    )
 
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.user_id"), nullable=False)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.user_id"), nullable=False, index=True)
     listing_id: Mapped[int] = mapped_column(ForeignKey("listings.listing_id"), nullable=False)
 
     user: Mapped["User"] = relationship("User", back_populates="bookings")
@@ -150,14 +206,70 @@ class Review(Base):  # <------------------------------------------ Review Model
 
     review_id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey('users.user_id'), nullable=False)
-    listing_id: Mapped[int] = mapped_column(ForeignKey('listings.listing_id'), nullable=False)
-    rating: Mapped[int] = mapped_column(Integer, nullable=False)
+    # active_history keeps the previous value around for the aggregate listeners
+    listing_id: Mapped[int] = mapped_column(ForeignKey('listings.listing_id'), nullable=False, active_history=True)
+    rating: Mapped[int] = mapped_column(Integer, nullable=False, active_history=True)
     comment: Mapped[str] = mapped_column(Text, nullable=True)
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, nullable=False)
 
     user: Mapped["User"] = relationship("User", back_populates="reviews")
     listing: Mapped["Listing"] = relationship("Listing", back_populates="reviews")
 
+def apply_review_delta(connection, listing_id, rating_delta, count_delta):
+    """Adjust the rating aggregates of a listing and its owner in place"""
+    listings = Listing.__table__
+    users = User.__table__
+
+    connection.execute(
+        update(listings)
+        .where(listings.c.listing_id == listing_id)
+        .values(
+            rating_sum=listings.c.rating_sum + rating_delta,
+            rating_count=listings.c.rating_count + count_delta,
+            rating_avg=case(
+                (listings.c.rating_count + count_delta > 0,
+                 (listings.c.rating_sum + rating_delta) * 1.0 / (listings.c.rating_count + count_delta)),
+                else_=0.0
+            )
+        )
+    )
+    record_listing_changes(connection, select(listings.c.listing_id).where(listings.c.listing_id == listing_id))
+    connection.execute(
+        update(users)
+        .where(users.c.user_id == select(listings.c.owner_id).where(listings.c.listing_id == listing_id).scalar_subquery())
+        .values(
+            owner_rating_sum=users.c.owner_rating_sum + rating_delta,
+            owner_rating_count=users.c.owner_rating_count + count_delta,
+            owner_rating_avg=case(
+                (users.c.owner_rating_count + count_delta > 0,
+                 (users.c.owner_rating_sum + rating_delta) * 1.0 / (users.c.owner_rating_count + count_delta)),
+                else_=0.0
+            )
+        )
+    )
+
+@event.listens_for(Review, 'after_insert')
+def add_review_to_aggregates(mapper, connection, target):
+    apply_review_delta(connection, target.listing_id, target.rating, 1)
+
+@event.listens_for(Review, 'after_delete')
+def remove_review_from_aggregates(mapper, connection, target):
+    apply_review_delta(connection, target.listing_id, -target.rating, -1)
+
+@event.listens_for(Review, 'after_update')
+def move_review_in_aggregates(mapper, connection, target):
+    state = inspect(target)
+    rating_history = state.attrs.rating.history
+    listing_history = state.attrs.listing_id.history
+    if not rating_history.has_changes() and not listing_history.has_changes():
+        return
+
+    old_rating = rating_history.deleted[0] if rating_history.deleted else target.rating
+    old_listing_id = listing_history.deleted[0] if listing_history.deleted else target.listing_id
+
+    apply_review_delta(connection, old_listing_id, -old_rating, -1)
+    apply_review_delta(connection, target.listing_id, target.rating, 1)
+
 class Availability(Base):  # <------------------------------------------ Availability Model
     __tablename__ = "availability"
 
@@ -208,12 +320,23 @@ class Location(Base):  # <------------------------------------------ Location Mo
     country: Mapped[str] = mapped_column(String(50), nullable=False)
     latitude: Mapped[float] = mapped_column(nullable=True)
     longitude: Mapped[float] = mapped_column(nullable=True)
+    geohash: Mapped[str] = mapped_column(String(12), nullable=True, index=True)
 
     listing: Mapped["Listing"] = relationship("Listing", back_populates="location", uselist=False)
     search_logs: Mapped[List["SearchLog"]] = relationship("SearchLog", back_populates="location")
     listing: Mapped["Listing"] = relationship("Listing", back_populates="location", uselist=False)
     search_logs: Mapped[List["SearchLog"]] = relationship("SearchLog", back_populates="location")
 
+    __table_args__ = (
+        Index('ix_locations_latitude_longitude', 'latitude', 'longitude'),
+    )
+
+@event.listens_for(Location, 'before_insert')
+@event.listens_for(Location, 'before_update')
+def set_location_geohash(mapper, connection, target):
+    """Keep the spatial index cell in sync with the coordinates"""
+    target.geohash = geohash_encode(target.latitude, target.longitude)
+
 class GeneralNotification(Base):  # <------------------------------------------ General Notifications Model
     __tablename__ = "general_notifications"
 
@@ -225,6 +348,10 @@ class GeneralNotification(Base):  # <------------------------------------------
 
     user:Mapped["User"] = relationship("User", back_populates="notifications")
 
+    __table_args__ = (
+        Index('ix_general_notifications_user_id_created_at', 'user_id', 'created_at'),
+    )
+
 class SearchLog(Base):  # <------------------------------------------ Search Log Model
     __tablename__ = "search_logs"
 
@@ -237,6 +364,10 @@ class SearchLog(Base):  # <------------------------------------------ Search Log
     location: Mapped["Location"] = relationship("Location", back_populates="search_logs")
     user: Mapped["User"] = relationship("User", back_populates="search_logs")
 
+    __table_args__ = (
+        Index('ix_search_logs_user_id_searched_at', 'user_id', 'searched_at'),
+    )
+
 class Delivery(Base):  # <------------------------------------------ Delivery Model
     __tablename__ = "deliveries"
 
@@ -263,6 +394,10 @@ class DeliveryNotification(Base):  # <------------------------------------------
     user: Mapped["User"] = relationship("User", back_populates="delivery_notifications")
     delivery: Mapped["Delivery"] = relationship("Delivery", back_populates="delivery_notifications")
 
+    __table_args__ = (
+        Index('ix_delivery_notifications_user_id_sent_at', 'user_id', 'sent_at'),
+    )
+
 class Amenity(Base):  # <------------------------------------------ Amenity Model
     __tablename__ = "amenities"
 
@@ -280,3 +415,165 @@ class ListingFeature(Base):  # <------------------------------------------ Listi
     value: Mapped[str] = mapped_column(String(100))
 
     listing: Mapped["Listing"] = relationship("Listing", back_populates="features")
+
+class TokenRevocation(Base):  # <------------------------------------------ Token Revocation Model
+    __tablename__ = "token_revocations"
+
+    revocation_id: Mapped[int] = mapped_column(primary_key=True)
+    # One token by jti, or every token of the user issued up to issued_before
+    jti: Mapped[str] = mapped_column(String(64), nullable=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.user_id"), nullable=False)
+    issued_before: Mapped[datetime] = mapped_column(nullable=True)
+    # When the last token this covers expires; the row can go after that
+    expires_at: Mapped[datetime] = mapped_column(nullable=False, index=True)
+    revoked_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, nullable=False, index=True)
+
+    # Workers read new rows by id, so SQLite must not hand out the ids of deleted rows again
+    __table_args__ = {'sqlite_autoincrement': True}
+
+class ListingChange(Base):  # <------------------------------------------ Listing Change Feed Model
+    __tablename__ = "listing_changes"
+
+    change_id: Mapped[int] = mapped_column(primary_key=True)
+    listing_id: Mapped[int] = mapped_column(nullable=False)  # No FK, deleted listings are recorded too
+    changed_at: Mapped[datetime] = mapped_column(server_default=func.current_timestamp(), nullable=False, index=True)
+
+    # Readers follow the feed by id, so SQLite must not hand out the ids of pruned rows again
+    __table_args__ = {'sqlite_autoincrement': True}
+
+# xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx ROLE VERSIONS xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx
+
+@event.listens_for(User.roles, 'append')
+@event.listens_for(User.roles, 'remove')
+def bump_role_version(target, value, initiator):
+    # Also fires for role.users edits through the backref
+    target.role_version = (target.role_version or 0) + 1
+
+# xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx CHANGE FEED xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx
+
+def record_listing_changes(connection, listing_ids):
+    """
+    Append listings to the change feed read by the in-memory listing catalog
+    and suggestion index.
+
+    Args:
+        connection: The connection of the flush doing the write.
+        listing_ids: A select of listing IDs, or a single listing ID.
+    """
+    if not has_app_context():
+        return
+    config = current_app.config
+    if not (config.get('LISTING_CATALOG_ENABLED') or config.get('LISTING_SUGGEST_ENABLED')):
+        return
+
+    changes = ListingChange.__table__
+    if isinstance(listing_ids, int):
+        connection.execute(insert(changes).values(listing_id=listing_ids))
+    else:
+        connection.execute(insert(changes).from_select(['listing_id'], listing_ids))
+
+def prune_listing_changes(retention):
+    """
+    Delete change feed rows older than retention seconds, in a transaction of
+    its own so it never commits the caller's session.
+    """
+    changes = ListingChange.__table__
+    cutoff = datetime.utcnow() - timedelta(seconds=retention)
+    with db.engine.begin() as connection:
+        connection.execute(delete(changes).where(changes.c.changed_at < cutoff))
+
+@event.listens_for(Listing, 'after_insert')
+@event.listens_for(Listing, 'after_update')
+@event.listens_for(Listing, 'after_delete')
+def record_listing_write(mapper, connection, target):
+    record_listing_changes(connection, target.listing_id)
+
+@event.listens_for(Location, 'after_update')
+def record_location_write(mapper, connection, target):
+    listings = Listing.__table__
+    record_listing_changes(connection, select(listings.c.listing_id).where(listings.c.location_id == target.location_id))
+
+@event.listens_for(Subcategory, 'after_update')
+def record_subcategory_write(mapper, connection, target):
+    listings = Listing.__table__
+    record_listing_changes(connection, select(listings.c.listing_id).where(listings.c.subcategory_id == target.subcategory_id))
+
+# xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx CONVERSATIONS xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx
+
+@event.listens_for(Message, 'after_insert')
+def add_message_to_conversation(mapper, connection, target):
+    """Move the pair's conversation to this message and count it unread for the receiver"""
+    conversations = Conversation.__table__
+    participants = ConversationParticipant.__table__
+    low_id, high_id = sorted((target.sender_id, target.receiver_id))
+
+    pair_conversation = select(conversations.c.conversation_id).where(
+        conversations.c.user_low_id == low_id, conversations.c.user_high_id == high_id
+    )
+    conversation_id = connection.execute(pair_conversation).scalar()
+    if conversation_id is None:
+        try:
+            # In a savepoint, so losing the race for the pair's first message only undoes this insert
+            with connection.begin_nested():
+                conversation_id = connection.execute(
+                    insert(conversations).values(user_low_id=low_id, user_high_id=high_id)
+                ).inserted_primary_key[0]
+                connection.execute(insert(participants), [
+                    {'conversation_id': conversation_id, 'user_id': user_id, 'other_user_id': other_user_id}
+                    for user_id, other_user_id in {(low_id, high_id), (high_id, low_id)}
+                ])
+        except IntegrityError:
+            # A locking read sees the other writer's row even under a repeatable-read snapshot
+            conversation_id = connection.execute(pair_conversation.with_for_update(read=True)).scalar_one()
+
+    connection.execute(
+        update(conversations)
+        .where(conversations.c.conversation_id == conversation_id)
+        .values(last_message_id=target.message_id, last_sent_at=target.sent_at)
+    )
+    connection.execute(
+        update(participants)
+        .where(participants.c.conversation_id == conversation_id)
+        .values(
+            unread_count=participants.c.unread_count + case(
+                (and_(participants.c.user_id == target.receiver_id, participants.c.user_id != target.sender_id), 1),
+                else_=0
+            ),
+            last_sent_at=target.sent_at
+        )
+    )
+
+def rebuild_conversations(target, connection, **kw):
+    """Fills the conversation tables from existing messages when they are first created"""
+    messages = Message.__table__
+    conversations = Conversation.__table__
+    participants = ConversationParticipant.__table__
+    low_id = case((messages.c.sender_id < messages.c.receiver_id, messages.c.sender_id), else_=messages.c.receiver_id)
+    high_id = case((messages.c.sender_id < messages.c.receiver_id, messages.c.receiver_id), else_=messages.c.sender_id)
+
+    connection.execute(insert(conversations).from_select(
+        ['user_low_id', 'user_high_id', 'last_message_id', 'last_sent_at'],
+        select(low_id, high_id, func.max(messages.c.message_id), func.max(messages.c.sent_at)).group_by(low_id, high_id)
+    ))
+    # Read state wasn't tracked before, so existing messages start out read
+    for user_id, other_user_id in (
+        (conversations.c.user_low_id, conversations.c.user_high_id),
+        (conversations.c.user_high_id, conversations.c.user_low_id),
+    ):
+        query = select(conversations.c.conversation_id, user_id, other_user_id, conversations.c.last_sent_at)
+        if user_id is conversations.c.user_high_id:
+            query = query.where(conversations.c.user_low_id != conversations.c.user_high_id)
+        connection.execute(insert(participants).from_select(
+            ['conversation_id', 'user_id', 'other_user_id', 'last_sent_at'], query
+        ))
+
+event.listen(ConversationParticipant.__table__, 'after_create', rebuild_conversations)
+
+# xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx SCHEMA UPGRADES xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx
+
+# Before the search index, whose rebuild reads the upgraded tables
+event.listen(Base.metadata, 'after_create', upgrade_schema)
+
+# xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx SEARCH INDEX xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx
+
+event.listen(Base.metadata, 'after_create', install_listing_search_index)
@@ -0,0 +1,226 @@
+import math
+import numpy as np
+from sqlalchemy import and_, or_
+
+EARTH_RADIUS_KM = 6371.0
+# Arc length of one degree on the sphere haversine_km measures on
+KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180.0
+
+# Slack added to each side of a bounding box (~0.1m), so a point right at the
+# radius isn't lost to rounding between the box and the exact distance
+BOX_PADDING_DEGREES = 1e-6
+
+# Precision stored on Location.geohash (~1.2km x 0.6km cells)
+GEOHASH_PRECISION = 6
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash_encode(lat, lng, precision=GEOHASH_PRECISION):
+    """
+    Encodes a coordinate into a geohash string.
+
+    Args:
+        lat (float): Latitude in degrees.
+        lng (float): Longitude in degrees.
+        precision (int): Number of base32 characters to produce.
+
+    Returns:
+        str: The geohash, or None if either coordinate is missing.
+    """
+    if lat is None or lng is None:
+        return None
+
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(geohash) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if lng >= mid:
+                bits = (bits << 1) | 1
+                lng_range[0] = mid
+            else:
+                bits = bits << 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if lat >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits = bits << 1
+                lat_range[1] = mid
+
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(geohash)
+
+
+def cell_size_degrees(precision):
+    """Returns the (lat, lng) size in degrees of a geohash cell at the given precision"""
+    lat_bits = (precision * 5) // 2
+    lng_bits = precision * 5 - lat_bits
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two coordinates in kilometers"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_km_array(lat, lng, lats, lngs):
+    """Great-circle distances in kilometers from one point to arrays of coordinates"""
+    phi1 = np.radians(lat)
+    phi2 = np.radians(lats)
+    d_phi = phi2 - phi1
+    d_lambda = np.radians(lngs - lng)
+
+    a = np.sin(d_phi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+def rank_ids_by_distance(ids, lats, lngs, lat, lng, radius_km):
+    """
+    Vectorized distance ranking over coordinate arrays.
+
+    Returns:
+        list: (id, distance_km) tuples within the radius, closest first
+        (ties broken by id).
+    """
+    distances = haversine_km_array(lat, lng, lats, lngs)
+    within = distances <= radius_km
+    ids, distances = ids[within], distances[within]
+
+    order = np.lexsort((ids, distances))
+    return list(zip(ids[order].tolist(), distances[order].tolist()))
+
+
+def bounding_box(lat, lng, radius_km):
+    """
+    Computes the lat/lng bounding box that contains a circle.
+
+    Returns:
+        tuple: (min_lat, max_lat, min_lng, max_lng). The longitude bounds are
+        None when the box crosses a pole or the antimeridian.
+    """
+    d_lat = radius_km / KM_PER_DEGREE_LAT + BOX_PADDING_DEGREES
+    min_lat = max(lat - d_lat, -90.0)
+    max_lat = min(lat + d_lat, 90.0)
+
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if cos_lat <= 1e-9:
+        return min_lat, max_lat, None, None
+
+    d_lng = radius_km / (KM_PER_DEGREE_LAT * cos_lat) + BOX_PADDING_DEGREES
+    min_lng = lng - d_lng
+    max_lng = lng + d_lng
+    if min_lng < -180.0 or max_lng > 180.0:
+        return min_lat, max_lat, None, None
+
+    return min_lat, max_lat, min_lng, max_lng
+
+
+def covering_cells(lat, lng, radius_km):
+    """
+    Returns geohash prefixes whose union covers the circle around a point.
+
+    Picks the finest precision whose cells are at least as large as the
+    radius, then returns the center cell and its eight neighbours. Returns an
+    empty list when the radius is too large for any cell to be useful.
+    """
+    # Cells are narrowest (in km) at the circle's edge closest to a pole
+    min_lat, max_lat, _, _ = bounding_box(lat, lng, radius_km)
+    cos_lat = max(math.cos(math.radians(max(abs(min_lat), abs(max_lat)))), 1e-9)
+
+    precision = 0
+    for candidate in range(GEOHASH_PRECISION, 0, -1):
+        cell_lat, cell_lng = cell_size_degrees(candidate)
+        if (cell_lat * KM_PER_DEGREE_LAT >= radius_km and
+                cell_lng * KM_PER_DEGREE_LAT * cos_lat >= radius_km):
+            precision = candidate
+            break
+
+    if not precision:
+        return []
+
+    cell_lat, cell_lng = cell_size_degrees(precision)
+    cells = set()
+    for d_lat in (-cell_lat, 0.0, cell_lat):
+        for d_lng in (-cell_lng, 0.0, cell_lng):
+            neighbour_lat = min(max(lat + d_lat, -90.0), 90.0)
+            neighbour_lng = (lng + d_lng + 180.0) % 360.0 - 180.0
+            cells.add(geohash_encode(neighbour_lat, neighbour_lng, precision))
+
+    return sorted(cells)
+
+
+def radius_prefilter(location_model, lat, lng, radius_km):
+    """
+    Builds an index-friendly WHERE clause selecting locations that may lie
+    within radius_km of a point.
+
+    The clause combines geohash prefix ranges on Location.geohash with a
+    bounding box on the indexed latitude/longitude columns. It over-selects
+    (both are padded past the circle); callers compute exact distances for
+    the surviving candidates only. Locations without a geohash never match,
+    see utils/schema.py for the backfill of rows written before it existed.
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+
+    clauses = [
+        location_model.latitude.isnot(None),
+        location_model.longitude.isnot(None),
+        location_model.latitude.between(min_lat, max_lat),
+    ]
+    if min_lng is not None:
+        clauses.append(location_model.longitude.between(min_lng, max_lng))
+
+    cells = covering_cells(lat, lng, radius_km)
+    if cells:
+        # '{' sorts directly after 'z', the last geohash character
+        clauses.append(or_(*[
+            and_(location_model.geohash >= cell, location_model.geohash < cell + '{')
+            for cell in cells
+        ]))
+
+    return and_(*clauses)
+
+
+def rank_by_distance(candidates, lat, lng, radius_km):
+    """
+    Computes exact distances for prefiltered candidates in one vectorized pass.
+
+    Args:
+        candidates (iterable): (id, latitude, longitude) rows.
+        lat (float): Center latitude.
+        lng (float): Center longitude.
+        radius_km (float): Search radius in kilometers.
+
+    Returns:
+        list: (id, distance_km) tuples within the radius, closest first.
+    """
+    candidates = list(candidates)
+    if not candidates:
+        return []
+
+    ids, lats, lngs = zip(*candidates)
+    return rank_ids_by_distance(
+        np.array(ids, dtype=np.int64), np.array(lats, dtype=np.float64), np.array(lngs, dtype=np.float64),
+        lat, lng, radius_km
+    )
@@ -0,0 +1,146 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+from flask import current_app, jsonify
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# KDF and cost for new hashes, in werkzeug's full "method:params" form so it
+# can be compared with the prefix of stored hashes; a stored hash with any
+# other prefix is rehashed on the user's next successful login
+PASSWORD_HASH_METHOD = 'scrypt:32768:8:1'
+
+# Hashing processes per worker (0 hashes inline on the request thread), and
+# how many hashes may be running or queued before requests are shed with 503
+PASSWORD_HASH_PROCESSES = 2
+PASSWORD_HASH_QUEUE_LIMIT = 8
+
+# Seconds a request waits for its hash before giving up with 503
+PASSWORD_HASH_TIMEOUT = 10
+
+# Scheduling priority the hashing processes drop to, so request threads win
+# the CPU during a login burst
+PASSWORD_HASH_NICENESS = 10
+
+
+class HashingOverloaded(Exception):
+    """Raised when the hashing queue is full or a hash didn't finish in time"""
+
+
+def init_password_hasher(app):
+    """Attach a PasswordHasher to the app and answer HashingOverloaded with 503"""
+    app.extensions['password_hasher'] = PasswordHasher(
+        method=app.config.get('PASSWORD_HASH_METHOD', PASSWORD_HASH_METHOD),
+        processes=app.config.get('PASSWORD_HASH_PROCESSES', PASSWORD_HASH_PROCESSES),
+        queue_limit=app.config.get('PASSWORD_HASH_QUEUE_LIMIT', PASSWORD_HASH_QUEUE_LIMIT),
+        timeout=app.config.get('PASSWORD_HASH_TIMEOUT', PASSWORD_HASH_TIMEOUT),
+        niceness=app.config.get('PASSWORD_HASH_NICENESS', PASSWORD_HASH_NICENESS),
+    )
+
+    @app.errorhandler(HashingOverloaded)
+    def hashing_overloaded(error):
+        return jsonify({'error': 'Too many sign-in requests, please retry shortly'}), 503, {'Retry-After': '1'}
+
+
+def hash_password(password):
+    """
+    Hashes a password with the configured KDF off the request thread.
+
+    Raises:
+        HashingOverloaded: If the hashing queue is full.
+    """
+    return current_app.extensions['password_hasher'].hash(password)
+
+
+def verify_password(password_hash, password):
+    """
+    Checks a password against a stored hash off the request thread.
+
+    Returns:
+        tuple: (matches, new_hash) where new_hash is a hash with the
+        configured KDF when the password matches but the stored hash uses
+        another method or cost, else None.
+
+    Raises:
+        HashingOverloaded: If the hashing queue is full.
+    """
+    return current_app.extensions['password_hasher'].verify(password_hash, password)
+
+
+def _check_and_rehash(password_hash, password, method):
+    # Runs in a hashing process: one round trip for the check and the upgrade
+    if not check_password_hash(password_hash, password):
+        return False, None
+    if password_hash.split('$', 1)[0] == method:
+        return True, None
+    return True, generate_password_hash(password, method)
+
+
+def _lower_priority(niceness):
+    try:
+        os.nice(niceness)
+    except OSError:
+        pass
+
+
+class PasswordHasher:
+    """
+    Bounded process pool for the password KDF.
+
+    At most `queue_limit` hashes are running or waiting at once; past that,
+    hash() and verify() raise HashingOverloaded right away instead of tying
+    up another request thread, so a login storm can't starve cheap reads.
+    The pool is started on first use in each worker process.
+    """
+
+    def __init__(self, method=PASSWORD_HASH_METHOD, processes=PASSWORD_HASH_PROCESSES,
+                 queue_limit=PASSWORD_HASH_QUEUE_LIMIT, timeout=PASSWORD_HASH_TIMEOUT,
+                 niceness=PASSWORD_HASH_NICENESS):
+        self.method = method
+        self.processes = processes
+        self.timeout = timeout
+        self.niceness = niceness
+        self._slots = threading.BoundedSemaphore(queue_limit)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(_check_and_rehash, password_hash, password, self.method)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingOverloaded()
+        if not self.processes:
+            try:
+                return fn(*args)
+            finally:
+                self._slots.release()
+
+        try:
+            future = self._pool().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the hash is done, even if this request stops waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HashingOverloaded()
+
+    def _pool(self):
+        if self._executor_pid != os.getpid():
+            with self._lock:
+                if self._executor_pid != os.getpid():
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.processes,
+                        mp_context=multiprocessing.get_context('spawn'),
+                        initializer=_lower_priority, initargs=(self.niceness,)
+                    )
+                    self._executor_pid = os.getpid()
+        return self._executor
@@ -0,0 +1,185 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import current_app
+from sqlalchemy import select
+
+# Verified identities kept per worker, and for how long a token is trusted
+# before its user is read again (writes in other workers show up after this)
+IDENTITY_CACHE_SIZE = 10_000
+IDENTITY_CACHE_TTL = 60
+
+# What the auth decorators need to know about a token and its user; roles are
+# lowercased role names, issued_at and expires_at the token's iat and exp
+Identity = namedtuple(
+    'Identity', ['user_id', 'is_active', 'roles', 'jti', 'issued_at', 'expires_at'], defaults=(None, None, None)
+)
+
+
+# Role that passes admin_token_required and resource_owner_required
+ADMIN_ROLE = 'admin'
+
+
+def init_identity_cache(app):
+    """Attach the verified-identity cache and role membership map to the app for the auth decorators"""
+    app.extensions['identity_cache'] = IdentityCache(
+        max_size=app.config.get('IDENTITY_CACHE_SIZE', IDENTITY_CACHE_SIZE),
+        ttl=app.config.get('IDENTITY_CACHE_TTL', IDENTITY_CACHE_TTL),
+    )
+    app.extensions['role_membership'] = RoleMembership()
+
+
+def current_identity_cache():
+    """The current app's identity cache, or None when it isn't set up"""
+    return current_app.extensions.get('identity_cache')
+
+
+def current_role_membership():
+    """The current app's role membership map, or None when it isn't set up"""
+    return current_app.extensions.get('role_membership')
+
+
+def token_key(token):
+    """Cache key for a bearer token; raw tokens are never held in memory"""
+    return hashlib.sha256(token.encode()).digest()
+
+
+class IdentityCache:
+    """
+    Bounded TTL/LRU map from token hash to the Identity it was verified for.
+
+    A hit skips both jwt.decode and the users query. Entries expire after
+    `ttl` seconds or at the token's own expiry, whichever is first, and the
+    least recently used entry is dropped when the cache is full. Writes that
+    change a user's identity evict that user's entries explicitly through
+    evict_users(); in other workers they take effect once the TTL runs out.
+    """
+
+    def __init__(self, max_size=IDENTITY_CACHE_SIZE, ttl=IDENTITY_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, key):
+        """The cached Identity for a token key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    self._remove(key)
+                self._counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return entry[1]
+
+    def set(self, key, identity, expires_at):
+        """Cache an identity until the token's exp (a Unix timestamp) or the TTL, whichever is first"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (min(time.time() + self.ttl, expires_at), identity)
+            self._keys_by_user.setdefault(identity.user_id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self._counters['evictions'] += 1
+
+    def evict_users(self, *user_ids):
+        """Drop every cached token of the given users"""
+        with self._lock:
+            for user_id in user_ids:
+                for key in list(self._keys_by_user.get(user_id, ())):
+                    self._remove(key)
+                    self._counters['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def stats(self):
+        """Hit/miss/eviction counters and the current size"""
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                **self._counters,
+                'size': len(self._entries),
+                'hit_rate': round(self._counters['hits'] / lookups, 4) if lookups else None,
+            }
+
+    def _remove(self, key):
+        _, identity = self._entries.pop(key)
+        keys = self._keys_by_user.get(identity.user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[identity.user_id]
+
+
+class RoleMembership:
+    """
+    Process-level map from role name to the IDs of the users holding it.
+
+    Each user's entry is stamped with the users.role_version it was read at,
+    so roles_for() only goes to the database for users it hasn't seen or
+    whose roles changed since; admin checks against a warm map are set
+    lookups.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._members = {}
+        self._users = {}
+
+    def roles_for(self, user_id, role_version):
+        """
+        Lowercased role names of a user at the given role_version.
+
+        Returns:
+            frozenset: Served from memory when the version matches, read
+            from user_roles otherwise.
+        """
+        cached = self._users.get(user_id)
+        if cached is not None and cached[0] == role_version:
+            return cached[1]
+
+        from app.models import db, Role, user_roles
+
+        roles = frozenset(
+            name.lower() for name in db.session.execute(
+                select(Role.name).join(user_roles).where(user_roles.c.user_id == user_id)
+            ).scalars()
+        )
+        self.remember(user_id, role_version, roles)
+        return roles
+
+    def remember(self, user_id, role_version, roles):
+        """Record a user's roles as of role_version, e.g. from a verified token claim"""
+        with self._lock:
+            cached = self._users.get(user_id)
+            if cached is not None:
+                if cached[0] > role_version:
+                    return
+                for role in cached[1] - roles:
+                    self._members.get(role, set()).discard(user_id)
+            for role in roles:
+                self._members.setdefault(role, set()).add(user_id)
+            self._users[user_id] = (role_version, roles)
+
+    def members(self, role):
+        """IDs of the users known to hold a role"""
+        return frozenset(self._members.get(role.lower(), ()))
+
+    def forget(self, *user_ids):
+        """Drop users so their roles are read again on next use"""
+        with self._lock:
+            for user_id in user_ids:
+                cached = self._users.pop(user_id, None)
+                if cached is not None:
+                    for role in cached[1]:
+                        self._members.get(role, set()).discard(user_id)
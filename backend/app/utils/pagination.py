@@ -0,0 +1,224 @@
+import base64
+import binascii
+import json
+from collections import namedtuple
+from datetime import datetime
+from flask import request
+from sqlalchemy import and_, or_, select, func
+from sqlalchemy.sql import operators
+
+PageRequest = namedtuple('PageRequest', ['per_page', 'cursor', 'page', 'include_total'])
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def pagination_args(default_per_page=20, max_per_page=100):
+    """
+    Reads pagination parameters from the current request.
+
+    Query parameters:
+        per_page: Page size, capped at max_per_page.
+        cursor: Opaque token from a previous response's next_cursor/prev_cursor.
+        page: Legacy page number, only used when no cursor is given.
+        include_total: 'true' to also compute the exact total (costs a COUNT).
+
+    Returns:
+        PageRequest: The parsed parameters.
+    """
+    per_page = max(min(request.args.get('per_page', default_per_page, type=int), max_per_page), 1)
+    cursor = request.args.get('cursor') or None
+    page = request.args.get('page', type=int)
+    include_total = request.args.get('include_total', '').lower() in ('1', 'true', 'yes')
+    return PageRequest(per_page, cursor, page, include_total)
+
+
+def encode_cursor(payload):
+    """Encodes a cursor payload into an opaque URL-safe token"""
+    raw = json.dumps(payload, separators=(',', ':'), default=_encode_value)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Decodes a token produced by encode_cursor.
+
+    Raises:
+        InvalidCursor: If the token is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw, object_hook=_decode_value)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor('Invalid cursor')
+
+    if not isinstance(payload, dict):
+        raise InvalidCursor('Invalid cursor')
+    return payload
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'$dt': value.isoformat()}
+    raise TypeError(f'Cannot encode {type(value).__name__} in a cursor')
+
+
+def _decode_value(obj):
+    if set(obj) == {'$dt'}:
+        return datetime.fromisoformat(obj['$dt'])
+    return obj
+
+
+def _sort_keys(order_by):
+    """Splits order_by expressions into (column, descending) pairs"""
+    keys = []
+    for expression in order_by:
+        if getattr(expression, 'modifier', None) is operators.desc_op:
+            keys.append((expression.element, True))
+        elif getattr(expression, 'modifier', None) is operators.asc_op:
+            keys.append((expression.element, False))
+        else:
+            keys.append((expression, False))
+    return keys
+
+
+def _after(keys, values, backward):
+    """WHERE clause selecting rows strictly after (or before) values in sort order"""
+    clauses = []
+    for index, (column, descending) in enumerate(keys):
+        moving_down = descending != backward
+        comparison = column < values[index] if moving_down else column > values[index]
+        equal_prefix = [keys[i][0] == values[i] for i in range(index)]
+        clauses.append(and_(*equal_prefix, comparison))
+    return or_(*clauses)
+
+
+def count_rows(query):
+    """Exact row count for a select, including its joins"""
+    from app.models import db
+
+    return db.session.execute(
+        select(func.count()).select_from(query.order_by(None).subquery())
+    ).scalar()
+
+
+def keyset_paginate(query, order_by, page_request):
+    """
+    Paginates a select with keyset (cursor) pagination.
+
+    Fetches per_page + 1 rows past the cursor using the sort keys, so each page
+    is a single indexed range query; has_next comes from the extra row. The
+    last sort key must be unique (usually the primary key).
+
+    Args:
+        query: The select to paginate, without ORDER BY/LIMIT.
+        order_by (list): Sort key columns, optionally wrapped in desc().
+        page_request (PageRequest): Parsed pagination parameters.
+
+    Returns:
+        tuple: (items, pagination_info)
+
+    Raises:
+        InvalidCursor: If the cursor is malformed.
+    """
+    from app.models import db
+
+    keys = _sort_keys(order_by)
+    per_page = page_request.per_page
+    backward = False
+    legacy_page = None
+
+    total = count_rows(query) if page_request.include_total else None
+
+    if page_request.cursor:
+        payload = decode_cursor(page_request.cursor)
+        values = payload.get('k')
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise InvalidCursor('Invalid cursor')
+        backward = bool(payload.get('b'))
+        query = query.where(_after(keys, values, backward))
+    elif page_request.page and page_request.page > 1:
+        legacy_page = page_request.page
+        query = query.offset((legacy_page - 1) * per_page)
+
+    ordering = [
+        column.desc() if descending != backward else column.asc()
+        for column, descending in keys
+    ]
+    items = db.session.execute(
+        query.order_by(None).order_by(*ordering).limit(per_page + 1)
+    ).scalars().all()
+
+    has_more = len(items) > per_page
+    items = items[:per_page]
+    if backward:
+        items.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, bool(page_request.cursor or legacy_page)
+
+    def cursor_for(item, to_previous):
+        payload = {'k': [getattr(item, column.key) for column, _ in keys]}
+        if to_previous:
+            payload['b'] = 1
+        return encode_cursor(payload)
+
+    pagination_info = {
+        'per_page': per_page,
+        'has_next': has_next,
+        'has_prev': has_prev,
+        'next_cursor': cursor_for(items[-1], False) if has_next and items else None,
+        'prev_cursor': cursor_for(items[0], True) if has_prev and items else None
+    }
+    if legacy_page:
+        pagination_info['page'] = legacy_page
+    if total is not None:
+        pagination_info['total'] = total
+        pagination_info['total_pages'] = (total + per_page - 1) // per_page
+
+    return items, pagination_info
+
+
+def slice_paginate(ids, page_request):
+    """
+    Paginates an already ranked list (e.g. by distance or relevance).
+
+    The cursor carries the offset into the list; the total is free here but
+    only reported when requested, matching keyset_paginate.
+
+    Returns:
+        tuple: (page_ids, pagination_info)
+
+    Raises:
+        InvalidCursor: If the cursor is malformed.
+    """
+    per_page = page_request.per_page
+
+    if page_request.cursor:
+        offset = decode_cursor(page_request.cursor).get('o')
+        if not isinstance(offset, int) or offset < 0:
+            raise InvalidCursor('Invalid cursor')
+    elif page_request.page and page_request.page > 1:
+        offset = (page_request.page - 1) * per_page
+    else:
+        offset = 0
+
+    page_ids = ids[offset:offset + per_page]
+    has_next = offset + per_page < len(ids)
+    has_prev = offset > 0
+
+    pagination_info = {
+        'per_page': per_page,
+        'has_next': has_next,
+        'has_prev': has_prev,
+        'next_cursor': encode_cursor({'o': offset + per_page}) if has_next else None,
+        'prev_cursor': encode_cursor({'o': max(offset - per_page, 0)}) if has_prev else None
+    }
+    if page_request.page and not page_request.cursor:
+        pagination_info['page'] = page_request.page
+    if page_request.include_total:
+        pagination_info['total'] = len(ids)
+        pagination_info['total_pages'] = (len(ids) + per_page - 1) // per_page
+
+    return page_ids, pagination_info
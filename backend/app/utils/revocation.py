@@ -0,0 +1,220 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import select, delete, func, or_
+
+# Seconds between reads of revocations made by other workers; revocations
+# made in this worker apply immediately
+REVOCATION_REFRESH_INTERVAL = 2.0
+
+# Sizing of the Bloom filter in front of the revoked-jti set: expected live
+# revocations and the false-positive rate at that size (false positives
+# only cost a set lookup)
+REVOCATION_BLOOM_CAPACITY = 100_000
+REVOCATION_BLOOM_ERROR_RATE = 0.01
+
+# Revocations stamped this long before the previous read are read again, so a
+# row committed after a higher id (or given a reused id) isn't skipped
+REVOCATION_READ_OVERLAP = timedelta(minutes=1)
+
+
+def init_revocation_list(app):
+    """Attach the in-memory revocation list to the app for the auth decorators"""
+    app.extensions['revocation_list'] = RevocationList(
+        refresh_interval=app.config.get('TOKEN_REVOCATION_REFRESH_INTERVAL', REVOCATION_REFRESH_INTERVAL),
+    )
+
+
+def current_revocation_list():
+    """The current app's revocation list, or None when it isn't set up"""
+    return current_app.extensions.get('revocation_list')
+
+
+def _timestamp(value):
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings; no removals, rebuild it instead"""
+
+    def __init__(self, capacity=REVOCATION_BLOOM_CAPACITY, error_rate=REVOCATION_BLOOM_ERROR_RATE):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationList:
+    """
+    In-memory mirror of the token_revocations table.
+
+    Revoked jtis sit in a set behind a Bloom filter, so the common case (a
+    token that was never revoked) is answered by the filter alone; user-wide
+    revocations are a user_id -> cutoff map checked against the token's iat.
+    Entries are dropped once the tokens they cover have expired.
+
+    The table is read in full on first use and then incrementally, at most
+    every `refresh_interval` seconds, so per-request checks are constant
+    time and almost never query. Incremental reads take rows past the highest
+    id seen plus those revoked within REVOCATION_READ_OVERLAP of the previous
+    read; if the highest id in the table went back (ids reused after a
+    delete), everything is read again.
+    """
+
+    def __init__(self, refresh_interval=REVOCATION_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._last_refresh = 0.0
+        self._clear()
+
+    def _clear(self):
+        self._loaded = False
+        self._last_revocation_id = 0
+        self._last_read_at = None
+        self._bloom = BloomFilter()
+        self._jtis = {}
+        self._users = {}
+        self._next_expiry = math.inf
+
+    # ---------------------------------------------------------------------
+    # Checks
+    # ---------------------------------------------------------------------
+
+    def is_revoked(self, identity):
+        """Whether the token an Identity was verified from has been revoked"""
+        self._refresh_if_due()
+        if identity.jti is not None and identity.jti in self._bloom and identity.jti in self._jtis:
+            return True
+        cutoff = self._users.get(identity.user_id)
+        # iat is whole seconds, so every token of the cutoff's second is revoked (fail closed)
+        return cutoff is not None and (identity.issued_at is None or identity.issued_at <= math.floor(cutoff[0]))
+
+    # ---------------------------------------------------------------------
+    # Revoking
+    # ---------------------------------------------------------------------
+
+    def revoke_token(self, identity):
+        """Revoke one token (by jti) until it expires; commits"""
+        if identity.jti is None:
+            # Tokens issued before jtis can only be revoked with the rest of the user's
+            return self.revoke_user(identity.user_id)
+        self._save(jti=identity.jti, user_id=identity.user_id, expires_at=identity.expires_at)
+
+    def revoke_user(self, user_id):
+        """
+        Revoke every token issued to a user until now; commits. Tokens only
+        carry whole-second iats, so a token issued later in the same second
+        (such as a sign-in right after a deactivation) is revoked too.
+        """
+        from app.utils.util import TOKEN_LIFETIME
+
+        now = time.time()
+        self._save(user_id=user_id, issued_before=now, expires_at=now + TOKEN_LIFETIME.total_seconds())
+
+    def _save(self, user_id, expires_at, jti=None, issued_before=None):
+        from app.models import db, TokenRevocation
+
+        def to_datetime(value):
+            return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None)
+
+        db.session.add(TokenRevocation(
+            jti=jti, user_id=user_id, expires_at=to_datetime(expires_at),
+            issued_before=to_datetime(issued_before) if issued_before is not None else None
+        ))
+        db.session.commit()
+        with self._lock:
+            self._apply(jti, user_id, issued_before, expires_at)
+
+    # ---------------------------------------------------------------------
+    # Loading and refresh
+    # ---------------------------------------------------------------------
+
+    def _refresh_if_due(self):
+        if self._loaded and time.monotonic() - self._last_refresh < self.refresh_interval:
+            return
+        with self._lock:
+            if self._loaded and time.monotonic() - self._last_refresh < self.refresh_interval:
+                return
+            self._refresh()
+
+    def _refresh(self):
+        from app.models import db, TokenRevocation
+
+        now = time.time()
+        read_at = datetime.utcnow()
+        highest_id = db.session.execute(select(func.max(TokenRevocation.revocation_id))).scalar() or 0
+        if highest_id < self._last_revocation_id:
+            self._clear()
+
+        query = select(
+            TokenRevocation.revocation_id, TokenRevocation.jti, TokenRevocation.user_id,
+            TokenRevocation.issued_before, TokenRevocation.expires_at
+        ).order_by(TokenRevocation.revocation_id)
+        if self._loaded:
+            query = query.where(or_(
+                TokenRevocation.revocation_id > self._last_revocation_id,
+                TokenRevocation.revoked_at >= self._last_read_at - REVOCATION_READ_OVERLAP
+            ))
+        else:
+            query = query.where(TokenRevocation.expires_at > read_at)
+
+        # Rows read twice are applied twice, which is harmless
+        for revocation_id, jti, user_id, issued_before, expires_at in db.session.execute(query):
+            self._apply(
+                jti, user_id, _timestamp(issued_before) if issued_before is not None else None, _timestamp(expires_at)
+            )
+            self._last_revocation_id = max(self._last_revocation_id, revocation_id)
+        self._loaded = True
+        self._last_read_at = read_at
+        self._last_refresh = time.monotonic()
+
+        if self._expire(now):
+            # Its own transaction: this runs inside the auth check, and must not commit the request's session
+            with db.engine.begin() as connection:
+                connection.execute(delete(TokenRevocation).where(TokenRevocation.expires_at <= datetime.utcnow()))
+
+    def _apply(self, jti, user_id, issued_before, expires_at):
+        self._next_expiry = min(self._next_expiry, expires_at)
+        if jti is not None:
+            self._jtis[jti] = expires_at
+            self._bloom.add(jti)
+        if issued_before is not None:
+            current = self._users.get(user_id)
+            if current is None or current[0] < issued_before:
+                self._users[user_id] = (issued_before, expires_at)
+
+    def _expire(self, now):
+        """Drop entries whose tokens have all expired; returns whether any were dropped"""
+        if now < self._next_expiry:
+            return False
+        expired_jtis = [jti for jti, expires_at in self._jtis.items() if expires_at <= now]
+        expired_users = [user_id for user_id, (_, expires_at) in self._users.items() if expires_at <= now]
+        for jti in expired_jtis:
+            del self._jtis[jti]
+        for user_id in expired_users:
+            del self._users[user_id]
+        if expired_jtis:
+            bloom = BloomFilter()
+            for jti in self._jtis:
+                bloom.add(jti)
+            self._bloom = bloom
+        self._next_expiry = min(
+            [*self._jtis.values(), *(expires_at for _, expires_at in self._users.values())], default=math.inf
+        )
+        return bool(expired_jtis or expired_users)
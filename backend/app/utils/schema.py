@@ -0,0 +1,96 @@
+from sqlalchemy import inspect, text
+
+from app.utils.geo import geohash_encode
+
+
+def _backfill_geohashes(connection):
+    rows = connection.execute(text(
+        "SELECT location_id, latitude, longitude FROM locations "
+        "WHERE geohash IS NULL AND latitude IS NOT NULL AND longitude IS NOT NULL"
+    )).all()
+    if rows:
+        connection.execute(
+            text("UPDATE locations SET geohash = :geohash WHERE location_id = :location_id"),
+            [{'location_id': location_id, 'geohash': geohash_encode(lat, lng)} for location_id, lat, lng in rows]
+        )
+
+
+def _backfill_listing_ratings(connection):
+    connection.exec_driver_sql("""
+        UPDATE listings SET
+            rating_sum = (SELECT COALESCE(SUM(r.rating), 0) FROM reviews r WHERE r.listing_id = listings.listing_id),
+            rating_count = (SELECT COUNT(*) FROM reviews r WHERE r.listing_id = listings.listing_id),
+            rating_avg = (SELECT COALESCE(AVG(r.rating * 1.0), 0) FROM reviews r WHERE r.listing_id = listings.listing_id)
+    """)
+
+
+def _backfill_owner_ratings(connection):
+    owner_reviews = "FROM reviews r JOIN listings l ON l.listing_id = r.listing_id WHERE l.owner_id = users.user_id"
+    connection.exec_driver_sql(f"""
+        UPDATE users SET
+            owner_rating_sum = (SELECT COALESCE(SUM(r.rating), 0) {owner_reviews}),
+            owner_rating_count = (SELECT COUNT(*) {owner_reviews}),
+            owner_rating_avg = (SELECT COALESCE(AVG(r.rating * 1.0), 0) {owner_reviews})
+    """)
+
+
+def _backfill_listing_updated_at(connection):
+    connection.exec_driver_sql("UPDATE listings SET updated_at = created_at")
+
+
+def _backfill_booking_updated_at(connection):
+    # No better guess for when an existing booking last changed; it shows up in the next incremental export
+    connection.exec_driver_sql("UPDATE bookings SET updated_at = CURRENT_TIMESTAMP")
+
+
+# Columns added to tables that existing databases already have, in the order
+# they were introduced: (table, column, column DDL, backfill or None). The DDL
+# needs a constant default for NOT NULL columns, which ALTER TABLE requires;
+# the backfill runs once, right after the column is added.
+COLUMN_UPGRADES = [
+    ('locations', 'geohash', 'VARCHAR(12)', _backfill_geohashes),
+    # Rating aggregates: backfilled from reviews once the last column of each set exists
+    ('listings', 'rating_sum', 'INTEGER NOT NULL DEFAULT 0', None),
+    ('listings', 'rating_count', 'INTEGER NOT NULL DEFAULT 0', None),
+    ('listings', 'rating_avg', 'FLOAT NOT NULL DEFAULT 0', _backfill_listing_ratings),
+    ('users', 'owner_rating_sum', 'INTEGER NOT NULL DEFAULT 0', None),
+    ('users', 'owner_rating_count', 'INTEGER NOT NULL DEFAULT 0', None),
+    ('users', 'owner_rating_avg', 'FLOAT NOT NULL DEFAULT 0', _backfill_owner_ratings),
+    # Export watermarks
+    ('listings', 'updated_at', "DATETIME NOT NULL DEFAULT '1970-01-01 00:00:00'", _backfill_listing_updated_at),
+    ('bookings', 'updated_at', "DATETIME NOT NULL DEFAULT '1970-01-01 00:00:00'", _backfill_booking_updated_at),
+    # Read on every token check; 0 makes old tokens' missing rv claim fall back to user_roles
+    ('users', 'role_version', 'INTEGER NOT NULL DEFAULT 0', None),
+]
+
+
+def upgrade_schema(target, connection, **kw):
+    """
+    Adds the COLUMN_UPGRADES columns that an existing database is missing,
+    backfills them, and creates model indexes the database doesn't have yet.
+    db.create_all() only creates missing tables, so without this an older
+    database fails on the first query that selects a newer column. Meant to
+    be attached to the metadata `after_create` event, which create_all()
+    fires on every call.
+    """
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+
+    for table_name, column_name, ddl, backfill in COLUMN_UPGRADES:
+        if table_name not in existing_tables:
+            continue
+        if column_name in {column['name'] for column in inspector.get_columns(table_name)}:
+            continue
+        connection.exec_driver_sql(f'ALTER TABLE {table_name} ADD COLUMN {column_name} {ddl}')
+        inspector.clear_cache()
+        if backfill is not None:
+            backfill(connection)
+
+    # Indexes added to models later, which create_all() skips on tables that already exist
+    for table_name in existing_tables & set(target.tables):
+        table = target.tables[table_name]
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table_name)}
+        columns = {column['name'] for column in inspector.get_columns(table_name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes and {column.name for column in index.columns} <= columns:
+                index.create(connection)
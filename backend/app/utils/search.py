@@ -0,0 +1,142 @@
+import re
+import weakref
+from sqlalchemy import select, text
+from sqlalchemy.sql import table, column
+
+# Columns indexed for the listings `search` parameter, in FTS column order
+LISTING_SEARCH_COLUMNS = ('title', 'description', 'address', 'city', 'state', 'zip_code')
+
+# BM25 column weights: matches in the title count most, then the description
+LISTING_SEARCH_WEIGHTS = (10.0, 2.0, 1.0, 1.0, 1.0, 1.0)
+
+listings_fts = table('listings_fts', column('rowid'), column('rank'))
+
+# Engines found to carry listings_fts (see full_text_search_available)
+_full_text_engines = weakref.WeakSet()
+
+_SEARCH_ROW_SELECT = """
+    SELECT li.listing_id, li.title, li.description, lo.address, lo.city, lo.state, lo.zip_code
+    FROM listings li LEFT JOIN locations lo ON lo.location_id = li.location_id
+"""
+
+# Trigger name -> body. Updates fire only for the indexed columns, so rating
+# and timestamp writes don't rewrite a listing's index row.
+_SEARCH_INDEX_TRIGGERS = {
+    'listings_fts_after_insert': f"""
+    CREATE TRIGGER listings_fts_after_insert AFTER INSERT ON listings BEGIN
+        INSERT INTO listings_fts(rowid, {', '.join(LISTING_SEARCH_COLUMNS)})
+        {_SEARCH_ROW_SELECT} WHERE li.listing_id = new.listing_id;
+    END
+    """,
+    'listings_fts_after_update': f"""
+    CREATE TRIGGER listings_fts_after_update AFTER UPDATE OF title, description, location_id ON listings BEGIN
+        DELETE FROM listings_fts WHERE rowid = old.listing_id;
+        INSERT INTO listings_fts(rowid, {', '.join(LISTING_SEARCH_COLUMNS)})
+        {_SEARCH_ROW_SELECT} WHERE li.listing_id = new.listing_id;
+    END
+    """,
+    'listings_fts_after_delete': """
+    CREATE TRIGGER listings_fts_after_delete AFTER DELETE ON listings BEGIN
+        DELETE FROM listings_fts WHERE rowid = old.listing_id;
+    END
+    """,
+    'listings_fts_after_location_update': f"""
+    CREATE TRIGGER listings_fts_after_location_update
+    AFTER UPDATE OF address, city, state, zip_code ON locations BEGIN
+        DELETE FROM listings_fts WHERE rowid IN (
+            SELECT listing_id FROM listings WHERE location_id = new.location_id
+        );
+        INSERT INTO listings_fts(rowid, {', '.join(LISTING_SEARCH_COLUMNS)})
+        {_SEARCH_ROW_SELECT} WHERE li.location_id = new.location_id;
+    END
+    """,
+}
+
+
+def install_listing_search_index(target, connection, **kw):
+    """
+    Creates the SQLite FTS5 index over listings and the triggers that keep it
+    in sync with `listings` and `locations` writes. Meant to be attached to
+    the metadata `after_create` event; existing rows are indexed the first
+    time the virtual table is created, and the triggers are recreated every
+    time so databases pick up changes to them. No-op on other databases.
+    """
+    if connection.dialect.name != 'sqlite':
+        return
+
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'listings_fts'"
+    ).first()
+
+    if not exists:
+        connection.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE listings_fts USING fts5("
+            f"{', '.join(LISTING_SEARCH_COLUMNS)}, "
+            f"tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        connection.exec_driver_sql(
+            f"INSERT INTO listings_fts(listings_fts, rank) "
+            f"VALUES ('rank', 'bm25({', '.join(str(w) for w in LISTING_SEARCH_WEIGHTS)})')"
+        )
+        rebuild_listing_search_index(connection)
+
+    for name, trigger in _SEARCH_INDEX_TRIGGERS.items():
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+        connection.exec_driver_sql(trigger)
+    _full_text_engines.add(connection.engine)
+
+
+def rebuild_listing_search_index(connection):
+    """Repopulates the FTS index from the listings and locations tables"""
+    connection.exec_driver_sql("DELETE FROM listings_fts")
+    connection.exec_driver_sql(
+        f"INSERT INTO listings_fts(rowid, {', '.join(LISTING_SEARCH_COLUMNS)}) {_SEARCH_ROW_SELECT}"
+    )
+
+
+def full_text_search_available(session):
+    """
+    Whether the bound database carries the FTS5 listing index: SQLite, with
+    the listings_fts table created. Only a found table is remembered, so a
+    database without one is checked again on the next call.
+    """
+    engine = session.get_bind()
+    if engine in _full_text_engines:
+        return True
+    if engine.dialect.name != 'sqlite':
+        return False
+    if session.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'listings_fts'"
+    )).first() is None:
+        return False
+    _full_text_engines.add(engine)
+    return True
+
+
+def build_match_expression(search):
+    """
+    Converts free text from the search box into an FTS5 MATCH expression.
+
+    Every word must match; the last word is treated as a prefix so results
+    keep up while the user is still typing.
+
+    Returns:
+        str: The MATCH expression, or None if the input has no searchable words.
+    """
+    terms = re.findall(r'\w+', search.lower())
+    if not terms:
+        return None
+
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def ranked_search_subquery(match_expression):
+    """Subquery of (listing_id, search_rank) for listings matching the expression, best first by BM25"""
+    return select(
+        listings_fts.c.rowid.label('listing_id'),
+        listings_fts.c.rank.label('search_rank')
+    ).where(
+        text('listings_fts MATCH :match_expression').bindparams(match_expression=match_expression)
+    ).subquery()
@@ -0,0 +1,338 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask_caching.backends.base import BaseCache
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS cache_entries (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        expires REAL NOT NULL,
+        accessed REAL NOT NULL
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_cache_entries_accessed ON cache_entries (accessed)",
+    """
+    CREATE TABLE IF NOT EXISTS cache_stats (
+        prefix TEXT PRIMARY KEY,
+        hits INTEGER NOT NULL DEFAULT 0,
+        misses INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    """,
+]
+
+# Entries with this expiry never expire (timeout=0)
+_NEVER = float('inf')
+
+
+def key_prefix(key):
+    """Stats bucket of a cache key: the part before the first ':' (e.g. 'view', 'tag')"""
+    return key.split(':', 1)[0]
+
+
+class SQLiteCache(BaseCache):
+    """
+    Cache shared by every worker process on a host, stored in one SQLite
+    database in WAL mode.
+
+    Readers never block the single writer, so all gunicorn workers see the
+    same entries and the same invalidations without an external service.
+    The file is memory-mapped, so hot reads are served from the page cache.
+    Once more than `threshold` entries are stored the least recently used
+    ones are evicted.
+
+    Hits and misses are counted per key prefix in each process and flushed
+    to the database every `stats_interval` seconds; stats() returns the
+    totals across workers.
+
+    Args:
+        path (str): Database file, shared by all workers.
+        threshold (int): Maximum number of entries kept, 0 for no limit.
+        default_timeout (int): Timeout used when set() gets none.
+        mmap_size (int): Bytes of the database file to memory-map.
+        stats_interval (float): Seconds between flushes of the hit/miss counters.
+    """
+
+    # Recency is only rewritten once per interval, so hot keys don't turn every read into a write
+    TOUCH_INTERVAL = 5.0
+    # Writes between eviction checks, so the COUNT is amortized
+    PRUNE_INTERVAL = 100
+
+    def __init__(self, path, threshold=10000, default_timeout=300,
+                 mmap_size=64 * 1024 * 1024, stats_interval=5.0):
+        super().__init__(default_timeout=default_timeout)
+        self.path = path
+        self.threshold = threshold
+        self.mmap_size = mmap_size
+        self.stats_interval = stats_interval
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hits = Counter()
+        self._misses = Counter()
+        self._last_flush = time.monotonic()
+        self._writes = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._connect()
+        for statement in _SCHEMA:
+            connection.execute(statement)
+        connection.close()
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        kwargs.update(
+            path=config.get('CACHE_SQLITE_PATH') or os.path.join(app.instance_path, 'cache.sqlite3'),
+            threshold=config.get('CACHE_THRESHOLD', 10000),
+            default_timeout=config.get('CACHE_DEFAULT_TIMEOUT', 300),
+            mmap_size=config.get('CACHE_SQLITE_MMAP_SIZE', 64 * 1024 * 1024),
+            stats_interval=config.get('CACHE_STATS_INTERVAL', 5.0),
+        )
+        return cls(*args, **kwargs)
+
+    # ---------------------------------------------------------------------
+    # Connections
+    # ---------------------------------------------------------------------
+
+    @property
+    def _connection(self):
+        # One connection per thread, reopened after a fork (gunicorn preload)
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = self._local.connection = self._connect()
+            self._local.pid = os.getpid()
+        return connection
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so concurrent workers don't lose updates
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _expiry(self, timeout):
+        timeout = self._normalize_timeout(timeout)
+        return _NEVER if timeout == 0 else time.time() + timeout
+
+    # ---------------------------------------------------------------------
+    # Reads
+    # ---------------------------------------------------------------------
+
+    def get(self, key):
+        return self.get_many(key)[0]
+
+    def get_many(self, *keys):
+        if not keys:
+            return []
+
+        now = time.time()
+        unique = list(dict.fromkeys(keys))
+        placeholders = ', '.join('?' * len(unique))
+        rows = self._connection.execute(
+            f'SELECT key, value, expires, accessed FROM cache_entries WHERE key IN ({placeholders})',
+            unique
+        ).fetchall()
+
+        found = {}
+        stale = []
+        for key, value, expires, accessed in rows:
+            if expires <= now:
+                continue
+            found[key] = pickle.loads(value)
+            if now - accessed > self.TOUCH_INTERVAL:
+                stale.append(key)
+
+        if stale:
+            self._touch(stale, now)
+
+        self._record(keys, found)
+        return [found.get(key) for key in keys]
+
+    def has(self, key):
+        row = self._connection.execute(
+            'SELECT 1 FROM cache_entries WHERE key = ? AND expires > ?', (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def _touch(self, keys, now):
+        placeholders = ', '.join('?' * len(keys))
+        self._connection.execute(
+            f'UPDATE cache_entries SET accessed = ? WHERE key IN ({placeholders})', [now, *keys]
+        )
+
+    # ---------------------------------------------------------------------
+    # Writes
+    # ---------------------------------------------------------------------
+
+    def set(self, key, value, timeout=None):
+        return self.set_many({key: value}, timeout) == [key]
+
+    def set_many(self, mapping, timeout=None):
+        if not mapping:
+            return []
+
+        now = time.time()
+        expires = self._expiry(timeout)
+        rows = [
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires, now)
+            for key, value in mapping.items()
+        ]
+        with self._transaction() as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache_entries (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+                rows
+            )
+
+        self._after_write(len(rows))
+        return list(mapping)
+
+    def add(self, key, value, timeout=None):
+        now = time.time()
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                """
+                INSERT INTO cache_entries (key, value, expires, accessed) VALUES (?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    value = excluded.value, expires = excluded.expires, accessed = excluded.accessed
+                WHERE cache_entries.expires <= ?
+                """,
+                (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self._expiry(timeout), now, now)
+            )
+        added = cursor.rowcount > 0
+        if added:
+            self._after_write(1)
+        return added
+
+    def delete(self, key):
+        return bool(self.delete_many(key))
+
+    def delete_many(self, *keys):
+        if not keys:
+            return []
+        deleted = []
+        with self._transaction() as connection:
+            for key in keys:
+                if connection.execute('DELETE FROM cache_entries WHERE key = ?', (key,)).rowcount:
+                    deleted.append(key)
+        return deleted
+
+    def clear(self):
+        with self._transaction() as connection:
+            connection.execute('DELETE FROM cache_entries')
+        return True
+
+    def inc(self, key, delta=1):
+        return self._add_to(key, delta)
+
+    def dec(self, key, delta=1):
+        return self._add_to(key, -delta)
+
+    def _add_to(self, key, delta):
+        with self._transaction() as connection:
+            row = connection.execute(
+                'SELECT value, expires FROM cache_entries WHERE key = ? AND expires > ?', (key, time.time())
+            ).fetchone()
+            value = (pickle.loads(row[0]) if row else 0) + delta
+            expires = row[1] if row else self._expiry(None)
+            connection.execute(
+                'INSERT OR REPLACE INTO cache_entries (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+                (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires, time.time())
+            )
+        return value
+
+    def _after_write(self, count):
+        with self._lock:
+            self._writes += count
+            due = self._writes >= self.PRUNE_INTERVAL
+            if due:
+                self._writes = 0
+        if due:
+            self.prune()
+
+    def prune(self):
+        """Drops expired entries, then the least recently used ones above the threshold"""
+        with self._transaction() as connection:
+            connection.execute('DELETE FROM cache_entries WHERE expires <= ?', (time.time(),))
+            if self.threshold:
+                excess = connection.execute('SELECT COUNT(*) FROM cache_entries').fetchone()[0] - self.threshold
+                if excess > 0:
+                    connection.execute(
+                        """
+                        DELETE FROM cache_entries WHERE key IN (
+                            SELECT key FROM cache_entries ORDER BY accessed LIMIT ?
+                        )
+                        """,
+                        (excess,)
+                    )
+
+    # ---------------------------------------------------------------------
+    # Hit/miss counters
+    # ---------------------------------------------------------------------
+
+    def _record(self, keys, found):
+        with self._lock:
+            for key in keys:
+                if key in found:
+                    self._hits[key_prefix(key)] += 1
+                else:
+                    self._misses[key_prefix(key)] += 1
+            due = time.monotonic() - self._last_flush >= self.stats_interval
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """Adds this process's counters to the shared totals"""
+        with self._lock:
+            hits, misses = self._hits, self._misses
+            self._hits, self._misses = Counter(), Counter()
+            self._last_flush = time.monotonic()
+
+        rows = [(prefix, hits[prefix], misses[prefix]) for prefix in set(hits) | set(misses)]
+        if not rows:
+            return
+        with self._transaction() as connection:
+            connection.executemany(
+                """
+                INSERT INTO cache_stats (prefix, hits, misses) VALUES (?, ?, ?)
+                ON CONFLICT (prefix) DO UPDATE SET
+                    hits = hits + excluded.hits, misses = misses + excluded.misses
+                """,
+                rows
+            )
+
+    def stats(self):
+        """
+        Hit/miss counters per key prefix across all workers.
+
+        Returns:
+            dict: Mapping of prefix to {'hits', 'misses', 'hit_rate'}.
+        """
+        self.flush_stats()
+        rows = self._connection.execute('SELECT prefix, hits, misses FROM cache_stats ORDER BY prefix').fetchall()
+        return {
+            prefix: {
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None
+            }
+            for prefix, hits, misses in rows
+        }
@@ -1,18 +1,31 @@
 import os
+import uuid
 from jose import jwt
 from datetime import datetime, timedelta, timezone
 from functools import wraps
-from flask import request, jsonify
+from flask import request, jsonify, g, current_app
 from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
+from app.utils.identity import ADMIN_ROLE, Identity, current_identity_cache, current_role_membership, token_key
+from app.utils.revocation import current_revocation_list
 
 SECRET_KEY = os.environ.get('SECRET_KEY') or 'super-secret-key-change-in-production'
 
-def encode_user_token(user_id):
+# How long issued tokens stay valid
+TOKEN_LIFETIME = timedelta(hours=24)
+
+# Relationships loaded by get_current_user() unless CURRENT_USER_EAGER_LOADS overrides them
+CURRENT_USER_EAGER_LOADS = ('roles', 'location')
+
+def encode_user_token(user_id, roles=None, role_version=None):
     """
     Encodes a user ID into a JWT token.
     
     Args:
         user_id (int): The ID of the user to encode.
+        roles (list): Role names to carry as a signed claim, trusted while
+            the user's role_version still equals role_version.
+        role_version (int): The user's role_version the roles were read at.
     
     Returns:
         str: The encoded JWT token.
@@ -20,10 +33,14 @@ def encode_user_token(user_id):
     
 
     payload = {
-        'exp': datetime.now(timezone.utc) + timedelta(hours=24),  # Token expires in 24 hours
+        'exp': datetime.now(timezone.utc) + TOKEN_LIFETIME,  # Token expires in 24 hours
         'iat': datetime.now(timezone.utc),
-        'sub': str(user_id)  # Token expires in 1 day'
+        'sub': str(user_id),  # Token expires in 1 day'
+        'jti': uuid.uuid4().hex  # Lets this one token be revoked
     }
+    if roles is not None and role_version is not None:
+        payload['roles'] = sorted({name.lower() for name in roles})
+        payload['rv'] = role_version
     
     user_token = jwt.encode(payload, SECRET_KEY, algorithm='HS256')
     return user_token
@@ -44,6 +61,109 @@ def decode_user_token(user_token):
     except (jwt.ExpiredSignatureError, jwt.JWTError):
         return None
 
+def _verified_identity():
+    """
+    Resolves the request's bearer token to the Identity of an active user.
+
+    Tokens seen recently are answered from the identity cache without
+    decoding them or querying the database. Otherwise the token is verified
+    and the user's is_active and role_version are read; the token's roles
+    claim is used while its version is current, the role membership map
+    (which reads user_roles only for changed users) when it isn't.
+
+    Revocations are checked on every call, cached or not, against the
+    in-memory revocation list. The identity is also left in g.identity for
+    the handler.
+
+    Returns:
+        tuple: (identity, None), or (None, error response) when the token is
+        missing, invalid, expired or revoked, or its user is missing or
+        inactive.
+    """
+    from app.models import User, db
+
+    user_token = None
+
+    if "Authorization" in request.headers:
+        auth_header = request.headers["Authorization"]
+
+        if auth_header.startswith("Bearer "):
+            user_token = auth_header.split(" ")[1]
+
+    if not user_token:
+        return None, (jsonify({"error": "Token is missing"}), 401)
+
+    identity_cache = current_identity_cache()
+    key = token_key(user_token)
+    identity = identity_cache.get(key) if identity_cache is not None else None
+
+    if identity is None:
+        try:
+            data = jwt.decode(user_token, SECRET_KEY, algorithms=["HS256"])
+        except jwt.ExpiredSignatureError:
+            return None, (jsonify({"error": "Token has expired"}), 401)
+        except jwt.JWTError:
+            return None, (jsonify({"error": "Invalid token"}), 401)
+
+        user_id = int(data["sub"])
+        user = db.session.execute(
+            select(User.is_active, User.role_version).where(User.user_id == user_id)
+        ).first()
+
+        if not user:
+            return None, (jsonify({"error": "User not found"}), 404)
+
+        role_membership = current_role_membership()
+        if data.get("rv") == user.role_version and isinstance(data.get("roles"), list):
+            roles = frozenset(data["roles"])
+            role_membership.remember(user_id, user.role_version, roles)
+        else:
+            roles = role_membership.roles_for(user_id, user.role_version)
+
+        identity = Identity(
+            user_id=user_id, is_active=user.is_active, roles=roles,
+            jti=data.get("jti"), issued_at=data.get("iat"), expires_at=data["exp"]
+        )
+        if identity_cache is not None:
+            identity_cache.set(key, identity, data["exp"])
+
+    if not identity.is_active:
+        return None, (jsonify({"error": "User not found"}), 404)
+
+    revocation_list = current_revocation_list()
+    if revocation_list is not None and revocation_list.is_revoked(identity):
+        return None, (jsonify({"error": "Token has been revoked"}), 401)
+
+    g.identity = identity
+    g.pop('current_user', None)
+    return identity, None
+
+def get_current_user():
+    """
+    The authenticated user's row for this request, loaded on first use with
+    the CURRENT_USER_EAGER_LOADS relationships and reused after that.
+
+    Returns:
+        User: Or None outside an authenticated request.
+    """
+    from app.models import User, db
+
+    if 'current_user' not in g:
+        identity = g.get('identity')
+        if identity is None:
+            return None
+
+        options = []
+        for name in current_app.config.get('CURRENT_USER_EAGER_LOADS', CURRENT_USER_EAGER_LOADS):
+            relationship = getattr(User, name)
+            # Collections in a second IN query, many-to-ones joined into the user's
+            options.append(selectinload(relationship) if relationship.property.uselist else joinedload(relationship))
+
+        g.current_user = db.session.execute(
+            select(User).options(*options).where(User.user_id == identity.user_id)
+        ).unique().scalars().first()
+    return g.current_user
+
 def user_token_required(f):
     """
     Decorator to require a valid customer token for a route.
@@ -57,36 +177,11 @@ def user_token_required(f):
     
     @wraps(f)
     def decorated(*args, **kwargs):
-        from app.models import User, db
-
-        user_token = None
-
-        if "Authorization" in request.headers:
-            auth_header = request.headers["Authorization"]
-
-            if auth_header.startswith("Bearer "):
-                user_token = auth_header.split(" ")[1]
-
-        if not user_token:
-            return jsonify({"error": "Token is missing"}), 401
+        identity, error = _verified_identity()
+        if error:
+            return error
         
-        try:
-            data = jwt.decode(user_token, SECRET_KEY, algorithms=["HS256"])
-            user_id = int(data["sub"])
-
-            user = db.session.execute(
-                select(User).where(User.user_id == user_id, User.is_active == True)
-            ).scalars().first()
-
-            if not user:
-                return jsonify({"error": "User not found"}), 404
-            
-        except jwt.ExpiredSignatureError:
-            return jsonify({"error": "Token has expired"}), 401
-        except jwt.JWTError:
-            return jsonify({"error": "Invalid token"}), 401
-        
-        return f(user_id, *args, **kwargs)
+        return f(identity.user_id, *args, **kwargs)
 
     return decorated
 
@@ -102,40 +197,14 @@ def admin_token_required(f):
     """
     @wraps(f)
     def decorated(*args, **kwargs):
-        from app.models import User, db
-
-        user_token = None
-
-        if "Authorization" in request.headers:
-            auth_header = request.headers["Authorization"]
-
-            if auth_header.startswith("Bearer "):
-                user_token = auth_header.split(" ")[1]
-
-        if not user_token:
-            return jsonify({"error": "Token is missing"}), 401
+        identity, error = _verified_identity()
+        if error:
+            return error
         
-        try:
-            data = jwt.decode(user_token, SECRET_KEY, algorithms=["HS256"])
-            user_id = int(data["sub"])
-
-            user = db.session.execute(
-                select(User).where(User.user_id == user_id, User.is_active == True)
-            ).scalars().first()
-
-            if not user:
-                return jsonify({"error": "User not found"}), 404
-            
-            admin_role = any(role.name.lower() == "admin" for role in user.roles)
-            if not admin_role:
-                return jsonify({"error": "Admin access required"}), 403
-            
-        except jwt.ExpiredSignatureError:
-            return jsonify({"error": "Token has expired"}), 401
-        except jwt.JWTError:
-            return jsonify({"error": "Invalid token"}), 401
+        if ADMIN_ROLE not in identity.roles:
+            return jsonify({"error": "Admin access required"}), 403
         
-        return f(user_id, *args, **kwargs)
+        return f(identity.user_id, *args, **kwargs)
     
     return decorated
 
@@ -152,18 +221,12 @@ def resource_owner_required(f):
     """
     @wraps(f)
     def decorated(user_id, *args, **kwargs):
-        from app.models import User, db  # Import here to avoid circular imports
-        
-        # Get the user to check for admin role
-        user = db.session.execute(
-            select(User).where(User.user_id == user_id)
-        ).scalars().first()
-        
+        # The token decorator has just put this user's roles in the membership map
         # If user is admin, allow access
-        if user and any(role.name.lower() == 'admin' for role in user.roles):
+        if user_id in current_role_membership().members(ADMIN_ROLE):
             return f(user_id, *args, **kwargs)
         
         # Otherwise, the route function should implement ownership checking
         return f(user_id, *args, **kwargs)
     
-    return decorated
\ No newline at end of file
+    return decorated
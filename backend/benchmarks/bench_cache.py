@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark the shared SQLite cache against per-worker SimpleCache.
+
+Each worker process replays the same skewed (Zipf-like) key stream: a miss
+"renders" the value and stores it. With SimpleCache every worker warms its
+own copy, so the hit rate drops as workers are added; the shared cache is
+warmed once for all of them.
+
+Usage (from backend/):
+    python -m benchmarks.bench_cache             # 1, 4 and 8 workers
+    python -m benchmarks.bench_cache 2 16        # custom worker counts
+"""
+
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from flask_caching.backends.simplecache import SimpleCache
+
+from app.utils.sqlite_cache import SQLiteCache
+
+KEYS = 5000
+REQUESTS_PER_WORKER = 20000
+VALUE = {'items': [{'id': str(i), 'title': f'Listing {i}', 'price': i} for i in range(20)]}
+
+
+def key_stream(seed):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(KEYS)]
+    return [f'view:/api/listings/{key}' for key in rng.choices(range(KEYS), weights=weights, k=REQUESTS_PER_WORKER)]
+
+
+def worker(backend_name, path, seed, results):
+    backend = SimpleCache(threshold=KEYS * 2) if backend_name == 'SimpleCache' else SQLiteCache(path, threshold=KEYS * 2)
+    hits = 0
+    timings = []
+    for key in key_stream(seed):
+        started = time.perf_counter()
+        value = backend.get(key)
+        timings.append((time.perf_counter() - started) * 1e6)
+        if value is None:
+            backend.set(key, VALUE)
+        else:
+            hits += 1
+    results.put((hits, timings))
+
+
+def run(backend_name, workers):
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    os.remove(path)
+    try:
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=worker, args=(backend_name, path, seed, results))
+            for seed in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    hits = sum(hit_count for hit_count, _ in collected)
+    timings = sorted(t for _, worker_timings in collected for t in worker_timings)
+    hit_rate = hits / (workers * REQUESTS_PER_WORKER)
+    p50 = statistics.median(timings)
+    p99 = timings[int(len(timings) * 0.99)]
+    print(f"   {backend_name:<14}{workers:>8}{hit_rate:>11.1%}{p50:>10.1f}us{p99:>10.1f}us")
+
+
+if __name__ == '__main__':
+    worker_counts = [int(arg) for arg in sys.argv[1:]] or [1, 4, 8]
+    print(f"📦 {KEYS:,} keys, {REQUESTS_PER_WORKER:,} gets per worker")
+    print(f"   {'backend':<14}{'workers':>8}{'hit rate':>11}{'get p50':>12}{'get p99':>12}")
+    for workers in worker_counts:
+        for backend_name in ('SimpleCache', 'SQLiteCache'):
+            run(backend_name, workers)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Benchmark broad browse queries: SQL vs the in-memory listing catalog.
+
+Times selecting one page of listing IDs (hydrating the page costs the same
+either way) for filter/sort combinations of the public browse path.
+
+Usage (from backend/):
+    python -m benchmarks.bench_catalog            # 1M listings
+    python -m benchmarks.bench_catalog 100000     # custom sizes
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from flask import Flask
+from sqlalchemy import select, desc
+
+from app.models import db, Listing, Subcategory, Location
+from app.blueprints.listings.catalog import ListingCatalog
+from app.utils.geo import radius_prefilter, rank_by_distance, geohash_encode
+from app.utils.pagination import PageRequest, keyset_paginate, slice_paginate
+
+CATEGORIES = 10
+SUBCATEGORIES_PER_CATEGORY = 8
+CENTER = (37.7749, -122.4194)
+REPEATS = 20
+PAGE = PageRequest(per_page=20, cursor=None, page=None, include_total=False)
+
+
+def populate(connection, size):
+    rng = random.Random(42)
+    connection.exec_driver_sql(
+        "INSERT INTO users (user_id, first_name, email, password_hash, created_at, updated_at, is_active) "
+        "VALUES (1, 'Bench', 'bench@rettnar.com', 'x', '2024-01-01', '2024-01-01', 1)"
+    )
+    connection.exec_driver_sql(
+        "INSERT INTO categories (category_id, name) VALUES (?, ?)",
+        [(c, f'Category {c}') for c in range(1, CATEGORIES + 1)]
+    )
+    subcategories = [
+        (c * 100 + s, f'Subcategory {c}.{s}', c)
+        for c in range(1, CATEGORIES + 1) for s in range(SUBCATEGORIES_PER_CATEGORY)
+    ]
+    connection.exec_driver_sql("INSERT INTO subcategories (subcategory_id, name, category_id) VALUES (?, ?, ?)", subcategories)
+
+    batch = 10000
+    for start in range(1, size + 1, batch):
+        ids = range(start, min(start + batch, size + 1))
+        points = {i: (CENTER[0] + rng.uniform(-1, 1), CENTER[1] + rng.uniform(-1, 1)) for i in ids}
+        connection.exec_driver_sql(
+            "INSERT INTO locations (location_id, address, city, state, zip_code, country, latitude, longitude, geohash) "
+            "VALUES (?, ?, 'San Francisco', 'CA', '94105', 'USA', ?, ?, ?)",
+            [(i, f'{i} Main St', lat, lng, geohash_encode(lat, lng)) for i, (lat, lng) in points.items()]
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO listings (listing_id, title, description, price, created_at, subcategory_id, owner_id, "
+            "location_id, rating_avg) VALUES (?, 'Bench', '', ?, ?, ?, 1, ?, ?)",
+            [
+                (i, rng.randint(5, 1500), f'2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 12:00:00',
+                 rng.choice(subcategories)[0], i, round(rng.uniform(0, 5), 2))
+                for i in ids
+            ]
+        )
+
+
+def sql_page(sort, category_id=None, min_price=None, max_price=None, radius=None):
+    query = select(Listing)
+    if category_id:
+        query = query.join(Subcategory).where(Subcategory.category_id == category_id)
+    if min_price is not None:
+        query = query.where(Listing.price >= min_price)
+    if max_price is not None:
+        query = query.where(Listing.price <= max_price)
+
+    if radius:
+        candidates = db.session.execute(
+            query.join(Location).where(radius_prefilter(Location, *CENTER, radius))
+            .with_only_columns(Listing.listing_id, Location.latitude, Location.longitude)
+        ).all()
+        ranked = rank_by_distance(candidates, *CENTER, radius)
+        return slice_paginate([listing_id for listing_id, _ in ranked], PAGE)[0]
+
+    order_by = {
+        'rating': [desc(Listing.rating_avg), desc(Listing.listing_id)],
+        'newest': [desc(Listing.created_at), desc(Listing.listing_id)],
+    }.get(sort, [Listing.listing_id])
+    return [listing.listing_id for listing in keyset_paginate(query, order_by, PAGE)[0]]
+
+
+def catalog_page(catalog, sort, radius=None, **filters):
+    if radius:
+        return [listing_id for listing_id, _ in catalog.nearby(*CENTER, radius, **filters)[:PAGE.per_page]]
+    return catalog.page(sort, PAGE, **filters)[0]
+
+
+SCENARIOS = [
+    ('rating, price 100-300', dict(sort='rating', min_price=100, max_price=300)),
+    ('newest, category 3', dict(sort='newest', category_id=3)),
+    ('rating, category 3 <50', dict(sort='rating', category_id=3, max_price=50)),
+    ('radius 25km', dict(sort=None, radius=25)),
+    ('radius 50km, cat 3', dict(sort=None, radius=50, category_id=3)),
+]
+
+
+def timings_ms(fn):
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+        db.session.expunge_all()
+    timings.sort()
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.99)], result
+
+
+def run(size):
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    try:
+        with app.app_context():
+            db.create_all()
+            started = time.perf_counter()
+            with db.engine.begin() as connection:
+                populate(connection, size)
+            print(f"📦 {size:,} listings loaded in {time.perf_counter() - started:.1f}s")
+
+            catalog = ListingCatalog(refresh_interval=3600)
+            started = time.perf_counter()
+            catalog.columns
+            print(f"   catalog built in {time.perf_counter() - started:.1f}s")
+
+            print(f"   {'query':<26}{'SQL p50':>10}{'SQL p99':>10}{'NumPy p50':>11}{'NumPy p99':>11}")
+            for name, params in SCENARIOS:
+                sql_p50, sql_p99, expected = timings_ms(lambda: sql_page(**params))
+                np_p50, np_p99, actual = timings_ms(lambda: catalog_page(catalog, **params))
+                mismatch = '' if actual == expected else '  ⚠️ results differ'
+                print(f"   {name:<26}{sql_p50:>8.1f}ms{sql_p99:>8.1f}ms{np_p50:>9.1f}ms{np_p99:>9.1f}ms{mismatch}")
+            db.session.remove()
+            db.engine.dispose()
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000_000]
+    for size in sizes:
+        run(size)
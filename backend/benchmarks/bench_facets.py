@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark facet computation for the listings endpoint (?facets=true).
+
+Reports the latency of the single grouped facet statement for broad and
+narrow filters and flags any query over the latency budget.
+
+Usage (from backend/):
+    python -m benchmarks.bench_facets            # 1M listings
+    python -m benchmarks.bench_facets 100000     # custom sizes
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from flask import Flask
+from sqlalchemy import select
+
+from app.models import db, Listing, Subcategory
+from app.blueprints.listings.facets import listing_facets, FACET_ROW_LIMIT
+from app.utils.search import build_match_expression, ranked_search_subquery
+
+WORDS = ['drill', 'camera', 'tent', 'kayak', 'speaker', 'ladder', 'projector', 'bike', 'grill', 'saw']
+CITIES = ['San Francisco', 'Oakland', 'Berkeley', 'San Jose', 'New York', 'Austin', 'Seattle', 'Denver']
+CATEGORIES = 10
+SUBCATEGORIES_PER_CATEGORY = 8
+AMENITIES = 12
+LATENCY_BUDGET_MS = 250
+REPEATS = 5
+
+
+def populate(connection, size):
+    rng = random.Random(42)
+    connection.exec_driver_sql(
+        "INSERT INTO users (user_id, first_name, email, password_hash, created_at, updated_at, is_active) "
+        "VALUES (1, 'Bench', 'bench@rettnar.com', 'x', '2024-01-01', '2024-01-01', 1)"
+    )
+    connection.exec_driver_sql(
+        "INSERT INTO categories (category_id, name) VALUES (?, ?)",
+        [(c, f'Category {c}') for c in range(1, CATEGORIES + 1)]
+    )
+    subcategories = [
+        (c * 100 + s, f'Subcategory {c}.{s}', c)
+        for c in range(1, CATEGORIES + 1) for s in range(SUBCATEGORIES_PER_CATEGORY)
+    ]
+    connection.exec_driver_sql("INSERT INTO subcategories (subcategory_id, name, category_id) VALUES (?, ?, ?)", subcategories)
+    connection.exec_driver_sql(
+        "INSERT INTO amenities (amenity_id, name) VALUES (?, ?)",
+        [(a, f'Amenity {a}') for a in range(1, AMENITIES + 1)]
+    )
+
+    batch = 10000
+    for start in range(1, size + 1, batch):
+        ids = range(start, min(start + batch, size + 1))
+        connection.exec_driver_sql(
+            "INSERT INTO locations (location_id, address, city, state, zip_code, country) VALUES (?, ?, ?, ?, ?, ?)",
+            [(i, f'{i} Main St', rng.choice(CITIES), 'CA', '94105', 'USA') for i in ids]
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO listings (listing_id, title, description, price, created_at, subcategory_id, owner_id, location_id) "
+            "VALUES (?, ?, '', ?, '2024-01-01', ?, 1, ?)",
+            [(i, ' '.join(rng.sample(WORDS, 2)), rng.randint(5, 1500), rng.choice(subcategories)[0], i) for i in ids]
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO listing_amenities (listing_id, amenity_id) VALUES (?, ?)",
+            [(i, a) for i in ids for a in rng.sample(range(1, AMENITIES + 1), 2)]
+        )
+
+
+def scenarios():
+    matches = ranked_search_subquery(build_match_expression('kayak'))
+    return [
+        ('no filters', select(Listing)),
+        ('category', select(Listing).join(Subcategory).where(Subcategory.category_id == 3)),
+        ('price 100-200', select(Listing).where(Listing.price.between(100, 200))),
+        ('search kayak', select(Listing).join(matches, matches.c.listing_id == Listing.listing_id)),
+    ]
+
+
+def run(size):
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    try:
+        with app.app_context():
+            db.create_all()
+            started = time.perf_counter()
+            with db.engine.begin() as connection:
+                populate(connection, size)
+            print(f"📦 {size:,} listings loaded in {time.perf_counter() - started:.1f}s "
+                  f"(facets cover at most {FACET_ROW_LIMIT:,} rows)")
+
+            print(f"   {'filter':<16}{'total':>10}{'p50':>10}{'max':>10}  approximate")
+            for name, query in scenarios():
+                timings = []
+                for _ in range(REPEATS):
+                    started = time.perf_counter()
+                    facets = listing_facets(query=query)
+                    timings.append((time.perf_counter() - started) * 1000)
+                p50, worst = statistics.median(timings), max(timings)
+                flag = '  ⚠️ over budget' if p50 > LATENCY_BUDGET_MS else ''
+                print(f"   {name:<16}{facets['total']:>10,}{p50:>8.1f}ms{worst:>8.1f}ms  {facets['approximate']}{flag}")
+            db.session.remove()
+            db.engine.dispose()
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000_000]
+    for size in sizes:
+        run(size)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Load benchmark: read latency during a login burst, with password hashing
+inline on the request threads versus in the bounded hashing pool.
+
+Serves the app from a fixed pool of request threads (like a gthread
+worker), then measures GET /api/users/roles latency from one client while
+LOGIN_CLIENTS clients hammer POST /api/auth/login with scrypt hashes.
+
+Usage (from backend/):
+    python -m benchmarks.bench_hashing                 # 4 request threads, 10s burst
+    python -m benchmarks.bench_hashing 8 20            # request threads, burst seconds
+"""
+
+import http.client
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIServer, WSGIRequestHandler, make_server
+
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from app.models import db, User, Role
+from app.utils.hashing import PasswordHasher
+from config import TestingConfig, config
+
+LOGIN_CLIENTS = 16
+BASELINE_SECONDS = 3
+KDF = 'scrypt:32768:8:1'
+
+MODES = {
+    'inline': dict(processes=0, queue_limit=10 ** 6),
+    'pool': dict(processes=2, queue_limit=2),
+}
+
+
+class PooledWSGIServer(WSGIServer):
+    """wsgiref server handing each connection to a fixed pool of request threads"""
+
+    request_threads = 4
+
+    def server_activate(self):
+        super().server_activate()
+        self.pool = ThreadPoolExecutor(self.request_threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def call(port, method, path, body=None):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    started = time.perf_counter()
+    connection.request(method, path, body=json.dumps(body) if body else None,
+                       headers={'Content-Type': 'application/json'})
+    status = connection.getresponse().status
+    connection.close()
+    return status, (time.perf_counter() - started) * 1000
+
+
+def read_latencies(port, stop):
+    timings = []
+    while not stop.is_set():
+        timings.append(call(port, 'GET', '/api/users/roles')[1])
+        time.sleep(0.01)
+    return timings
+
+
+def login_storm(port, stop, statuses):
+    while not stop.is_set():
+        status, _ = call(port, 'POST', '/api/auth/login', {'email': 'user@rettnar.com', 'password': 'hunter22'})
+        statuses.append(status)
+        if status == 503:
+            # Well-behaved clients honour Retry-After
+            time.sleep(1)
+
+
+def percentile(timings, fraction):
+    timings = sorted(timings)
+    return timings[min(len(timings) - 1, int(len(timings) * fraction))]
+
+
+def run(mode, request_threads, burst_seconds, path):
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        PASSWORD_HASH_METHOD = KDF
+
+    config['bench'] = BenchConfig
+    app = create_app('bench')
+    app.extensions['password_hasher'] = PasswordHasher(method=KDF, **MODES[mode])
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add_all([
+            Role(name='renter'), Role(name='owner'),
+            User(first_name='User', email='user@rettnar.com', password_hash=generate_password_hash('hunter22', KDF)),
+        ])
+        db.session.commit()
+
+    PooledWSGIServer.request_threads = request_threads
+    server = make_server('127.0.0.1', 0, app, server_class=PooledWSGIServer, handler_class=QuietHandler)
+    port = server.server_port
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # Warm up the hashing pool and the app
+    call(port, 'POST', '/api/auth/login', {'email': 'user@rettnar.com', 'password': 'hunter22'})
+
+    stop = threading.Event()
+    timer = threading.Timer(BASELINE_SECONDS, stop.set)
+    timer.start()
+    baseline = read_latencies(port, stop)
+
+    stop, statuses = threading.Event(), []
+    stormers = [threading.Thread(target=login_storm, args=(port, stop, statuses)) for _ in range(LOGIN_CLIENTS)]
+    for thread in stormers:
+        thread.start()
+    timer = threading.Timer(burst_seconds, stop.set)
+    timer.start()
+    during = read_latencies(port, stop)
+    for thread in stormers:
+        thread.join()
+    server.shutdown()
+
+    ok = statuses.count(200)
+    shed = statuses.count(503)
+    print(f"   {mode:<8}{statistics.median(baseline):>9.1f}ms{percentile(baseline, 0.99):>9.1f}ms"
+          f"{statistics.median(during):>11.1f}ms{percentile(during, 0.99):>9.1f}ms"
+          f"{ok / burst_seconds:>10.1f}/s{shed:>8}")
+
+
+if __name__ == '__main__':
+    request_threads = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    burst_seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    print(f"📦 {request_threads} request threads, {LOGIN_CLIENTS} login clients, {KDF}, {os.cpu_count()} CPUs")
+    print(f"   {'':<8}{'idle p50':>11}{'idle p99':>11}{'burst p50':>11}{'burst p99':>11}{'logins':>12}{'shed':>8}")
+    for mode in MODES:
+        handle, path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        try:
+            run(mode, request_threads, burst_seconds, path)
+        finally:
+            os.remove(path)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark bulk listing import throughput against one-at-a-time creation.
+
+"single" replays what create_listing does per listing (flush the location,
+flush the listing, add features, commit); "bulk" is import_listings with
+its chunked multi-row inserts. Both validate with ListingCreateSchema and
+start from the same empty database.
+
+Usage (from backend/):
+    python -m benchmarks.bench_import              # 1,000 and 10,000 rows
+    python -m benchmarks.bench_import 500 5000     # custom sizes
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from flask import Flask
+
+from app.extensions import cache, ma
+from app.models import db, User, Category, Subcategory, Amenity, Location, Listing, ListingFeature
+from app.blueprints.listings.importer import import_listings
+from app.blueprints.listings.schemas import listing_create_schema
+
+
+def make_rows(size, subcategory_ids, amenity_ids):
+    rng = random.Random(42)
+    return [
+        {
+            'title': f'Listing {i}', 'description': 'Imported', 'price': rng.randint(5, 500),
+            'subcategory_id': rng.choice(subcategory_ids), 'address': f'{i} Main St', 'city': 'Oakland',
+            'state': 'CA', 'country': 'USA', 'zip_code': '94607',
+            'latitude': 37.8 + rng.uniform(-0.1, 0.1), 'longitude': -122.27 + rng.uniform(-0.1, 0.1),
+            'amenity_ids': rng.sample(amenity_ids, 2),
+            'features': [{'key': 'condition', 'value': 'good'}, {'key': 'weight', 'value': '2kg'}],
+        }
+        for i in range(size)
+    ]
+
+
+def create_one_by_one(rows, owner_id):
+    for row in rows:
+        data = listing_create_schema.load(row)
+        location = Location(
+            address=data['address'], city=data['city'], state=data['state'], country=data['country'],
+            zip_code=data['zip_code'], latitude=data.get('latitude'), longitude=data.get('longitude')
+        )
+        db.session.add(location)
+        db.session.flush()
+        listing = Listing(
+            title=data['title'], description=data.get('description', ''), price=data['price'],
+            subcategory_id=data['subcategory_id'], owner_id=owner_id, location_id=location.location_id
+        )
+        db.session.add(listing)
+        db.session.flush()
+        listing.amenities = db.session.query(Amenity).filter(Amenity.amenity_id.in_(data['amenity_ids'])).all()
+        for feature in data['features']:
+            db.session.add(ListingFeature(listing_id=listing.listing_id, key=feature['key'], value=feature['value']))
+        db.session.commit()
+
+
+def run(size):
+    print(f"📦 {size:,} listings")
+    for name in ('single', 'bulk'):
+        handle, path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+        db.init_app(app)
+        ma.init_app(app)
+        cache.init_app(app, config={'CACHE_TYPE': 'NullCache'})
+        try:
+            with app.app_context():
+                db.create_all()
+                category = Category(name='Tools')
+                owner = User(first_name='Seller', email='seller@rettnar.com', password_hash='x')
+                db.session.add_all([category, owner])
+                db.session.flush()
+                subcategories = [Subcategory(name=f'Sub {i}', category_id=category.category_id) for i in range(8)]
+                amenities = [Amenity(name=f'Amenity {i}') for i in range(10)]
+                db.session.add_all(subcategories + amenities)
+                db.session.commit()
+
+                rows = make_rows(
+                    size, [s.subcategory_id for s in subcategories], [a.amenity_id for a in amenities]
+                )
+                started = time.perf_counter()
+                if name == 'single':
+                    create_one_by_one(rows, owner.user_id)
+                    errors = 0
+                else:
+                    errors = len(import_listings(rows, owner.user_id)['errors'])
+                elapsed = time.perf_counter() - started
+
+                created = db.session.query(Listing).count()
+                print(f"   {name:<8}{elapsed:>8.2f}s{created / elapsed:>12,.0f} listings/s   ({created:,} created, {errors} errors)")
+                db.session.remove()
+                db.engine.dispose()
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000]
+    for size in sizes:
+        run(size)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark the listings `search` filter: leading-wildcard LIKE vs the FTS5 index.
+
+Usage (from backend/):
+    python -m benchmarks.bench_search            # 100k and 1M listings
+    python -m benchmarks.bench_search 100000     # custom sizes
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, select, func, or_
+from sqlalchemy.orm import Session
+
+from app.models import Base, Listing, Location
+from app.utils.search import build_match_expression, ranked_search_subquery
+
+WORDS = [
+    'drill', 'camera', 'tent', 'kayak', 'speaker', 'ladder', 'projector', 'bike', 'grill', 'saw',
+    'lens', 'tripod', 'generator', 'canoe', 'mixer', 'studio', 'van', 'trailer', 'sander', 'router',
+    'cordless', 'portable', 'vintage', 'professional', 'compact', 'heavy', 'duty', 'electric',
+]
+CITIES = ['San Francisco', 'Oakland', 'Berkeley', 'San Jose', 'New York', 'Austin', 'Seattle', 'Denver']
+QUERIES = ['drill', 'cordless drill', 'pro', 'vintage camera lens', 'seattle kayak']
+PAGE_SIZE = 20
+REPEATS = 5
+
+
+def populate(engine, size):
+    rng = random.Random(42)
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "INSERT INTO users (user_id, first_name, email, password_hash, created_at, updated_at, is_active) "
+            "VALUES (1, 'Bench', 'bench@rettnar.com', 'x', '2024-01-01', '2024-01-01', 1)"
+        )
+        connection.exec_driver_sql("INSERT INTO categories (category_id, name) VALUES (1, 'Bench')")
+        connection.exec_driver_sql("INSERT INTO subcategories (subcategory_id, name, category_id) VALUES (1, 'Bench', 1)")
+
+        batch = 10000
+        for start in range(1, size + 1, batch):
+            ids = range(start, min(start + batch, size + 1))
+            connection.exec_driver_sql(
+                "INSERT INTO locations (location_id, address, city, state, zip_code, country) VALUES (?, ?, ?, ?, ?, ?)",
+                [(i, f'{i} Main St', rng.choice(CITIES), 'CA', f'{94000 + i % 1000}', 'USA') for i in ids]
+            )
+            connection.exec_driver_sql(
+                "INSERT INTO listings (listing_id, title, description, price, created_at, subcategory_id, owner_id, location_id) "
+                "VALUES (?, ?, ?, ?, '2024-01-01', 1, 1, ?)",
+                [
+                    (i, ' '.join(rng.sample(WORDS, 3)), ' '.join(rng.choices(WORDS, k=12)), rng.randint(5, 500), i)
+                    for i in ids
+                ]
+            )
+
+
+def like_page(session, term):
+    search_term = f'%{term.lower()}%'
+    query = select(Listing).join(Location).where(
+        or_(
+            func.lower(Listing.title).like(search_term),
+            func.lower(Listing.description).like(search_term),
+            func.lower(Location.address).like(search_term),
+            func.lower(Location.city).like(search_term),
+            func.lower(Location.state).like(search_term),
+            func.lower(Location.zip_code).like(search_term)
+        )
+    )
+    session.execute(select(func.count()).select_from(query.subquery())).scalar()
+    return session.execute(query.limit(PAGE_SIZE)).scalars().all()
+
+
+def fts_page(session, term):
+    matches = ranked_search_subquery(build_match_expression(term))
+    query = select(Listing).join(matches, matches.c.listing_id == Listing.listing_id).order_by(
+        matches.c.search_rank, Listing.listing_id
+    )
+    session.execute(select(func.count()).select_from(query.order_by(None).subquery())).scalar()
+    return session.execute(query.limit(PAGE_SIZE)).scalars().all()
+
+
+def measure(session, fn, term):
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        fn(session, term)
+        timings.append((time.perf_counter() - started) * 1000)
+        session.expunge_all()
+    return statistics.median(timings), max(timings)
+
+
+def run(size):
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    try:
+        engine = create_engine(f'sqlite:///{path}')
+        Base.metadata.create_all(engine)
+
+        started = time.perf_counter()
+        populate(engine, size)
+        print(f"📦 {size:,} listings loaded in {time.perf_counter() - started:.1f}s (FTS kept in sync by triggers)")
+
+        with Session(engine) as session:
+            print(f"   {'query':<22}{'LIKE p50':>12}{'LIKE max':>12}{'FTS p50':>12}{'FTS max':>12}")
+            for term in QUERIES:
+                like_p50, like_max = measure(session, like_page, term)
+                fts_p50, fts_max = measure(session, fts_page, term)
+                print(f"   {term:<22}{like_p50:>10.1f}ms{like_max:>10.1f}ms{fts_p50:>10.1f}ms{fts_max:>10.1f}ms")
+        engine.dispose()
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    for size in sizes:
+        run(size)
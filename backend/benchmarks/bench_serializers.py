@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark compiled serializers against marshmallow Schema.dump.
+
+Loads pages of fully hydrated listings (same loader options as the routes)
+and times dumping them with each hot response schema both ways, checking
+that the JSON output is byte-identical.
+
+Usage (from backend/):
+    python -m benchmarks.bench_serializers              # 20, 100 and 1000 items
+    python -m benchmarks.bench_serializers 50 5000      # custom page sizes
+"""
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from flask import Flask
+from sqlalchemy import select
+
+from app.extensions import ma
+from app.models import db, Listing
+from app.blueprints.auth.schemas import AuthUserSchema, auth_user_serializer
+from app.blueprints.listings.frontend_schemas import FrontendListingSchema, frontend_listing_serializer
+from app.blueprints.listings.schemas import ListingSchema, listings_serializer, LISTING_SCHEMA_LOAD_OPTIONS
+
+REPEATS = 15
+
+
+def populate(connection, size):
+    connection.exec_driver_sql("INSERT INTO categories (category_id, name) VALUES (1, 'Tools')")
+    connection.exec_driver_sql("INSERT INTO subcategories (subcategory_id, name, category_id) VALUES (1, 'Drills', 1)")
+    connection.exec_driver_sql(
+        "INSERT INTO users (user_id, first_name, last_name, email, password_hash, created_at, updated_at, is_active) "
+        "VALUES (?, 'Owner', ?, ?, 'x', '2024-01-01', '2024-01-01', 1)",
+        [(i, f'{i}', f'owner{i}@rettnar.com') for i in range(1, size + 1)]
+    )
+    connection.exec_driver_sql(
+        "INSERT INTO locations (location_id, address, city, state, zip_code, country, latitude, longitude) "
+        "VALUES (?, ?, 'San Francisco', 'CA', '94105', 'USA', 37.77, -122.41)",
+        [(i, f'{i} Main St') for i in range(1, size + 1)]
+    )
+    connection.exec_driver_sql(
+        "INSERT INTO listings (listing_id, title, description, price, created_at, subcategory_id, owner_id, location_id) "
+        "VALUES (?, ?, 'Power tool', ?, '2024-01-01 12:00:00', 1, ?, ?)",
+        [(i, f'Drill {i}', 10 + i % 90, i, i) for i in range(1, size + 1)]
+    )
+    connection.exec_driver_sql(
+        "INSERT INTO images (listing_id, url, is_primary) VALUES (?, ?, 1)",
+        [(i, f'https://img.rettnar.com/{i}.jpg') for i in range(1, size + 1)]
+    )
+
+
+def median_ms(fn):
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def run(sizes):
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    ma.init_app(app)
+    try:
+        with app.app_context():
+            db.create_all()
+            with db.engine.begin() as connection:
+                populate(connection, max(sizes))
+            listings = db.session.execute(
+                select(Listing).options(*LISTING_SCHEMA_LOAD_OPTIONS).order_by(Listing.listing_id)
+            ).unique().scalars().all()
+            owners = [listing.owner for listing in listings]
+
+            schemas = [
+                ('FrontendListingSchema', FrontendListingSchema(many=True), frontend_listing_serializer, listings),
+                ('ListingSchema', ListingSchema(many=True), listings_serializer, listings),
+                ('AuthUserSchema', AuthUserSchema(many=True), auth_user_serializer, owners),
+            ]
+            print(f"   {'schema':<24}{'items':>7}{'dump':>11}{'compiled':>11}{'speedup':>9}")
+            for name, schema, serializer, rows in schemas:
+                for size in sizes:
+                    page = rows[:size]
+                    dump_ms, expected = median_ms(lambda: schema.dump(page))
+                    compiled_ms, actual = median_ms(lambda: serializer.dump(page, many=True))
+                    mismatch = '' if json.dumps(actual) == json.dumps(expected) else '  ⚠️ output differs'
+                    print(f"   {name:<24}{size:>7}{dump_ms:>9.2f}ms{compiled_ms:>9.2f}ms"
+                          f"{dump_ms / compiled_ms:>8.1f}x{mismatch}")
+            db.session.remove()
+            db.engine.dispose()
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [20, 100, 1000]
+    print(f"📦 dumping pages of {', '.join(str(size) for size in sizes)} listings")
+    run(sizes)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark typeahead lookups against the in-memory suggestion index.
+
+Builds the index from generated listing titles, subcategories and search
+logs, then times SuggestionIndex.suggest (median) for prefixes of every
+length a user types, from one character (the widest ranges) to whole words.
+Also times a background refresh that applies a batch of new listings,
+retitled listings and searches, as written between two refresh intervals.
+
+Usage (from backend/):
+    python -m benchmarks.bench_suggest              # 10,000 and 100,000 listings
+    python -m benchmarks.bench_suggest 50000        # custom sizes
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from flask import Flask
+
+from app.models import db
+from app.blueprints.listings.suggest import SuggestionIndex
+
+WORDS = [
+    'cordless', 'drill', 'hammer', 'ladder', 'camera', 'lens', 'tent', 'kayak', 'paddle', 'bike', 'helmet',
+    'projector', 'speaker', 'mixer', 'saw', 'sander', 'generator', 'pressure', 'washer', 'canon', 'nikon',
+    'sony', 'dewalt', 'makita', 'bosch', 'trailer', 'tripod', 'drone', 'grill', 'cooler', 'table', 'chairs',
+]
+PREFIXES = ['d', 'dr', 'dri', 'drill', 'cordless d', 'ca', 'pressure wa', 'zz']
+LOOKUPS = 200
+# Writes applied by the timed refresh
+REFRESH_LISTINGS = 100
+REFRESH_SEARCHES = 500
+
+
+def populate(connection, size, rng):
+    connection.exec_driver_sql("INSERT INTO categories (category_id, name) VALUES (1, 'Rentals')")
+    connection.exec_driver_sql(
+        "INSERT INTO subcategories (subcategory_id, name, category_id) VALUES (?, ?, 1)",
+        [(i, f'{word.title()}s') for i, word in enumerate(WORDS, start=1)]
+    )
+    connection.exec_driver_sql(
+        "INSERT INTO users (user_id, first_name, email, password_hash, created_at, updated_at, is_active) "
+        "VALUES (1, 'Owner', 'owner@rettnar.com', 'x', '2024-01-01', '2024-01-01', 1)"
+    )
+    connection.exec_driver_sql(
+        "INSERT INTO locations (location_id, address, city, state, zip_code, country) "
+        "VALUES (1, '1 Main St', 'Oakland', 'CA', '94607', 'USA')"
+    )
+    connection.exec_driver_sql(
+        "INSERT INTO listings (listing_id, title, description, price, created_at, updated_at, subcategory_id, "
+        "owner_id, location_id, rating_sum, rating_count, rating_avg) "
+        "VALUES (?, ?, '', 10, '2024-01-01', '2024-01-01', ?, 1, 1, 0, 0, 0)",
+        [
+            (i, ' '.join(rng.sample(WORDS, 3)) + f' {i}', rng.randint(1, len(WORDS)))
+            for i in range(1, size + 1)
+        ]
+    )
+    connection.exec_driver_sql(
+        "INSERT INTO search_logs (keyword, searched_at, user_id) VALUES (?, '2024-01-01', 1)",
+        [(' '.join(rng.sample(WORDS, rng.randint(1, 2))),) for _ in range(size // 2)]
+    )
+
+
+def write_batch(connection, size, rng):
+    """New and retitled listings with their change feed rows, and new searches"""
+    new_ids = range(size + 1, size + REFRESH_LISTINGS // 2 + 1)
+    connection.exec_driver_sql(
+        "INSERT INTO listings (listing_id, title, description, price, created_at, updated_at, subcategory_id, "
+        "owner_id, location_id, rating_sum, rating_count, rating_avg) "
+        "VALUES (?, ?, '', 10, '2024-01-01', '2024-01-01', ?, 1, 1, 0, 0, 0)",
+        [(i, ' '.join(rng.sample(WORDS, 3)) + f' {i}', rng.randint(1, len(WORDS))) for i in new_ids]
+    )
+    retitled_ids = rng.sample(range(1, size + 1), REFRESH_LISTINGS // 2)
+    connection.exec_driver_sql(
+        "UPDATE listings SET title = ? WHERE listing_id = ?",
+        [(' '.join(rng.sample(WORDS, 2)) + f' {i}', i) for i in retitled_ids]
+    )
+    connection.exec_driver_sql(
+        "INSERT INTO listing_changes (listing_id) VALUES (?)", [(i,) for i in [*new_ids, *retitled_ids]]
+    )
+    connection.exec_driver_sql(
+        "INSERT INTO search_logs (keyword, searched_at, user_id) VALUES (?, '2024-01-01', 1)",
+        [(' '.join(rng.sample(WORDS, rng.randint(1, 2))),) for _ in range(REFRESH_SEARCHES)]
+    )
+
+
+def run(size):
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    try:
+        with app.app_context():
+            db.create_all()
+            with db.engine.begin() as connection:
+                populate(connection, size, random.Random(42))
+
+            index = SuggestionIndex()
+            started = time.perf_counter()
+            index.refresh()
+            print(f"📦 {size:,} listings: index built in {time.perf_counter() - started:.2f}s")
+
+            with db.engine.begin() as connection:
+                write_batch(connection, size, random.Random(7))
+            started = time.perf_counter()
+            index.refresh()
+            print(f"   refresh with {REFRESH_LISTINGS} listing and {REFRESH_SEARCHES} search writes: "
+                  f"{(time.perf_counter() - started) * 1000:.1f}ms")
+
+            # "first" is a prefix's first lookup in a snapshot (as after every refresh), "repeat" the ones after
+            print(f"   {'prefix':<14}{'first':>10}{'repeat':>10}  top suggestion")
+            for prefix in PREFIXES:
+                first, repeat = [], []
+                for _ in range(LOOKUPS):
+                    index._snapshot._ranked.cache_clear()
+                    for timings in (first, repeat):
+                        started = time.perf_counter()
+                        result = index.suggest(prefix, 8)
+                        timings.append((time.perf_counter() - started) * 1000)
+                top = result[0]['text'] if result else '-'
+                print(f"   {prefix!r:<14}{statistics.median(first):>8.3f}ms"
+                      f"{statistics.median(repeat):>8.3f}ms  {top}")
+            db.session.remove()
+            db.engine.dispose()
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    for size in sizes:
+        run(size)
@@ -8,7 +8,25 @@ class Config:
     """Base configuration class"""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'super-secret-key-change-in-production'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    CACHE_TYPE = 'SimpleCache'
+    # Shared by all workers on the host; SimpleCache would give each worker its own copy
+    CACHE_TYPE = 'app.utils.sqlite_cache.SQLiteCache'
+    CACHE_SQLITE_PATH = os.environ.get('CACHE_SQLITE_PATH')
+    CACHE_THRESHOLD = 50000
+    # In-memory NumPy catalog for the public browse path (see listings/catalog.py)
+    LISTING_CATALOG_ENABLED = os.environ.get('LISTING_CATALOG_ENABLED', '').lower() in ('1', 'true', 'yes')
+    LISTING_CATALOG_REFRESH_INTERVAL = 2.0
+    # In-memory typeahead index for /api/listings/suggest (see listings/suggest.py)
+    LISTING_SUGGEST_ENABLED = os.environ.get('LISTING_SUGGEST_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    LISTING_SUGGEST_REFRESH_INTERVAL = 30.0
+    # Password KDF in werkzeug's "method:params" form; hashes with another one are upgraded at login
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    # Hashing runs in its own processes; past the queue limit sign-ins get 503 (see utils/hashing.py)
+    PASSWORD_HASH_PROCESSES = int(os.environ.get('PASSWORD_HASH_PROCESSES', 2))
+    PASSWORD_HASH_QUEUE_LIMIT = int(os.environ.get('PASSWORD_HASH_QUEUE_LIMIT', 8))
+    # Seconds before a worker sees tokens revoked by another (see utils/revocation.py)
+    TOKEN_REVOCATION_REFRESH_INTERVAL = 2.0
+    # Relationships loaded with the request's current user (utils/util.py get_current_user)
+    CURRENT_USER_EAGER_LOADS = ('roles', 'location')
     
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -30,6 +48,13 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    CACHE_TYPE = 'NullCache'
+    RATELIMIT_ENABLED = False
+    # Tests refresh the suggestion index explicitly instead of from a background thread
+    LISTING_SUGGEST_REFRESH_INTERVAL = None
+    # Cheap hashes, computed inline
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+    PASSWORD_HASH_PROCESSES = 0
 
 # Configuration dictionary
 config = {
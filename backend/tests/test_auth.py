@@ -0,0 +1,136 @@
+import time
+from datetime import datetime, timedelta
+
+from jose import jwt
+from sqlalchemy import select, delete, func
+from werkzeug.security import generate_password_hash
+
+from app.models import db, User, Role, TokenRevocation
+from app.utils.hashing import PasswordHasher, hash_password, verify_password
+from app.utils.identity import Identity
+from app.utils.revocation import BloomFilter, RevocationList
+from app.utils.util import encode_user_token
+
+
+def decode_jti(token):
+    return jwt.get_unverified_claims(token)['jti']
+
+
+def make_user(password_hash):
+    user = User(first_name='Ada', email='ada@rettnar.com', password_hash=password_hash)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def test_login_upgrades_hashes_made_with_another_cost(app, client):
+    user = make_user(generate_password_hash('hunter22', 'pbkdf2:sha256:500'))
+
+    response = client.post('/api/auth/login', json={'email': 'ada@rettnar.com', 'password': 'hunter22'})
+    assert response.status_code == 200
+    db.session.refresh(user)
+    assert user.password_hash.startswith(app.config['PASSWORD_HASH_METHOD'] + '$')
+
+    stored = user.password_hash
+    assert client.post('/api/users/login', json={'email': 'ada@rettnar.com', 'password': 'hunter22'}).status_code == 200
+    db.session.refresh(user)
+    assert user.password_hash == stored
+
+    assert client.post('/api/auth/login', json={'email': 'ada@rettnar.com', 'password': 'wrong'}).status_code == 401
+
+
+def test_logins_are_shed_when_the_hashing_queue_is_full(app, client):
+    make_user(generate_password_hash('hunter22', 'pbkdf2:sha256:1000'))
+    app.extensions['password_hasher'] = PasswordHasher(processes=0, queue_limit=0)
+
+    response = client.post('/api/auth/login', json={'email': 'ada@rettnar.com', 'password': 'hunter22'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+
+def test_hashes_are_computed_in_the_pool(app):
+    app.extensions['password_hasher'] = PasswordHasher(method='pbkdf2:sha256:1000', processes=1, queue_limit=2)
+
+    password_hash = hash_password('hunter22')
+    assert verify_password(password_hash, 'hunter22') == (True, None)
+    assert verify_password(password_hash, 'wrong') == (False, None)
+
+
+def test_logout_revokes_only_the_token_used(app, client):
+    user = make_user('x')
+    token, other_token = encode_user_token(user.user_id), encode_user_token(user.user_id)
+
+    assert client.post('/api/auth/logout', headers={'Authorization': f'Bearer {token}'}).status_code == 200
+
+    response = client.get('/api/users/profile', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 401
+    assert response.get_json()['error'] == 'Token has been revoked'
+    assert client.get('/api/users/profile', headers={'Authorization': f'Bearer {other_token}'}).status_code == 200
+
+    # Another worker picks the revocation up from the table
+    other_worker = RevocationList(refresh_interval=0)
+    assert other_worker.is_revoked(Identity(user.user_id, True, frozenset(), jti=decode_jti(token), issued_at=0))
+    assert not other_worker.is_revoked(Identity(user.user_id, True, frozenset(), jti=decode_jti(other_token), issued_at=0))
+
+
+def test_deactivation_revokes_existing_tokens(app, client):
+    admin = User(first_name='Admin', email='admin@rettnar.com', password_hash='x', roles=[Role(name='admin')])
+    db.session.add(admin)
+    user = make_user('x')
+    admin_headers = {'Authorization': f'Bearer {encode_user_token(admin.user_id)}'}
+    headers = {'Authorization': f'Bearer {encode_user_token(user.user_id)}'}
+
+    client.put(f'/api/users/users/{user.user_id}/deactivate', headers=admin_headers)
+    client.put(f'/api/users/users/{user.user_id}/activate', headers=admin_headers)
+
+    assert client.get('/api/users/profile', headers=headers).status_code == 401
+    assert db.session.execute(select(func.count()).select_from(TokenRevocation)).scalar() == 1
+
+
+def test_user_revocations_cover_every_token_of_their_second(app, monkeypatch):
+    user = make_user('x')
+    monkeypatch.setattr(time, 'time', lambda: 1_900_000_000.7)
+    RevocationList().revoke_user(user.user_id)
+
+    other_worker = RevocationList(refresh_interval=0)
+    # Issued earlier in the second, and (a sign-in right after) later in it
+    assert other_worker.is_revoked(Identity(user.user_id, True, frozenset(), issued_at=1_900_000_000))
+    assert not other_worker.is_revoked(Identity(user.user_id, True, frozenset(), issued_at=1_900_000_001))
+
+
+def test_workers_pick_up_revocations_with_reused_or_late_ids(app):
+    user = make_user('x')
+    expires_at = datetime.utcnow() + timedelta(hours=1)
+
+    def revoke(revocation_id, jti):
+        db.session.add(TokenRevocation(revocation_id=revocation_id, jti=jti, user_id=user.user_id, expires_at=expires_at))
+        db.session.commit()
+
+    def revoked(worker, jti):
+        return worker.is_revoked(Identity(user.user_id, True, frozenset(), jti=jti, issued_at=0))
+
+    worker = RevocationList(refresh_interval=0)
+    revoke(1, 'first')
+    revoke(3, 'third')
+    assert revoked(worker, 'third')
+
+    # Committed after a higher id was already read
+    revoke(2, 'second')
+    assert revoked(worker, 'second')
+
+    # Ids handed out again after the table was emptied (SQLite without AUTOINCREMENT)
+    db.session.execute(delete(TokenRevocation))
+    db.session.commit()
+    revoke(1, 'reused')
+    assert revoked(worker, 'reused')
+    assert not revoked(worker, 'third')
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [f'jti-{i}' for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys)
+    assert sum(f'other-{i}' in bloom for i in range(10_000)) < 300
@@ -0,0 +1,61 @@
+from flask import jsonify
+
+from app.extensions import cache, tagged_cache, add_cache_tags
+from app.utils.sqlite_cache import SQLiteCache
+
+
+def test_entries_are_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    first, second = SQLiteCache(path), SQLiteCache(path)
+
+    first.set('view:/api/listings/1', {'title': 'Drill'})
+    assert second.get('view:/api/listings/1') == {'title': 'Drill'}
+
+    second.delete('view:/api/listings/1')
+    assert first.get('view:/api/listings/1') is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.sqlite3'), threshold=2)
+    cache.set('view:a', 1)
+    cache.set('view:b', 2)
+    cache.set('view:c', 3)
+    cache._connection.execute("UPDATE cache_entries SET accessed = 1 WHERE key = 'view:b'")
+
+    cache.prune()
+
+    assert cache.get_many('view:a', 'view:b', 'view:c') == [1, None, 3]
+
+
+def test_hit_and_miss_counters_per_prefix(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    first, second = SQLiteCache(path), SQLiteCache(path)
+    first.set('tag:listing:1', 1)
+
+    first.get('tag:listing:1')
+    second.get_many('tag:listing:1', 'view:/api/listings/1')
+    first.flush_stats()
+
+    assert second.stats() == {
+        'tag': {'hits': 2, 'misses': 0, 'hit_rate': 1.0},
+        'view': {'hits': 0, 'misses': 1, 'hit_rate': 0.0},
+    }
+
+
+def test_write_during_a_cached_view_leaves_its_entry_stale(app, client):
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    reads = []
+
+    @app.route('/tagged')
+    @tagged_cache.cached(timeout=60)
+    def tagged_view():
+        add_cache_tags('thing:1')
+        reads.append(len(reads))
+        if len(reads) == 1:
+            # A write committing after the read but before the response is stored
+            tagged_cache.bump('thing:1')
+        return jsonify({'reads': len(reads)})
+
+    assert client.get('/tagged').get_json() == {'reads': 1}
+    assert client.get('/tagged').get_json() == {'reads': 2}
+    assert client.get('/tagged').get_json() == {'reads': 2}
@@ -0,0 +1,88 @@
+import pytest
+from sqlalchemy import delete, update
+
+from app.blueprints.listings.caching import listing_tags, invalidate_listing
+from app.blueprints.listings.catalog import init_listing_catalog, current_listing_catalog
+from app.extensions import cache
+from app.models import db, Listing, ListingChange
+from tests.test_listings import listings  # noqa: F401 (fixture)
+
+
+@pytest.fixture
+def catalog_app(app):
+    app.config['LISTING_CATALOG_ENABLED'] = True
+    init_listing_catalog(app)
+    current_listing_catalog().refresh_interval = 0
+    return app
+
+
+def walk(client, url):
+    """Follow next_cursor links to the end, then prev_cursor links back; return the IDs seen"""
+    ids, cursor, direction = [], None, 'next_cursor'
+    while True:
+        data = client.get(url + (f'&cursor={cursor}' if cursor else '')).get_json()
+        ids.append([item['id'] for item in data['items']])
+        cursor = data['pagination'][direction]
+        if not cursor and direction == 'next_cursor':
+            cursor, direction = data['pagination']['prev_cursor'], 'prev_cursor'
+        if not cursor:
+            return ids
+
+
+@pytest.mark.parametrize('url', [
+    '/api/listings/?per_page=7',
+    '/api/listings/?per_page=7&sort=rating&min_price=20',
+    '/api/listings/?per_page=7&sort=newest&max_price=35',
+    '/api/listings/?per_page=7&category_id=1&lat=37.7749&lng=-122.4194&radius=2',
+])
+def test_catalog_matches_sql(app, client, listings, url):
+    expected = walk(client, url)
+
+    app.config['LISTING_CATALOG_ENABLED'] = True
+    init_listing_catalog(app)
+
+    assert walk(client, url) == expected
+
+
+def test_catalog_follows_the_change_feed(catalog_app, client, listings):
+    assert len(client.get('/api/listings/?per_page=100&min_price=45').get_json()['items']) == 5
+
+    listing = db.session.get(Listing, listings[0].listing_id)
+    listing.price = 99
+    db.session.commit()
+
+    ids = [item['id'] for item in client.get('/api/listings/?per_page=100&min_price=45').get_json()['items']]
+    assert ids[0] == str(listings[0].listing_id)
+    assert len(ids) == 6
+
+
+def test_cached_pages_are_built_from_a_caught_up_catalog(app, client, listings):
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    app.config['LISTING_CATALOG_ENABLED'] = True
+    init_listing_catalog(app)
+    current_listing_catalog().refresh_interval = 60
+    assert len(client.get('/api/listings/?per_page=100&min_price=45').get_json()['items']) == 5
+
+    listing = db.session.get(Listing, listings[0].listing_id)
+    listing.price = 99
+    db.session.commit()
+    invalidate_listing(listing_tags(listing))
+
+    assert len(client.get('/api/listings/?per_page=100&min_price=45').get_json()['items']) == 6
+
+
+def test_catalog_rebuilds_when_change_ids_are_reused(catalog_app, client, listings):
+    assert len(client.get('/api/listings/?per_page=100&min_price=45').get_json()['items']) == 5
+    for listing in listings[:3]:
+        listing.price += 1
+    db.session.commit()
+    client.get('/api/listings/?per_page=100')
+
+    # A database from before AUTOINCREMENT: the pruned feed's ids come back
+    db.session.execute(delete(ListingChange))
+    db.session.execute(update(Listing).where(Listing.listing_id == listings[0].listing_id).values(price=99))
+    db.session.add(ListingChange(change_id=1, listing_id=listings[0].listing_id))
+    db.session.commit()
+
+    ids = [item['id'] for item in client.get('/api/listings/?per_page=100&min_price=45').get_json()['items']]
+    assert ids[0] == str(listings[0].listing_id)
@@ -0,0 +1,106 @@
+import json
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.models import db, Base, User, Role, Category, Subcategory, Location, Listing, Booking, BookingStatusEnum
+from app.utils.export import EXPORT_WATERMARK_LAG
+from app.utils.util import encode_user_token
+
+
+@pytest.fixture
+def admin_headers(app):
+    admin = User(first_name='Admin', email='admin@rettnar.com', password_hash='x')
+    admin.roles = [Role(name='admin')]
+    db.session.add(admin)
+    db.session.commit()
+    return {'Authorization': f'Bearer {encode_user_token(admin.user_id)}'}
+
+
+@pytest.fixture
+def records(app, admin_headers):
+    category = Category(name='Tools')
+    db.session.add(category)
+    db.session.flush()
+    subcategory = Subcategory(name='Drills', category_id=category.category_id)
+    owner = User(first_name='Owner', email='owner@rettnar.com', password_hash='secret-hash')
+    location = Location(address='1 Market St', city='San Francisco', state='CA', zip_code='94105', country='USA')
+    db.session.add_all([subcategory, owner, location])
+    db.session.flush()
+
+    listings = [
+        Listing(title=f'Drill {i}', description='', price=10 + i,
+                subcategory_id=subcategory.subcategory_id, owner_id=owner.user_id,
+                location_id=location.location_id)
+        for i in range(5)
+    ]
+    db.session.add_all(listings)
+    db.session.flush()
+    db.session.add(Booking(
+        start_date=datetime(2025, 1, 1), end_date=datetime(2025, 1, 3),
+        user_id=owner.user_id, listing_id=listings[0].listing_id
+    ))
+    db.session.commit()
+    return listings
+
+
+def ndjson(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_exports_stream_every_row_as_ndjson(client, admin_headers, records):
+    response = client.get('/api/listings/admin/export', headers=admin_headers)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert [row['title'] for row in ndjson(response)] == [f'Drill {i}' for i in range(5)]
+
+    users = ndjson(client.get('/api/users/users/export', headers=admin_headers))
+    assert len(users) == 2
+    assert all('password_hash' not in row for row in users)
+
+    bookings = ndjson(client.get('/api/bookings/export', headers=admin_headers))
+    assert bookings[0]['status'] == BookingStatusEnum.PENDING.value
+
+
+def test_export_updated_since_returns_only_changed_rows(client, admin_headers, records):
+    for listing in records:
+        listing.updated_at = datetime.utcnow() - timedelta(hours=1)
+    db.session.commit()
+    first = client.get('/api/listings/admin/export', headers=admin_headers)
+    watermark = datetime.fromisoformat(first.headers['X-Export-Watermark'])
+
+    changed, in_flight = records[2], records[3]
+    changed.price = 99
+    changed.updated_at = watermark + EXPORT_WATERMARK_LAG + timedelta(seconds=1)
+    # Flushed just before the first export started, committed after it read
+    in_flight.updated_at = watermark + EXPORT_WATERMARK_LAG - timedelta(seconds=1)
+    db.session.commit()
+
+    response = client.get(
+        '/api/listings/admin/export', headers=admin_headers,
+        query_string={'updated_since': watermark.isoformat() + 'Z'}
+    )
+    assert [row['listing_id'] for row in ndjson(response)] == [changed.listing_id, in_flight.listing_id]
+
+
+def test_export_rejects_bad_updated_since(client, admin_headers):
+    response = client.get('/api/bookings/export?updated_since=yesterday', headers=admin_headers)
+    assert response.status_code == 400
+
+
+def test_existing_databases_gain_indexed_updated_at_columns(tmp_path):
+    path = tmp_path / 'rettnar_dev.db'
+    shutil.copy(Path(__file__).parent.parent / 'rettnar_dev.db', path)
+    engine = create_engine(f'sqlite:///{path}')
+
+    Base.metadata.create_all(engine)
+
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT COUNT(*) FROM listings WHERE updated_at = created_at")).scalar() == 3
+        indexes = {
+            row[0] for row in connection.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'")
+        }
+    assert {'ix_listings_updated_at', 'ix_bookings_updated_at', 'ix_users_updated_at'} <= indexes
@@ -0,0 +1,81 @@
+import math
+import random
+
+from sqlalchemy import create_engine, select, text
+
+from app.models import db, Base, Location
+from app.utils.geo import (
+    EARTH_RADIUS_KM, bounding_box, covering_cells, geohash_encode, haversine_km, radius_prefilter
+)
+
+
+def point_at(lat, lng, distance_km, bearing_degrees):
+    """Destination point on the sphere haversine_km measures on"""
+    delta = distance_km / EARTH_RADIUS_KM
+    theta, phi1, lambda1 = math.radians(bearing_degrees), math.radians(lat), math.radians(lng)
+    phi2 = math.asin(math.sin(phi1) * math.cos(delta) + math.cos(phi1) * math.sin(delta) * math.cos(theta))
+    lambda2 = lambda1 + math.atan2(
+        math.sin(theta) * math.sin(delta) * math.cos(phi1), math.cos(delta) - math.sin(phi1) * math.sin(phi2)
+    )
+    return math.degrees(phi2), math.degrees(lambda2)
+
+
+def test_bounding_box_contains_points_at_the_radius():
+    for bearing in range(0, 360, 15):
+        lat, lng = point_at(40.0, -74.0, 4.999, bearing)
+        min_lat, max_lat, min_lng, max_lng = bounding_box(40.0, -74.0, 5)
+        assert min_lat <= lat <= max_lat
+        assert min_lng <= lng <= max_lng
+
+
+def test_covering_cells_contain_points_within_the_radius():
+    rng = random.Random(7)
+    for _ in range(500):
+        lat, lng = rng.uniform(-70, 70), rng.uniform(-170, 170)
+        radius = rng.choice([0.5, 2, 5, 25])
+        cells = covering_cells(lat, lng, radius)
+        inside = point_at(lat, lng, radius * rng.random(), rng.uniform(0, 360))
+        assert any(geohash_encode(*inside).startswith(cell) for cell in cells)
+
+
+def test_radius_prefilter_keeps_every_location_within_the_radius(app):
+    rng = random.Random(11)
+    center = (40.0, -74.0)
+    points = [point_at(*center, 4.995, 0.0)]  # Due north, right at the edge
+    points += [point_at(*center, rng.uniform(0, 6), rng.uniform(0, 360)) for _ in range(300)]
+    db.session.add_all([
+        Location(address='', city='', state='', zip_code='', country='', latitude=lat, longitude=lng)
+        for lat, lng in points
+    ])
+    db.session.commit()
+
+    selected = set(db.session.execute(
+        select(Location.location_id).where(radius_prefilter(Location, *center, 5))
+    ).scalars())
+
+    within = {
+        location.location_id for location in db.session.execute(select(Location)).scalars()
+        if haversine_km(*center, location.latitude, location.longitude) <= 5
+    }
+    assert within <= selected
+    assert 1 in selected
+
+
+def test_existing_locations_get_a_geohash_on_upgrade(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE locations (location_id INTEGER PRIMARY KEY, address VARCHAR(100), city VARCHAR(50), "
+            "state VARCHAR(50), zip_code VARCHAR(20), country VARCHAR(50), latitude FLOAT, longitude FLOAT)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO locations VALUES (1, '1 Main St', 'Austin', 'TX', '73301', 'USA', 30.2672, -97.7431)"
+        )
+
+    Base.metadata.create_all(engine)
+
+    with engine.connect() as connection:
+        geohash = connection.execute(text("SELECT geohash FROM locations WHERE location_id = 1")).scalar()
+        indexes = {row[1] for row in connection.exec_driver_sql("PRAGMA index_list(locations)")}
+    assert geohash == geohash_encode(30.2672, -97.7431)
+    assert 'ix_locations_geohash' in indexes
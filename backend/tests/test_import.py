@@ -0,0 +1,107 @@
+import io
+
+import pytest
+from sqlalchemy import select, func
+
+from app.models import db, User, Category, Subcategory, Amenity, Listing, ListingFeature, listing_amenities
+from app.utils.util import encode_user_token
+
+
+@pytest.fixture
+def seller(app):
+    category = Category(name='Tools')
+    db.session.add(category)
+    db.session.flush()
+    subcategory = Subcategory(name='Drills', category_id=category.category_id)
+    amenity = Amenity(name='Delivery')
+    user = User(first_name='Seller', email='seller@rettnar.com', password_hash='x')
+    db.session.add_all([subcategory, amenity, user])
+    db.session.commit()
+    return {
+        'headers': {'Authorization': f'Bearer {encode_user_token(user.user_id)}'},
+        'user_id': user.user_id,
+        'subcategory_id': subcategory.subcategory_id,
+        'amenity_id': amenity.amenity_id,
+    }
+
+
+def listing_row(seller, i, **overrides):
+    row = {
+        'title': f'Drill {i}', 'price': 10 + i, 'subcategory_id': seller['subcategory_id'],
+        'address': f'{i} Market St', 'city': 'San Francisco', 'state': 'CA', 'country': 'USA',
+        'zip_code': '94105', 'latitude': 37.77, 'longitude': -122.41,
+    }
+    row.update(overrides)
+    return row
+
+
+def test_json_import_creates_valid_rows_and_reports_errors(client, seller):
+    rows = [listing_row(seller, i) for i in range(6)]
+    rows[1] = listing_row(seller, 1, price=-5)
+    rows[3] = listing_row(seller, 3, subcategory_id=999)
+    rows[4]['amenity_ids'] = [seller['amenity_id']]
+    rows[4]['features'] = [{'key': 'voltage', 'value': '18V'}]
+
+    response = client.post('/api/listings/bulk', json=rows, headers=seller['headers'])
+    data = response.get_json()
+
+    assert response.status_code == 201
+    assert data['created'] == 4
+    assert [error['row'] for error in data['errors']] == [1, 3]
+    assert 'price' in data['errors'][0]['errors']
+
+    listings = db.session.execute(
+        select(Listing).where(Listing.listing_id.in_(data['listing_ids'])).order_by(Listing.listing_id)
+    ).scalars().all()
+    assert [listing.title for listing in listings] == ['Drill 0', 'Drill 2', 'Drill 4', 'Drill 5']
+    assert all(listing.owner_id == seller['user_id'] and listing.location.geohash for listing in listings)
+    assert db.session.execute(select(func.count()).select_from(listing_amenities)).scalar() == 1
+    assert db.session.execute(select(ListingFeature.value)).scalar() == '18V'
+
+
+def test_csv_import(client, seller):
+    csv_body = (
+        'title,price,subcategory_id,address,city,state,country,zip_code,amenity_ids,features\n'
+        f"Saw,12,{seller['subcategory_id']},1 Main St,Oakland,CA,USA,94607,{seller['amenity_id']},blade=10in;cordless=yes\n"
+        f"Sander,abc,{seller['subcategory_id']},2 Main St,Oakland,CA,USA,94607,,\n"
+    )
+    response = client.post(
+        '/api/listings/bulk', headers=seller['headers'],
+        data={'file': (io.BytesIO(csv_body.encode()), 'listings.csv')}, content_type='multipart/form-data'
+    )
+    data = response.get_json()
+
+    assert data['created'] == 1
+    assert data['errors'] == [{'row': 1, 'errors': {'price': ['Not a valid integer.']}}]
+    assert db.session.execute(select(func.count()).select_from(ListingFeature)).scalar() == 2
+
+    raw = client.post('/api/listings/bulk', headers={**seller['headers'], 'Content-Type': 'text/csv'}, data=csv_body)
+    assert raw.get_json()['created'] == 1
+
+
+def test_import_rejects_non_list_body(client, seller):
+    assert client.post('/api/listings/bulk', json={'title': 'x'}, headers=seller['headers']).status_code == 400
+
+
+def test_unknown_amenities_are_row_errors(client, seller):
+    rows = [listing_row(seller, 0, amenity_ids=[seller['amenity_id'], 998, 999]), listing_row(seller, 1)]
+
+    data = client.post('/api/listings/bulk', json=rows, headers=seller['headers']).get_json()
+
+    assert data['created'] == 1
+    assert data['errors'] == [{'row': 0, 'errors': {'amenity_ids': ['Amenity not found: 998, 999']}}]
+
+
+def test_import_without_executemany_returning(client, seller, monkeypatch):
+    # e.g. MySQL, which can't return the IDs of a multi-row insert
+    monkeypatch.setattr(db.engine.dialect, 'insert_executemany_returning_sort_by_parameter_order', False)
+    rows = [listing_row(seller, i, amenity_ids=[seller['amenity_id']]) for i in range(3)]
+
+    data = client.post('/api/listings/bulk', json=rows, headers=seller['headers']).get_json()
+
+    assert data['created'] == 3 and data['errors'] == []
+    listings = [db.session.get(Listing, listing_id) for listing_id in data['listing_ids']]
+    assert [(listing.title, listing.location.address) for listing in listings] == [
+        ('Drill 0', '0 Market St'), ('Drill 1', '1 Market St'), ('Drill 2', '2 Market St')
+    ]
+    assert db.session.execute(select(func.count()).select_from(listing_amenities)).scalar() == 3
@@ -0,0 +1,279 @@
+import json
+
+import pytest
+from sqlalchemy import select
+
+from app.extensions import cache
+
+from app.models import (
+    db, User, Category, Subcategory, Location, Listing, Image, Review, Amenity, ListingFeature
+)
+from app.utils.util import encode_user_token
+from app.blueprints.auth.schemas import AuthUserSchema, auth_user_serializer
+from app.blueprints.listings.frontend_schemas import FrontendListingSchema, frontend_listing_serializer
+from app.blueprints.listings.schemas import ListingSchema, listings_serializer, LISTING_SCHEMA_LOAD_OPTIONS
+from app.blueprints.listings.query import ListingQuery, ListingFilters
+
+# Queries allowed for one page of listings, independent of page size
+FRONTEND_LISTING_PAGE_QUERY_BUDGET = 3
+LISTING_SCHEMA_PAGE_QUERY_BUDGET = 12
+
+
+@pytest.fixture
+def listings(app):
+    category = Category(name='Tools')
+    db.session.add(category)
+    db.session.flush()
+    subcategory = Subcategory(name='Drills', category_id=category.category_id)
+    amenity = Amenity(name='Delivery')
+    db.session.add_all([subcategory, amenity])
+    db.session.flush()
+
+    created = []
+    for i in range(40):
+        owner = User(first_name=f'Owner{i}', email=f'owner{i}@rettnar.com', password_hash='x')
+        location = Location(
+            address=f'{i} Market St', city='San Francisco', state='CA', zip_code='94105',
+            country='USA', latitude=37.7749 + i * 0.001, longitude=-122.4194
+        )
+        db.session.add_all([owner, location])
+        db.session.flush()
+
+        listing = Listing(
+            title=f'Cordless drill {i}', description='Power tool', price=10 + i,
+            subcategory_id=subcategory.subcategory_id, owner_id=owner.user_id,
+            location_id=location.location_id
+        )
+        listing.amenities = [amenity]
+        db.session.add(listing)
+        db.session.flush()
+
+        db.session.add_all([
+            Image(listing_id=listing.listing_id, url=f'https://img.rettnar.com/{i}.jpg', is_primary=True),
+            Review(listing_id=listing.listing_id, user_id=owner.user_id, rating=5),
+            ListingFeature(listing_id=listing.listing_id, key='voltage', value='18V'),
+        ])
+        created.append(listing)
+
+    db.session.commit()
+    db.session.expire_all()
+    return created
+
+
+@pytest.mark.parametrize('url, budget', [
+    ('/api/listings/?per_page=40', FRONTEND_LISTING_PAGE_QUERY_BUDGET),
+    ('/api/listings/?per_page=40&lat=37.7749&lng=-122.4194&radius=50', FRONTEND_LISTING_PAGE_QUERY_BUDGET),
+    ('/api/listings/?per_page=40&search=drill', FRONTEND_LISTING_PAGE_QUERY_BUDGET),
+    ('/api/listings/nearby?per_page=40&lat=37.7749&lng=-122.4194&radius=50', LISTING_SCHEMA_PAGE_QUERY_BUDGET),
+    ('/api/listings/user/1?per_page=40', LISTING_SCHEMA_PAGE_QUERY_BUDGET),
+])
+def test_listing_page_stays_within_query_budget(client, listings, count_queries, url, budget):
+    with count_queries() as statements:
+        response = client.get(url)
+
+    assert response.status_code == 200
+    assert len(statements) <= budget, '\n'.join(statements)
+
+
+def test_listing_images_are_returned(client, listings):
+    response = client.get(f'/api/listings/{listings[0].listing_id}')
+
+    assert response.status_code == 200
+    assert response.get_json()['images'] == ['https://img.rettnar.com/0.jpg']
+
+
+def test_listing_write_invalidates_cached_responses(app, client, listings):
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    listing_id = listings[0].listing_id
+    token = encode_user_token(listings[0].owner_id)
+
+    assert client.get(f'/api/listings/{listing_id}').get_json()['images'] == ['https://img.rettnar.com/0.jpg']
+
+    response = client.post(
+        f'/api/listing-images/listing/{listing_id}/images',
+        json={'url': 'https://img.rettnar.com/0b.jpg'},
+        headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == 201
+
+    assert client.get(f'/api/listings/{listing_id}').get_json()['images'] == [
+        'https://img.rettnar.com/0.jpg', 'https://img.rettnar.com/0b.jpg'
+    ]
+
+
+def test_conditional_get_is_answered_from_cached_versions(app, client, listings, count_queries):
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    listing_id = listings[0].listing_id
+    first = client.get(f'/api/listings/{listing_id}')
+    etag = first.headers['ETag']
+
+    with count_queries() as statements:
+        response = client.get(f'/api/listings/{listing_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert statements == []
+
+    client.post(
+        f'/api/listing-images/listing/{listing_id}/images', json={'url': 'https://img.rettnar.com/0b.jpg'},
+        headers={'Authorization': f'Bearer {encode_user_token(listings[0].owner_id)}'}
+    )
+    changed = client.get(f'/api/listings/{listing_id}', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+def test_facets_are_counted_in_one_query(client, listings, count_queries):
+    with count_queries() as statements:
+        response = client.get('/api/listings/?per_page=5&facets=true&max_price=29')
+
+    facets = response.get_json()['facets']
+    assert len(statements) <= FRONTEND_LISTING_PAGE_QUERY_BUDGET + 1
+    assert facets['total'] == 20
+    assert facets['categories'] == [{'id': '1', 'name': 'Tools', 'count': 20}]
+    assert facets['subcategories'] == [{'id': '1', 'name': 'Drills', 'count': 20}]
+    assert facets['cities'] == [{'name': 'San Francisco', 'count': 20}]
+    assert facets['amenities'] == [{'id': '1', 'name': 'Delivery', 'count': 20}]
+    assert [bucket['count'] for bucket in facets['price'][:3]] == [15, 5, 0]
+    assert facets['approximate'] is False
+
+
+def test_batch_returns_listings_in_requested_order(client, listings, count_queries):
+    ids = [listings[5].listing_id, listings[0].listing_id, 9999, listings[12].listing_id]
+
+    with count_queries() as statements:
+        response = client.get(f'/api/listings/batch?ids={",".join(map(str, ids))}')
+
+    data = response.get_json()
+    assert response.status_code == 200
+    assert [item['id'] for item in data['items']] == [str(ids[0]), str(ids[1]), str(ids[3])]
+    assert data['missing'] == [9999]
+    assert len(statements) <= FRONTEND_LISTING_PAGE_QUERY_BUDGET
+
+
+def test_batch_reuses_cached_listing_entries(app, client, listings, count_queries):
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    first, second = listings[0].listing_id, listings[1].listing_id
+    single = client.get(f'/api/listings/{first}').get_json()
+
+    client.get(f'/api/listings/batch?ids={first},{second}')
+    with count_queries() as statements:
+        data = client.get(f'/api/listings/batch?ids={second},{first}').get_json()
+
+    assert statements == []
+    assert data['items'][1] == single
+    assert client.get(f'/api/listings/{second}').get_json() == data['items'][0]
+
+
+def test_equivalent_field_lists_share_cache_entries(app, client, listings, count_queries):
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    first, second = listings[0].listing_id, listings[1].listing_id
+    client.get(f'/api/listings/{first}?fields=title, id')
+    client.get(f'/api/listings/batch?ids={second}&fields=id,title,id')
+
+    with count_queries() as statements:
+        single = client.get(f'/api/listings/{second}?fields=id,title').get_json()
+        batch = client.get(f'/api/listings/batch?ids={first},{second}&fields=title,id').get_json()
+
+    assert statements == []
+    assert batch['items'] == [{'id': str(first), 'title': listings[0].title}, single]
+
+
+def test_batch_rejects_invalid_ids(client):
+    assert client.get('/api/listings/batch?ids=1,abc').status_code == 400
+    assert client.get('/api/listings/batch').status_code == 400
+
+
+@pytest.mark.parametrize('url, key', [
+    ('/api/listings/?lat=37.7749&lng=-122.4194&radius=2', 'items'),
+    ('/api/listings/nearby?lat=37.7749&lng=-122.4194&radius=2', 'listings'),
+])
+def test_radius_results_carry_distances_closest_first(client, listings, url, key):
+    items = client.get(url).get_json()[key]
+
+    distances = [item['distance_km'] for item in items]
+    assert len(items) == 18
+    assert distances == sorted(distances)
+    assert distances[0] == 0 and distances[-1] <= 2
+
+
+def test_frontend_location_carries_distance(client, listings):
+    items = client.get('/api/listings/?lat=37.7749&lng=-122.4194&radius=2').get_json()['items']
+
+    assert [item['location']['distance'] for item in items] == [item['distance_km'] for item in items]
+
+
+@pytest.mark.parametrize('schema, serializer', [
+    (FrontendListingSchema(many=True), frontend_listing_serializer),
+    (ListingSchema(many=True), listings_serializer),
+])
+def test_compiled_serializers_match_marshmallow(listings, schema, serializer):
+    rows = db.session.execute(
+        select(Listing).options(*LISTING_SCHEMA_LOAD_OPTIONS).order_by(Listing.listing_id)
+    ).unique().scalars().all()
+    rows[0].distance_km = 1.25
+
+    assert json.dumps(serializer.dump(rows, many=True)) == json.dumps(schema.dump(rows))
+    assert json.dumps(auth_user_serializer.dump(rows[0].owner)) == json.dumps(AuthUserSchema().dump(rows[0].owner))
+
+
+def test_sparse_fieldset_limits_output_and_projection(client, listings, count_queries):
+    with count_queries() as statements:
+        items = client.get('/api/listings/?per_page=40&fields=id,title,price,images,location').get_json()['items']
+
+    assert len(items) == 40
+    assert set(items[0]) == {'id', 'title', 'price', 'images', 'location'}
+    assert items[0]['images'] == ['https://img.rettnar.com/0.jpg']
+    assert set(items[0]['location']) == {'lat', 'lng'}
+    assert len(statements) <= FRONTEND_LISTING_PAGE_QUERY_BUDGET
+    assert not any('listings.description' in statement or 'users.' in statement for statement in statements)
+
+    single = client.get(f'/api/listings/{listings[1].listing_id}?fields=title,owner').get_json()
+    assert single == {'title': 'Cordless drill 1', 'owner': client.get(f'/api/listings/{listings[1].listing_id}').get_json()['owner']}
+
+    batch = client.get(f'/api/listings/batch?ids={listings[2].listing_id}&fields=id').get_json()
+    assert batch['items'] == [{'id': str(listings[2].listing_id)}]
+
+
+def test_unknown_fields_are_rejected(client, listings):
+    response = client.get('/api/listings/?fields=id,password_hash')
+
+    assert response.status_code == 400
+    assert 'password_hash' in response.get_json()['error']
+
+
+def test_search_pages_reuse_the_ranked_result_set(app, client, listings, count_queries):
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    first = client.get('/api/listings/?search=drill&per_page=10').get_json()
+
+    with count_queries() as statements:
+        second = client.get(f"/api/listings/?search=Drill &per_page=10&cursor={first['pagination']['next_cursor']}")
+    assert second.status_code == 200
+    assert not any('listings_fts' in statement for statement in statements)
+    assert [item['title'] for item in second.get_json()['items']] == [f'Cordless drill {i}' for i in range(10, 20)]
+
+    response = client.post(
+        '/api/listings/',
+        headers={'Authorization': f'Bearer {encode_user_token(listings[0].owner_id)}'},
+        json={
+            'title': 'Hammer drill', 'price': 30, 'subcategory_id': listings[0].subcategory_id,
+            'address': '1 Main St', 'city': 'Oakland', 'state': 'CA', 'country': 'USA', 'zip_code': '94607'
+        }
+    )
+    assert response.status_code == 201
+
+    with count_queries() as statements:
+        client.get(f"/api/listings/?search=drill&per_page=10&cursor={first['pagination']['next_cursor']}")
+    assert any('listings_fts' in statement for statement in statements)
+
+
+def test_address_filters_share_one_location_join(client, listings):
+    response = client.get('/api/listings/?city=francisco&state=ca&zip_code=941&search=drill&per_page=50')
+    assert response.status_code == 200
+    assert len(response.get_json()['items']) == 40
+
+    for filters in (ListingFilters(city='francisco', state='ca', zip_code='941'), ListingFilters(city='oakland')):
+        listing_query = ListingQuery(filters)
+        assert str(listing_query.select()).count('JOIN locations') == 1
+        matching = db.session.execute(listing_query.ids()).scalars().all()
+        assert db.session.execute(listing_query.count()).scalar() == len(matching)
+        assert db.session.execute(listing_query.exists()).scalar() == bool(matching)
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app.models import db, User, Message, Conversation, ConversationParticipant, rebuild_conversations
+from app.utils.util import encode_user_token
+
+
+def make_users(*names):
+    users = [User(first_name=name, email=f'{name.lower()}@rettnar.com', password_hash='x') for name in names]
+    db.session.add_all(users)
+    db.session.commit()
+    return users
+
+
+def auth(user):
+    return {'Authorization': f'Bearer {encode_user_token(user.user_id)}'}
+
+
+def conversation_path(a, b):
+    low, high = sorted([a.user_id, b.user_id])
+    return f'/api/messages/conv_{low}_{high}'
+
+
+def test_inbox_is_one_query_ordered_by_last_activity(client, count_queries):
+    ada, grace, alan = make_users('Ada', 'Grace', 'Alan')
+    client.post(conversation_path(ada, grace), json={'text': 'Is the drill free?'}, headers=auth(grace))
+    client.post(conversation_path(ada, alan), json={'text': 'Hi'}, headers=auth(alan))
+    client.post(conversation_path(ada, alan), json={'text': 'Still there?'}, headers=auth(alan))
+    client.post(conversation_path(ada, grace), json={'text': 'Yes'}, headers=auth(ada))
+    headers = auth(ada)
+    client.get('/api/users/profile', headers=headers)
+
+    with count_queries() as statements:
+        response = client.get('/api/messages/conversations', headers=headers)
+    assert len(statements) == 1
+    conversations = response.get_json()['conversations']
+    assert [c['participant']['id'] for c in conversations] == [str(grace.user_id), str(alan.user_id)]
+    assert [c['lastMessage']['text'] for c in conversations] == ['Yes', 'Still there?']
+    assert [c['unreadCount'] for c in conversations] == [1, 2]
+
+    page = client.get('/api/messages/conversations?per_page=1', headers=auth(ada)).get_json()
+    assert [c['participant']['id'] for c in page['conversations']] == [str(grace.user_id)]
+    cursor = page['pagination']['next_cursor']
+    page = client.get(f'/api/messages/conversations?per_page=1&cursor={cursor}', headers=auth(ada)).get_json()
+    assert [c['participant']['id'] for c in page['conversations']] == [str(alan.user_id)]
+    assert not page['pagination']['has_next']
+
+    client.get(conversation_path(ada, alan), headers=auth(ada))
+    conversations = client.get('/api/messages/conversations', headers=auth(ada)).get_json()['conversations']
+    assert [c['unreadCount'] for c in conversations] == [1, 0]
+
+
+def test_conversations_are_built_from_existing_messages(app):
+    ada, grace = make_users('Ada', 'Grace')
+    sent_at = datetime(2026, 1, 1)
+    db.session.add_all([
+        Message(content='First', sender_id=ada.user_id, receiver_id=grace.user_id, sent_at=sent_at),
+        Message(content='Second', sender_id=grace.user_id, receiver_id=ada.user_id, sent_at=sent_at + timedelta(minutes=1)),
+    ])
+    db.session.commit()
+    db.session.execute(ConversationParticipant.__table__.delete())
+    db.session.execute(Conversation.__table__.delete())
+
+    rebuild_conversations(ConversationParticipant.__table__, db.session.connection())
+
+    conversation = db.session.execute(db.select(Conversation)).scalar_one()
+    assert conversation.last_message.content == 'Second'
+    assert {(p.user_id, p.other_user_id, p.unread_count) for p in conversation.participants} == {
+        (ada.user_id, grace.user_id, 0), (grace.user_id, ada.user_id, 0)
+    }
+
+
+def test_first_messages_racing_for_a_pair_share_one_conversation(client):
+    ada, grace = make_users('Ada', 'Grace')
+
+    raced = []
+
+    def other_writer_wins(conn, cursor, statement, parameters, context, executemany):
+        # Another request creates the pair's conversation right after this one found none
+        if statement.startswith('SELECT conversations.conversation_id') and not raced:
+            raced.append(statement)
+            raw = cursor.connection
+            raw.execute('INSERT INTO conversations (user_low_id, user_high_id) VALUES (?, ?)',
+                        (ada.user_id, grace.user_id))
+            raw.execute('INSERT INTO conversation_participants (conversation_id, user_id, other_user_id) '
+                        'SELECT conversation_id, ?, ? FROM conversations UNION ALL '
+                        'SELECT conversation_id, ?, ? FROM conversations',
+                        (ada.user_id, grace.user_id, grace.user_id, ada.user_id))
+
+    event.listen(db.engine, 'after_cursor_execute', other_writer_wins)
+    try:
+        response = client.post(conversation_path(ada, grace), json={'text': 'Is the drill free?'}, headers=auth(grace))
+    finally:
+        event.remove(db.engine, 'after_cursor_execute', other_writer_wins)
+    assert raced and response.status_code == 201
+
+    conversation = db.session.execute(db.select(Conversation)).scalar_one()
+    assert conversation.last_message.content == 'Is the drill free?'
+    assert {(p.user_id, p.unread_count) for p in conversation.participants} == {(ada.user_id, 1), (grace.user_id, 0)}
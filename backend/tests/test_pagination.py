@@ -0,0 +1,101 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select, desc
+
+from app.models import db, Location
+from app.utils.pagination import (
+    PageRequest, InvalidCursor, encode_cursor, decode_cursor, keyset_paginate, slice_paginate
+)
+
+CITIES = ['Austin', 'Boston', 'Austin', 'Chicago', 'Boston', 'Austin', 'Denver', 'Boston', 'Austin', 'Chicago', 'Austin']
+
+
+@pytest.fixture
+def locations(app):
+    locations = [
+        Location(address=f'{i} Main St', city=city, state='', zip_code='', country='USA')
+        for i, city in enumerate(CITIES)
+    ]
+    db.session.add_all(locations)
+    db.session.commit()
+    return locations
+
+
+def page_request(per_page=3, cursor=None, page=None, include_total=False):
+    return PageRequest(per_page, cursor, page, include_total)
+
+
+# City repeats, so the ID breaks ties
+ORDER_BY = [desc(Location.city), Location.location_id]
+
+
+def expected_order(locations):
+    by_id = sorted(locations, key=lambda location: location.location_id)
+    return [location.location_id for location in sorted(by_id, key=lambda location: location.city, reverse=True)]
+
+
+def test_cursors_walk_ties_forward_and_back(locations):
+    query = select(Location)
+    pages, info = [], {'next_cursor': None}
+    while True:
+        items, info = keyset_paginate(query, ORDER_BY, page_request(cursor=info['next_cursor']))
+        pages.append([location.location_id for location in items])
+        assert info['has_prev'] == (len(pages) > 1)
+        if not info['has_next']:
+            break
+    assert [location_id for page in pages for location_id in page] == expected_order(locations)
+    assert [len(page) for page in pages] == [3, 3, 3, 2]
+    assert info['next_cursor'] is None
+
+    for page in reversed(pages[:-1]):
+        items, info = keyset_paginate(query, ORDER_BY, page_request(cursor=info['prev_cursor']))
+        assert [location.location_id for location in items] == page
+        assert info['has_next']
+    assert not info['has_prev'] and info['prev_cursor'] is None
+
+
+def test_legacy_page_and_total(locations):
+    items, info = keyset_paginate(select(Location), ORDER_BY, page_request(page=2, include_total=True))
+    assert [location.location_id for location in items] == expected_order(locations)[3:6]
+    assert info['page'] == 2 and info['has_prev'] and info['has_next']
+    assert (info['total'], info['total_pages']) == (11, 4)
+
+    _, info = keyset_paginate(select(Location), ORDER_BY, page_request())
+    assert 'total' not in info and 'page' not in info
+
+
+@pytest.mark.parametrize('cursor', [
+    'not a cursor!', encode_cursor([1, 2]), encode_cursor({'k': ['Austin']}), encode_cursor({'o': 3})
+])
+def test_malformed_keyset_cursors_are_rejected(locations, cursor):
+    with pytest.raises(InvalidCursor):
+        keyset_paginate(select(Location), ORDER_BY, page_request(cursor=cursor))
+
+
+def test_cursor_payloads_round_trip():
+    payload = {'k': [datetime(2026, 3, 1, 9, 30, 15, 250), 'Austin', 7], 'b': 1}
+    token = encode_cursor(payload)
+    assert '=' not in token
+    assert decode_cursor(token) == payload
+
+
+def test_slice_pages():
+    ids = list(range(100, 111))
+
+    page_ids, info = slice_paginate(ids, page_request(include_total=True))
+    assert page_ids == [100, 101, 102]
+    assert not info['has_prev'] and (info['total'], info['total_pages']) == (11, 4)
+
+    page_ids, info = slice_paginate(ids, page_request(cursor=info['next_cursor']))
+    assert page_ids == [103, 104, 105] and 'total' not in info
+    page_ids, _ = slice_paginate(ids, page_request(cursor=info['prev_cursor']))
+    assert page_ids == [100, 101, 102]
+
+    page_ids, info = slice_paginate(ids, page_request(page=4))
+    assert page_ids == [109, 110]
+    assert info['page'] == 4 and not info['has_next'] and info['next_cursor'] is None
+
+    for cursor in ('%%%', encode_cursor({'o': -3}), encode_cursor({'o': '3'})):
+        with pytest.raises(InvalidCursor):
+            slice_paginate(ids, page_request(cursor=cursor))
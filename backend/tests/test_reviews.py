@@ -0,0 +1,73 @@
+import shutil
+import sqlite3
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+
+from app.models import db, Base, User, Category, Subcategory, Location, Listing, Review
+
+
+def make_listing(owner):
+    category = Category(name='Cameras')
+    db.session.add(category)
+    db.session.flush()
+    subcategory = Subcategory(name='Mirrorless', category_id=category.category_id)
+    location = Location(address='1 Main St', city='Austin', state='TX', zip_code='73301', country='USA')
+    db.session.add_all([subcategory, location])
+    db.session.flush()
+    listing = Listing(
+        title='Camera', description='Mirrorless body', price=50, subcategory_id=subcategory.subcategory_id,
+        owner_id=owner.user_id, location_id=location.location_id
+    )
+    db.session.add(listing)
+    db.session.commit()
+    return listing
+
+
+def test_review_writes_maintain_listing_and_owner_aggregates(app):
+    owner = User(first_name='Owner', email='owner@rettnar.com', password_hash='x')
+    reviewer = User(first_name='Reviewer', email='reviewer@rettnar.com', password_hash='x')
+    db.session.add_all([owner, reviewer])
+    db.session.commit()
+    listing = make_listing(owner)
+
+    first = Review(listing_id=listing.listing_id, user_id=reviewer.user_id, rating=5)
+    second = Review(listing_id=listing.listing_id, user_id=reviewer.user_id, rating=2)
+    db.session.add_all([first, second])
+    db.session.commit()
+
+    assert (listing.rating_sum, listing.rating_count, listing.rating_avg) == (7, 2, 3.5)
+    assert (owner.owner_rating_sum, owner.owner_rating_count, owner.owner_rating_avg) == (7, 2, 3.5)
+
+    second.rating = 4
+    db.session.commit()
+    assert (listing.rating_count, listing.rating_avg) == (2, 4.5)
+
+    db.session.delete(first)
+    db.session.delete(second)
+    db.session.commit()
+    assert (listing.rating_sum, listing.rating_count, listing.rating_avg) == (0, 0, 0.0)
+    assert owner.owner_rating_avg == 0.0
+
+
+def test_aggregates_are_backfilled_when_an_existing_database_is_upgraded(tmp_path):
+    path = tmp_path / 'rettnar_dev.db'
+    shutil.copy(Path(__file__).parent.parent / 'rettnar_dev.db', path)
+    with sqlite3.connect(path) as connection:
+        connection.executemany(
+            "INSERT INTO reviews (user_id, listing_id, rating, comment, created_at) VALUES (?, ?, ?, '', '2025-01-01')",
+            [(1, 1, 5), (2, 1, 2), (1, 2, 4)]
+        )
+
+    engine = create_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(engine)
+
+    with engine.connect() as connection:
+        listings = connection.execute(text(
+            "SELECT listing_id, rating_sum, rating_count, rating_avg FROM listings ORDER BY listing_id"
+        )).all()
+        owner = connection.execute(text(
+            "SELECT owner_rating_sum, owner_rating_count, owner_rating_avg FROM users WHERE user_id = 3"
+        )).one()
+    assert [tuple(row) for row in listings] == [(1, 7, 2, 3.5), (2, 4, 1, 4.0), (3, 0, 0, 0.0)]
+    assert tuple(owner) == (7, 2, 3.5)
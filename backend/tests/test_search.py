@@ -0,0 +1,108 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import text
+
+from app import create_app
+from config import config, TestingConfig
+from app.models import db, User, Category, Subcategory, Location, Listing
+from app.utils.search import build_match_expression
+
+
+@pytest.fixture
+def listing(app):
+    category = Category(name='Tools')
+    user = User(first_name='Owner', email='owner@rettnar.com', password_hash='x')
+    db.session.add_all([category, user])
+    db.session.flush()
+    subcategory = Subcategory(name='Drills', category_id=category.category_id)
+    location = Location(address='1 Market St', city='San Francisco', state='CA', zip_code='94105', country='USA')
+    db.session.add_all([subcategory, location])
+    db.session.flush()
+    listing = Listing(
+        title='Cordless drill', description='18V with two batteries', price=10,
+        subcategory_id=subcategory.subcategory_id, owner_id=user.user_id, location_id=location.location_id
+    )
+    db.session.add(listing)
+    db.session.commit()
+    return listing
+
+
+def matches(expression):
+    return db.session.execute(
+        text('SELECT rowid FROM listings_fts WHERE listings_fts MATCH :expression ORDER BY rowid'),
+        {'expression': expression}
+    ).scalars().all()
+
+
+def test_match_expression_requires_every_word_and_completes_the_last():
+    assert build_match_expression('Cordless Dri') == '"cordless" "dri"*'
+    assert build_match_expression('drill" OR -saw:') == '"drill" "or" "saw"*'
+    assert build_match_expression('  ?! ') is None
+
+
+def test_index_follows_listing_and_location_writes(listing):
+    assert matches(build_match_expression('cordless dri')) == [listing.listing_id]
+    assert matches(build_match_expression('batteries francisco')) == [listing.listing_id]
+
+    listing.title = 'Hammer drill'
+    listing.location.city = 'Oakland'
+    db.session.commit()
+    assert matches(build_match_expression('cordless')) == []
+    assert matches(build_match_expression('hammer oakland')) == [listing.listing_id]
+
+    db.session.delete(listing)
+    db.session.commit()
+    assert matches(build_match_expression('hammer')) == []
+
+
+def test_only_writes_to_indexed_columns_rewrite_the_index_row(listing):
+    # A database created before the update triggers were narrowed down
+    db.session.execute(text('DROP TRIGGER listings_fts_after_update'))
+    db.session.execute(text(
+        'CREATE TRIGGER listings_fts_after_update AFTER UPDATE ON listings BEGIN '
+        'DELETE FROM listings_fts WHERE rowid = old.listing_id; END'
+    ))
+    db.session.commit()
+    db.create_all()
+
+    db.session.execute(text('DELETE FROM listings_fts WHERE rowid = :id'), {'id': listing.listing_id})
+    listing.rating_sum, listing.rating_count, listing.rating_avg = 5, 1, 5.0
+    listing.location.latitude = 37.79
+    db.session.commit()
+    assert matches(build_match_expression('drill')) == []
+
+    listing.description = 'Brushless, two batteries'
+    db.session.commit()
+    assert matches(build_match_expression('brushless drill')) == [listing.listing_id]
+
+
+def search(client, terms):
+    response = client.get('/api/listings/', query_string={'search': terms})
+    assert response.status_code == 200
+    return [item['id'] for item in response.get_json()['items']]
+
+
+def test_searches_without_words_filter_like_the_like_path(client, listing):
+    assert search(client, 'drill') == [str(listing.listing_id)]
+    assert search(client, '-') == []
+    assert search(client, ' ?! ') == []
+
+
+def test_databases_without_the_index_fall_back_to_like(listing, tmp_path, monkeypatch):
+    # A SQLite database whose schema came from elsewhere, without the FTS table
+    path = tmp_path / 'no_fts.db'
+    with sqlite3.connect(path) as target:
+        db.session.connection().connection.driver_connection.backup(target)
+        target.execute('DROP TABLE listings_fts')
+    monkeypatch.setitem(config, 'no_fts', type('NoFtsConfig', (TestingConfig,), {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'
+    }))
+    app = create_app('no_fts')
+
+    with app.app_context():
+        client = app.test_client()
+        assert search(client, 'cordless') == [str(listing.listing_id)]
+        assert search(client, 'hammer') == []
+        db.session.remove()
+        db.engine.dispose()
@@ -0,0 +1,60 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from marshmallow import Schema, fields, post_dump
+
+from app.utils.serializers import compile_schema
+
+
+class InnerSchema(Schema):
+    code = fields.Str(data_key='Code')
+
+
+class OuterSchema(Schema):
+    name = fields.Str()
+    count = fields.Int(dump_default=0)
+    score = fields.Float(as_string=True)
+    seen_at = fields.DateTime()
+    nested_code = fields.Str(attribute='inner.code')
+    inner = fields.Nested(InnerSchema)
+    inners = fields.List(fields.Nested(InnerSchema))
+    tags = fields.List(fields.Str())
+    extra = fields.Dict()
+    label = fields.Method('get_label')
+    constant = fields.Constant('x')
+
+    def get_label(self, obj):
+        return f'<{obj.name}>' if hasattr(obj, 'name') else None
+
+
+class HookSchema(Schema):
+    name = fields.Str()
+
+    @post_dump
+    def shout(self, data, **kwargs):
+        data['name'] = data['name'].upper()
+        return data
+
+
+def test_compiled_schema_matches_dump_for_objects_and_dicts():
+    inner = SimpleNamespace(code=7)
+    objects = [
+        SimpleNamespace(
+            name='drill', score=4, seen_at=datetime(2024, 1, 2, 3, 4, 5), inner=inner,
+            inners=[inner, None], tags=['a', 1], extra={'k': 1}
+        ),
+        SimpleNamespace(name=None, count=None, inner=None, inners=None),
+        {'name': b'bytes', 'count': '3', 'extra': None},
+    ]
+    schema = OuterSchema(many=True)
+
+    assert compile_schema(schema).dump(objects) == schema.dump(objects)
+    assert list(compile_schema(schema).dump(objects)[0]) == list(schema.dump(objects)[0])
+
+
+def test_compiled_schema_respects_only_and_hooks():
+    schema = OuterSchema(only=('name', 'inner'))
+    obj = SimpleNamespace(name='tent', inner=SimpleNamespace(code='c'))
+    assert compile_schema(schema).dump(obj) == {'name': 'tent', 'inner': {'Code': 'c'}}
+
+    assert compile_schema(HookSchema()).dump({'name': 'kayak'}) == {'name': 'KAYAK'}
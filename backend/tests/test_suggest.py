@@ -0,0 +1,142 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, func, delete, update
+
+from app import create_app
+from config import config, TestingConfig
+from app.models import db, User, Category, Subcategory, Location, Listing, SearchLog, ListingChange
+from app.blueprints.listings.suggest import (
+    MAX_SUGGESTIONS, SUGGESTION_KINDS, SuggestionIndex, current_suggestion_index, _Snapshot
+)
+
+
+@pytest.fixture
+def catalog(app):
+    category = Category(name='Tools')
+    user = User(first_name='Owner', email='owner@rettnar.com', password_hash='x')
+    db.session.add_all([category, user])
+    db.session.flush()
+    subcategory = Subcategory(name='Drills', category_id=category.category_id)
+    location = Location(address='1 Market St', city='San Francisco', state='CA', zip_code='94105', country='USA')
+    db.session.add_all([subcategory, location])
+    db.session.flush()
+
+    listings = [
+        Listing(
+            title=title, description='', price=10, subcategory_id=subcategory.subcategory_id,
+            owner_id=user.user_id, location_id=location.location_id
+        )
+        for title in ('Cordless drill', 'Drill press', 'Hammer')
+    ]
+    searches = [SearchLog(keyword=keyword, user_id=user.user_id) for keyword in ('drill bits',) * 3 + ('drone',)]
+    db.session.add_all(listings + searches)
+    db.session.commit()
+    return listings
+
+
+def suggestions(client, prefix):
+    response = client.get('/api/listings/suggest', query_string={'q': prefix})
+    assert response.status_code == 200
+    return [(item['text'], item['type']) for item in response.get_json()['suggestions']]
+
+
+def test_suggestions_are_ranked_by_popularity_without_queries(client, catalog, count_queries):
+    current_suggestion_index().refresh()
+
+    with count_queries() as statements:
+        ranked = suggestions(client, 'Dr')
+    assert not statements
+    assert ranked == [
+        ('Drills', 'subcategory'), ('drill bits', 'search'), ('Drill press', 'listing'), ('Cordless drill', 'listing')
+    ]
+    assert suggestions(client, 'drill ') == [('drill bits', 'search'), ('Drill press', 'listing')]
+    assert suggestions(client, 'x') == []
+
+
+def test_refresh_applies_listing_and_search_writes(client, catalog):
+    current_suggestion_index().refresh()
+
+    catalog[0].title = 'Impact driver'
+    db.session.delete(catalog[1])
+    db.session.add(SearchLog(keyword='Drone', user_id=catalog[2].owner_id))
+    db.session.commit()
+    current_suggestion_index().refresh()
+
+    assert suggestions(client, 'dr') == [
+        ('Drills', 'subcategory'), ('drill bits', 'search'), ('drone', 'search'), ('Impact driver', 'listing')
+    ]
+
+
+def test_typing_isnt_held_to_the_default_rate_limits(monkeypatch):
+    monkeypatch.setitem(config, 'rate_limited', type('RateLimitedConfig', (TestingConfig,), {'RATELIMIT_ENABLED': True}))
+    app = create_app('rate_limited')
+
+    with app.app_context():
+        db.create_all()
+        client = app.test_client()
+        statuses = {client.get('/api/listings/suggest', query_string={'q': 'd' * (i % 10 + 1)}).status_code
+                    for i in range(60)}
+        db.session.remove()
+    assert statuses == {200}
+
+
+def test_updated_snapshots_match_a_rebuild():
+    rng = random.Random(5)
+    words = ['drill', 'driver', 'dremel', 'saw', 'sander', 'ladder', 'lamp', 'tent']
+    weights = iter(rng.sample(range(1, 100_000), 20_000))
+
+    def entry(phrase):
+        return next(weights), phrase.title(), rng.choice(SUGGESTION_KINDS)
+
+    phrases = {' '.join(rng.sample(words, rng.randint(1, 3))) for _ in range(200)}
+    entries = {phrase: entry(phrase) for phrase in phrases}
+    snapshot = _Snapshot(entries)
+    for _ in range(30):
+        changes = {phrase: None for phrase in rng.sample(sorted(entries), 5)}
+        changes.update({phrase: entry(phrase) for phrase in rng.sample(sorted(entries), 10)})
+        changes.update({phrase: entry(phrase) for phrase in
+                        {' '.join(rng.sample(words, rng.randint(1, 4))) for _ in range(5)}})
+        changes['never indexed'] = None
+        for phrase, value in changes.items():
+            if value is None:
+                entries.pop(phrase, None)
+            else:
+                entries[phrase] = value
+        snapshot = snapshot.updated(changes)
+
+        rebuilt = _Snapshot(entries)
+        assert snapshot.preranked.keys() == rebuilt.preranked.keys()
+        for query in list(rebuilt.preranked) + ['dri', 'drill s', 'sander', 'x', 'zz']:
+            assert snapshot.lookup(query, MAX_SUGGESTIONS) == rebuilt.lookup(query, MAX_SUGGESTIONS)
+
+
+def test_refreshes_prune_the_change_feed_once_per_retention_period(app, catalog, monkeypatch):
+    index = SuggestionIndex(retention=60)
+    index.refresh()
+    db.session.add(ListingChange(listing_id=catalog[0].listing_id, changed_at=datetime.utcnow() - timedelta(hours=1)))
+    db.session.commit()
+
+    stale_changes = select(func.count()).where(ListingChange.changed_at < datetime.utcnow() - timedelta(minutes=1))
+
+    index.refresh()
+    assert db.session.execute(stale_changes).scalar() == 1
+
+    monkeypatch.setattr(index, '_last_prune', index._last_prune - 60)
+    index.refresh()
+    assert db.session.execute(stale_changes).scalar() == 0
+
+
+def test_refresh_rebuilds_when_change_ids_are_reused(client, catalog):
+    index = current_suggestion_index()
+    index.refresh()
+
+    # A database from before AUTOINCREMENT: the pruned feed's ids come back
+    db.session.execute(delete(ListingChange))
+    db.session.execute(update(Listing).where(Listing.listing_id == catalog[2].listing_id).values(title='Drill bit set'))
+    db.session.add(ListingChange(change_id=1, listing_id=catalog[2].listing_id))
+    db.session.commit()
+    index.refresh()
+
+    assert ('Drill bit set', 'listing') in suggestions(client, 'drill b')
@@ -0,0 +1,128 @@
+import re
+import shutil
+from pathlib import Path
+
+import pytest
+
+from app import create_app
+from app.extensions import cache
+from config import config, TestingConfig
+from app.models import db, User, Role
+from app.utils.util import encode_user_token
+from app.utils.identity import current_identity_cache, current_role_membership
+
+
+def test_roles_etag_changes_with_role_writes(app, client):
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    admin = User(first_name='Admin', email='admin@rettnar.com', password_hash='x', roles=[Role(name='admin')])
+    db.session.add(admin)
+    db.session.commit()
+
+    etag = client.get('/api/users/roles').headers['ETag']
+    assert client.get('/api/users/roles', headers={'If-None-Match': etag}).status_code == 304
+
+    client.post(
+        '/api/users/roles', json={'name': 'owner'},
+        headers={'Authorization': f'Bearer {encode_user_token(admin.user_id)}'}
+    )
+    response = client.get('/api/users/roles', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert [role['name'] for role in response.get_json()] == ['admin', 'owner']
+
+
+def test_profile_supports_conditional_get(client):
+    user = User(first_name='Ada', email='ada@rettnar.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    headers = {'Authorization': f'Bearer {encode_user_token(user.user_id)}'}
+
+    etag = client.get('/api/users/profile', headers=headers).headers['ETag']
+
+    assert client.get('/api/users/profile', headers={**headers, 'If-None-Match': etag}).status_code == 304
+    assert client.get('/api/users/profile', headers={**headers, 'If-None-Match': '"stale"'}).status_code == 200
+
+
+def test_verified_identities_are_cached_until_evicted(app, client, count_queries):
+    admin = User(first_name='Admin', email='admin@rettnar.com', password_hash='x', roles=[Role(name='Admin')])
+    user = User(first_name='Ada', email='ada@rettnar.com', password_hash='x')
+    db.session.add_all([admin, user])
+    db.session.commit()
+    admin_headers = {'Authorization': f'Bearer {encode_user_token(admin.user_id)}'}
+    headers = {'Authorization': f'Bearer {encode_user_token(user.user_id)}'}
+
+    assert client.get('/api/users/profile', headers=headers).status_code == 200
+    with count_queries() as statements:
+        assert client.get('/api/users/profile', headers=headers).status_code == 200
+    # Only the profile's own eager load of roles, not the token check
+    assert sum('user_roles' in statement for statement in statements) == 1
+
+    assert client.put(f'/api/users/users/{user.user_id}/deactivate', headers=admin_headers).status_code == 200
+    assert client.get('/api/users/profile', headers=headers).status_code == 404
+
+    stats = client.get('/health/cache').get_json()['identity']
+    assert stats['hits'] == 1
+    assert stats['misses'] == 3
+    assert stats['evictions'] == 1
+
+
+def test_admin_role_claim_is_trusted_until_roles_change(app, client, count_queries):
+    admin = User(first_name='Admin', email='admin@rettnar.com', password_hash='x', roles=[Role(name='Admin')])
+    db.session.add(admin)
+    db.session.commit()
+    headers = {'Authorization': f"Bearer {encode_user_token(admin.user_id, ['Admin'], admin.role_version)}"}
+
+    with count_queries() as statements:
+        assert client.get('/api/users/roles/1', headers=headers).status_code == 200
+    assert not any('user_roles' in statement for statement in statements)
+    assert current_role_membership().members('admin') == {admin.user_id}
+
+    admin.roles = []
+    db.session.commit()
+    current_identity_cache().clear()
+
+    assert client.get('/api/users/roles/1', headers=headers).status_code == 403
+    assert current_role_membership().members('admin') == set()
+
+
+
+@pytest.mark.parametrize('method, path, body, user_reads', [
+    ('get', '/api/users/profile', None, 1),
+    # The second read is the refresh after the commit, for the response
+    ('put', '/api/users/profile', {'first_name': 'Ada'}, 2),
+    ('post', '/api/users/avatar', {'imageUri': 'file:///avatar.png'}, 1),
+    ('get', '/api/messages/conv_{user_id}_{other_id}', None, 0),
+    ('post', '/api/messages/conversation/{other_id}', None, 1),
+])
+def test_authenticated_requests_read_the_user_once(client, count_queries, method, path, body, user_reads):
+    user = User(first_name='Ada', email='ada@rettnar.com', password_hash='x')
+    other = User(first_name='Grace', email='grace@rettnar.com', password_hash='x')
+    db.session.add_all([user, other])
+    db.session.commit()
+    path = path.format(user_id=user.user_id, other_id=other.user_id)
+    headers = {'Authorization': f'Bearer {encode_user_token(user.user_id)}'}
+    # Warm the identity cache so only the handler can read the user
+    client.get('/api/users/profile', headers=headers)
+    db.session.expire_all()
+
+    with count_queries() as statements:
+        response = getattr(client, method)(path, json=body, headers=headers)
+    assert response.status_code == 200
+    assert sum(bool(re.search(r'FROM users\b(?! AS)', statement)) for statement in statements) == user_reads
+
+
+def test_app_runs_on_a_database_from_before_role_versions(tmp_path, monkeypatch):
+    path = tmp_path / 'rettnar_dev.db'
+    shutil.copy(Path(__file__).parent.parent / 'rettnar_dev.db', path)
+    monkeypatch.setitem(config, 'upgraded', type(
+        'UpgradedConfig', (TestingConfig,), {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'}
+    ))
+    app = create_app('upgraded')
+
+    with app.app_context():
+        db.create_all()
+        response = app.test_client().get(
+            '/api/users/profile', headers={'Authorization': f'Bearer {encode_user_token(1)}'}
+        )
+        db.session.remove()
+    assert response.status_code == 200
+    assert response.get_json()['role_version'] == 0